@@ -13,7 +13,8 @@ export async function GET(request: NextRequest) {
       )
     }
 
-    const response = await fetch(`${DJANGO_API_URL}/admin/orders`, {
+    // Forward filters and pagination (?updated_since=, ?table=, ?limit=, ?cursor=)
+    const response = await fetch(`${DJANGO_API_URL}/admin/orders${request.nextUrl.search}`, {
       headers: {
         'X-Admin-Token': adminToken,
       },
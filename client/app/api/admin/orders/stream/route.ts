@@ -0,0 +1,57 @@
+import { NextRequest, NextResponse } from 'next/server'
+
+const DJANGO_API_URL = process.env.DJANGO_API_URL || 'http://localhost:8000/api'
+
+export const dynamic = 'force-dynamic'
+
+// EventSource cannot send custom headers, so the admin token arrives in the admin_stream_token
+// cookie (set by the orders view for this path only) rather than the URL, which ends up in logs
+export async function GET(request: NextRequest) {
+  try {
+    const adminToken = request.cookies.get('admin_stream_token')?.value || request.headers.get('X-Admin-Token')
+
+    if (!adminToken) {
+      return NextResponse.json(
+        { error: 'Admin token required' },
+        { status: 401 }
+      )
+    }
+
+    const headers: Record<string, string> = {
+      'X-Admin-Token': adminToken,
+      'Accept': 'text/event-stream',
+    }
+    const lastEventId = request.headers.get('Last-Event-ID')
+    if (lastEventId) {
+      headers['Last-Event-ID'] = lastEventId
+    }
+
+    const response = await fetch(`${DJANGO_API_URL}/admin/orders/stream`, {
+      headers,
+      cache: 'no-store',
+      signal: request.signal,
+    })
+
+    if (!response.ok || !response.body) {
+      const error = await response.text()
+      return NextResponse.json(
+        { error: 'Failed to open order stream', details: error },
+        { status: response.status }
+      )
+    }
+
+    return new Response(response.body, {
+      headers: {
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache, no-transform',
+        'Connection': 'keep-alive',
+      },
+    })
+  } catch (error) {
+    console.error('Error opening order stream:', error)
+    return NextResponse.json(
+      { error: 'Internal server error', details: error instanceof Error ? error.message : 'Unknown error' },
+      { status: 500 }
+    )
+  }
+}
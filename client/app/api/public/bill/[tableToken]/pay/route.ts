@@ -7,7 +7,7 @@ export async function POST(request: NextRequest, { params }: { params: Promise<{
 
   try {
     const body = await request.json()
-    const { amount, tip, paymentMode, seats } = body
+    const { amount, tip, paymentMode, seats, sessionId } = body
 
     // Get table context for table ID
     const contextResponse = await fetch(`${DJANGO_API_URL}/public/table-context/${tableToken}`)
@@ -22,16 +22,19 @@ export async function POST(request: NextRequest, { params }: { params: Promise<{
     const tipCents = Math.round((tip || 0) * 100)
     const mode = paymentMode || "full"
 
-    // Create payment intent
+    // Create payment intent; forward the Idempotency-Key so retried requests charge once
+    const idempotencyKey = request.headers.get("Idempotency-Key")
     const response = await fetch(`${DJANGO_API_URL}/public/tables/${tableId}/payment/intent`, {
       method: "POST",
       headers: {
         "Content-Type": "application/json",
+        ...(idempotencyKey ? { "Idempotency-Key": idempotencyKey } : {}),
       },
       body: JSON.stringify({
         mode,
         seats: seats || 1,
         tip: tipCents,
+        ...(sessionId ? { sessionId } : {}),
       }),
     })
 
@@ -48,6 +51,8 @@ export async function POST(request: NextRequest, { params }: { params: Promise<{
       paymentId: paymentData.paymentId,
       status: paymentData.status,
       billClosed: paymentData.billClosed,
+      // Set when this payment closed the bill: the token of its stored receipt
+      receiptToken: paymentData.receiptUrl ? paymentData.receiptUrl.split("/").pop() : null,
     })
   } catch (error) {
     console.error("Error processing payment:", error)
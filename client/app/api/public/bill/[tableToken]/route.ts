@@ -78,11 +78,13 @@ export async function POST(request: NextRequest, { params }: { params: Promise<{
     const context = await contextResponse.json()
     const tableId = context.tableId
 
-    // Add item to bill
+    // Add item to bill; forward the Idempotency-Key so retried requests add the item once
+    const idempotencyKey = request.headers.get("Idempotency-Key")
     const response = await fetch(`${DJANGO_API_URL}/public/tables/${tableId}/bill/items`, {
       method: "POST",
       headers: {
         "Content-Type": "application/json",
+        ...(idempotencyKey ? { "Idempotency-Key": idempotencyKey } : {}),
       },
       body: JSON.stringify({
         itemId: parseInt(itemId),
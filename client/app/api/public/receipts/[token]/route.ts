@@ -0,0 +1,20 @@
+import { type NextRequest, NextResponse } from "next/server"
+
+const DJANGO_API_URL = process.env.DJANGO_API_URL || "http://localhost:8000/api"
+
+export async function GET(request: NextRequest, { params }: { params: Promise<{ token: string }> }) {
+  const { token } = await params
+
+  try {
+    // Stored once when the payment closed the bill; Django serves it with a long private cache lifetime
+    const response = await fetch(`${DJANGO_API_URL}/public/receipts/${encodeURIComponent(token)}?format=json`)
+    const data = await response.json()
+    return NextResponse.json(data, {
+      status: response.status,
+      headers: response.ok ? { "Cache-Control": response.headers.get("Cache-Control") || "private" } : {},
+    })
+  } catch (error) {
+    console.error("Error fetching receipt:", error)
+    return NextResponse.json({ error: "Failed to fetch receipt" }, { status: 500 })
+  }
+}
@@ -23,6 +23,26 @@ async function getBillData(tableToken: string) {
   }
 }
 
+async function getReceipt(receiptToken: string) {
+  try {
+    const apiUrl = await buildApiUrl(`/api/public/receipts/${encodeURIComponent(receiptToken)}`)
+    const response = await fetch(apiUrl, {
+      headers: {
+        Accept: "application/json",
+      },
+    });
+
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+
+    return await response.json();
+  } catch (error) {
+    console.error("Error fetching receipt:", error);
+    return null;
+  }
+}
+
 async function getTableContext(tableToken: string) {
   try {
     const apiUrl = await buildApiUrl(`/api/public/table-context/${tableToken}`)
@@ -45,8 +65,21 @@ async function getTableContext(tableToken: string) {
   }
 }
 
-export default async function ReceiptPage({ params }: { params: Promise<{ tableToken: string }> }) {
+export default async function ReceiptPage({
+  params,
+  searchParams,
+}: {
+  params: Promise<{ tableToken: string }>
+  searchParams: Promise<{ receipt?: string }>
+}) {
   const { tableToken } = await params
+  const { receipt: receiptToken } = await searchParams
+
+  // The payment that closed the bill returned its stored receipt; the live bill is a new, empty one by now
+  if (receiptToken) {
+    const receipt = await getReceipt(receiptToken)
+    return <ReceiptClient tableToken={tableToken} restaurant={{ name: receipt?.restaurant || "Restaurant" }} bill={null} receipt={receipt} />
+  }
 
   const contextData = await getTableContext(tableToken)
   const billData = await getBillData(tableToken)
@@ -54,5 +87,5 @@ export default async function ReceiptPage({ params }: { params: Promise<{ tableT
   const restaurant = contextData?.restaurant || { name: "Restaurant" }
   const bill = billData?.bill || null
 
-  return <ReceiptClient tableToken={tableToken} restaurant={restaurant} bill={bill} />
+  return <ReceiptClient tableToken={tableToken} restaurant={restaurant} bill={bill} receipt={null} />
 }
@@ -58,23 +58,34 @@ export function AdminOrdersView({ adminToken }: { adminToken: string }) {
       console.log('Fetching orders from:', apiUrl)
       console.log('Admin token:', adminToken)
       
-      const response = await fetch(apiUrl, {
-        headers: {
-          'X-Admin-Token': adminToken,
-        },
-      })
-
-      console.log('Response status:', response.status)
-
-      if (!response.ok) {
-        const errorText = await response.text()
-        console.error('Error response:', errorText)
-        throw new Error(`Failed to fetch orders: ${response.status}`)
-      }
+      // Follow nextCursor until every open bill has been loaded
+      const orders: Order[] = []
+      let totalOpenBills = 0
+      let cursor: string | null = null
+      do {
+        const pageUrl: string = cursor ? `${apiUrl}?cursor=${encodeURIComponent(cursor)}` : apiUrl
+        const response = await fetch(pageUrl, {
+          headers: {
+            'X-Admin-Token': adminToken,
+          },
+        })
+
+        console.log('Response status:', response.status)
+
+        if (!response.ok) {
+          const errorText = await response.text()
+          console.error('Error response:', errorText)
+          throw new Error(`Failed to fetch orders: ${response.status}`)
+        }
 
-      const data = await response.json()
-      console.log('Orders data:', data)
-      setOrdersData(data)
+        const data = await response.json()
+        orders.push(...data.orders)
+        totalOpenBills = data.totalOpenBills
+        cursor = data.nextCursor
+      } while (cursor)
+
+      console.log('Orders data:', orders)
+      setOrdersData({ orders, totalOpenBills })
       setError(null)
     } catch (err) {
       console.error('Fetch error:', err)
@@ -87,10 +98,48 @@ export function AdminOrdersView({ adminToken }: { adminToken: string }) {
   useEffect(() => {
     fetchOrders()
     
-    // Auto-refresh every 10 seconds
-    const interval = setInterval(fetchOrders, 10000)
+    // Refresh when the server pushes a bill event; bursts are coalesced into one fetch
+    let refreshTimer: ReturnType<typeof setTimeout> | null = null
+    let pollInterval: ReturnType<typeof setInterval> | null = null
+    const scheduleRefresh = () => {
+      if (refreshTimer) return
+      refreshTimer = setTimeout(() => {
+        refreshTimer = null
+        fetchOrders()
+      }, 500)
+    }
+    
+    const streamPath = '/api/admin/orders/stream'
+    const secure = window.location.protocol === 'https:' ? '; Secure' : ''
+    document.cookie = `admin_stream_token=${encodeURIComponent(adminToken)}; path=${streamPath}; SameSite=Strict${secure}`
+    const source = new EventSource(streamPath)
+    // The server re-sends events from the last few seconds after reconnecting (an earlier id
+    // may commit after a later one), so skip ids already handled
+    const seenIds = new Set<string>()
+    const onEvent = (event: MessageEvent) => {
+      if (event.lastEventId) {
+        if (seenIds.has(event.lastEventId)) return
+        seenIds.add(event.lastEventId)
+        if (seenIds.size > 1000) seenIds.delete(seenIds.values().next().value as string)
+      }
+      scheduleRefresh()
+    }
+    for (const eventType of ['line_added', 'line_removed', 'payment', 'bill_closed']) {
+      source.addEventListener(eventType, onEvent)
+    }
+    source.onerror = () => {
+      // The browser reconnects on its own unless the stream was refused; then fall back to polling
+      if (source.readyState === EventSource.CLOSED && !pollInterval) {
+        pollInterval = setInterval(fetchOrders, 10000)
+      }
+    }
     
-    return () => clearInterval(interval)
+    return () => {
+      source.close()
+      document.cookie = `admin_stream_token=; path=${streamPath}; max-age=0`
+      if (refreshTimer) clearTimeout(refreshTimer)
+      if (pollInterval) clearInterval(pollInterval)
+    }
   }, [adminToken])
 
   const formatTime = (isoString: string) => {
@@ -11,6 +11,7 @@ import { useLanguage } from "@/contexts/language-context"
 import { LanguageSwitcher } from "@/components/language-switcher"
 import { translateCategoryName, translateMenuItemName, translateMenuItemDescription } from "@/lib/translations"
 import { getSessionId } from "@/lib/session"
+import { clearIdempotencyKey, idempotencyKeyFor } from "@/lib/idempotency"
 import type { Restaurant, Table, MenuItem, Category, Bill } from "@/lib/types"
 
 interface MenuViewProps {
@@ -55,20 +56,28 @@ export function MenuView({ restaurant, table, tableToken, menu }: MenuViewProps)
 
     try {
       const sessionId = getSessionId() // Get or create session ID
+      const body = JSON.stringify({
+        itemId: selectedItem.id,
+        quantity,
+        options: {},
+        sessionId, // Send session ID with the order
+      })
+      // Retrying this same add reuses its key, so the item is added once
+      const action = `/api/public/bill/${tableToken} ${body}`
       
       const response = await fetch(`/api/public/bill/${tableToken}`, {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
+          "Idempotency-Key": idempotencyKeyFor(action),
         },
-        body: JSON.stringify({
-          itemId: selectedItem.id,
-          quantity,
-          options: {},
-          sessionId, // Send session ID with the order
-        }),
+        body,
       })
 
+      if (response.status < 500) {
+        // The server has a definite answer for this key; only network errors and 5xx are retried with it
+        clearIdempotencyKey(action)
+      }
       if (response.ok) {
         const data = await response.json()
         setBill(data.bill)
@@ -13,6 +13,7 @@ import { useLanguage } from "@/contexts/language-context"
 import { LanguageSwitcher } from "@/components/language-switcher"
 import { translateMenuItemName } from "@/lib/translations"
 import { getSessionId } from "@/lib/session"
+import { clearIdempotencyKey, idempotencyKeyFor } from "@/lib/idempotency"
 import type { Restaurant, Table, Bill, Settings, PaymentMode } from "@/lib/types"
 
 interface PaymentViewProps {
@@ -91,12 +92,46 @@ export function PaymentView({ restaurant, table, tableToken, initialBill, settin
   const tipAmount = customTip ? Number.parseFloat(customTip) : (amountToPay * tipPercent) / 100
   const total = amountToPay + tipAmount
 
-  const handlePayment = () => {
+  const handlePayment = async () => {
     setIsProcessing(true)
-    // Simulate processing delay
-    setTimeout(() => {
-      router.push(`/t/${tableToken}/receipt`)
-    }, 1000)
+    const body = JSON.stringify({
+      amount: total,
+      tip: tipAmount,
+      paymentMode,
+      seats: paymentMode === "split_even" ? 2 : 1,
+      sessionId,
+    })
+    // Retrying this same payment (double tap, network error, reload) reuses its key, so it is charged once
+    const action = `/api/public/bill/${tableToken}/pay ${body}`
+
+    try {
+      const response = await fetch(`/api/public/bill/${tableToken}/pay`, {
+        method: "POST",
+        headers: {
+          "Content-Type": "application/json",
+          "Idempotency-Key": idempotencyKeyFor(action),
+        },
+        body,
+      })
+
+      if (response.status < 500) {
+        // The server has a definite answer for this key; only network errors and 5xx are retried with it
+        clearIdempotencyKey(action)
+      }
+      if (response.ok) {
+        // A payment that closed the bill shows its stored receipt; a partial one the bill as it stands
+        const { receiptToken } = await response.json()
+        router.push(receiptToken ? `/t/${tableToken}/receipt?receipt=${encodeURIComponent(receiptToken)}` : `/t/${tableToken}/receipt`)
+        return
+      }
+      const errorData = await response.json().catch(() => ({ error: "Unknown error" }))
+      console.error("Payment failed:", response.status, errorData)
+      alert(`Payment failed: ${errorData.error || "Unknown error"}`)
+    } catch (error) {
+      console.error("Error processing payment:", error)
+      alert(`Payment failed: ${error instanceof Error ? error.message : "Unknown error"}`)
+    }
+    setIsProcessing(false)
   }
 
   return (
@@ -6,19 +6,68 @@ import { CheckCircle2 } from "lucide-react"
 import Link from "next/link"
 import { useLanguage } from "@/contexts/language-context"
 import { LanguageSwitcher } from "@/components/language-switcher"
-import type { Bill } from "@/lib/types"
+import type { Bill, Receipt } from "@/lib/types"
 
 interface ReceiptClientProps {
   tableToken: string
   restaurant: { name: string }
   bill: Bill | null
+  receipt: Receipt | null
 }
 
-export function ReceiptClient({ tableToken, restaurant, bill }: ReceiptClientProps) {
+interface ReceiptSummary {
+  paidAt: Date
+  items: { key: string; quantity: number; name: string; lineTotal: number }[]
+  subtotal: number
+  tax: number
+  serviceFee: number
+  tip: number
+  total: number
+}
+
+/** What the receipt shows: the stored receipt of a closed bill, else the bill as it stands (after a partial payment) */
+function summarize(bill: Bill | null, receipt: Receipt | null): ReceiptSummary | null {
+  if (receipt) {
+    return {
+      paidAt: new Date(receipt.closedAt || Date.now()),
+      items: receipt.lines.map((line, index) => ({
+        key: String(index),
+        quantity: line.qty,
+        name: line.name,
+        lineTotal: line.lineTotalCents / 100,
+      })),
+      subtotal: receipt.subtotalCents / 100,
+      tax: receipt.taxCents / 100,
+      serviceFee: receipt.serviceFeeCents / 100,
+      tip: receipt.tipCents / 100,
+      total: receipt.totalCents / 100,
+    }
+  }
+  if (bill) {
+    return {
+      paidAt: new Date(),
+      items: bill.items.map((item) => ({
+        key: item.id,
+        quantity: item.quantity,
+        name: item.menuItemName,
+        lineTotal: item.lineTotal || item.price * item.quantity,
+      })),
+      subtotal: bill.subtotal,
+      tax: bill.tax,
+      serviceFee: bill.serviceFee,
+      tip: bill.tip,
+      total: bill.total,
+    }
+  }
+  return null
+}
+
+export function ReceiptClient({ tableToken, restaurant, bill, receipt }: ReceiptClientProps) {
   const { t } = useLanguage()
+  const summary = summarize(bill, receipt)
 
   // If no bill data, show error
-  if (!bill) {
+  if (!summary) {
     return (
       <div className="min-h-screen bg-background p-4 flex items-center justify-center">
         <div className="absolute top-4 right-4">
@@ -56,17 +105,17 @@ export function ReceiptClient({ tableToken, restaurant, bill }: ReceiptClientPro
           <CardHeader>
             <CardTitle>{restaurant.name}</CardTitle>
             <p className="text-sm text-muted-foreground">
-              {t('paidOn')}: {new Date().toLocaleString()}
+              {t('paidOn')}: {summary.paidAt.toLocaleString()}
             </p>
           </CardHeader>
           <CardContent className="space-y-4">
             <div className="space-y-2">
-              {bill.items.map((item: any) => (
-                <div key={item.id} className="flex justify-between">
+              {summary.items.map((item) => (
+                <div key={item.key} className="flex justify-between">
                   <span>
-                    {item.quantity}x {item.menuItemName}
+                    {item.quantity}x {item.name}
                   </span>
-                  <span>${(item.lineTotal || (item.price * item.quantity)).toFixed(2)}</span>
+                  <span>${item.lineTotal.toFixed(2)}</span>
                 </div>
               ))}
             </div>
@@ -74,23 +123,23 @@ export function ReceiptClient({ tableToken, restaurant, bill }: ReceiptClientPro
             <div className="border-t pt-4 space-y-2">
               <div className="flex justify-between text-sm">
                 <span>{t('subtotal')}</span>
-                <span>${bill.subtotal.toFixed(2)}</span>
+                <span>${summary.subtotal.toFixed(2)}</span>
               </div>
               <div className="flex justify-between text-sm">
                 <span>{t('tax')}</span>
-                <span>${bill.tax.toFixed(2)}</span>
+                <span>${summary.tax.toFixed(2)}</span>
               </div>
               <div className="flex justify-between text-sm">
                 <span>{t('serviceFee')}</span>
-                <span>${bill.serviceFee.toFixed(2)}</span>
+                <span>${summary.serviceFee.toFixed(2)}</span>
               </div>
               <div className="flex justify-between text-sm">
                 <span>{t('tip')}</span>
-                <span>${bill.tip.toFixed(2)}</span>
+                <span>${summary.tip.toFixed(2)}</span>
               </div>
               <div className="flex justify-between font-bold text-lg pt-2 border-t">
                 <span>{t('total')}</span>
-                <span>${bill.total.toFixed(2)}</span>
+                <span>${summary.total.toFixed(2)}</span>
               </div>
             </div>
           </CardContent>
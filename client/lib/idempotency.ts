@@ -0,0 +1,36 @@
+/**
+ * Idempotency keys for requests that must take effect once (adding items, paying)
+ * One key per intended action: a retry of the same request after a network error or a 5xx
+ * reuses its key, so the server replays the first result instead of applying it again.
+ * Keys are kept in sessionStorage, so a reload mid-payment still retries with the same key.
+ */
+
+const KEY_PREFIX = 'billpay_idempotency:'
+
+/**
+ * Get the key for an action, creating it on first use
+ * `action` identifies the intended request, e.g. its path and body
+ */
+export function idempotencyKeyFor(action: string): string {
+  if (typeof window === 'undefined') {
+    return crypto.randomUUID()
+  }
+
+  let key = sessionStorage.getItem(KEY_PREFIX + action)
+  if (!key) {
+    key = crypto.randomUUID()
+    sessionStorage.setItem(KEY_PREFIX + action, key)
+  }
+  return key
+}
+
+/**
+ * Forget the action's key once the server has answered it (any status below 500), so doing the
+ * same thing again is a new request. Keep it after network errors and 5xx, which may or may not
+ * have taken effect.
+ */
+export function clearIdempotencyKey(action: string): void {
+  if (typeof window !== 'undefined') {
+    sessionStorage.removeItem(KEY_PREFIX + action)
+  }
+}
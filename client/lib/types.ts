@@ -50,6 +50,22 @@ export interface Bill {
   status: "open" | "paid"
 }
 
+/** Stored receipt of a closed bill (GET /api/public/receipts/<token>); amounts in cents */
+export interface Receipt {
+  billId: number
+  restaurant: string
+  table: string
+  closedAt: string | null
+  lines: { name: string; options: Record<string, any>; qty: number; unitPriceCents: number; lineTotalCents: number }[]
+  subtotalCents: number
+  taxCents: number
+  serviceFeeCents: number
+  tipCents: number
+  totalCents: number
+  paidCents: number
+  payments: { id: number; amountCents: number; provider: string; paidAt: string }[]
+}
+
 export interface Settings {
   taxPercent: number
   serviceFeePercent: number
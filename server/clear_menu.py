@@ -9,11 +9,15 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'server.settings')
 django.setup()
 
-from core.models import MenuItem, MenuCategory
+from django.db.models import F
+from core.models import Restaurant, MenuItem, MenuCategory
 
 # Delete all menu items and categories
 MenuItem.objects.all().delete()
 MenuCategory.objects.all().delete()
 
+# Invalidate cached public menus
+Restaurant.objects.update(menu_version=F('menu_version') + 1)
+
 print("✅ Cleared all menu items and categories")
 print("Now run: python manage.py seed")
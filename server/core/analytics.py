@@ -0,0 +1,109 @@
+"""
+Item sales analytics: per-day grouped aggregates of closed bills' lines, cached per restaurant.
+
+A day's figures are keyed by the local day its bills closed in. Once the day is over they cannot
+change (archiving moves rows but keeps them in closed_bills()), so they are cached for good; the
+current day is cached with the moment it runs to and topped up with only the bills closed since.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.core.cache import cache
+from django.db.models import F, Sum, Value
+from django.db.models.functions import Coalesce, ExtractHour, TruncDate
+from django.utils import timezone
+
+from .models import closed_bills
+
+
+DAY_CACHE_TIMEOUT = 60 * 60 * 24 * 90  # Closed days never change; this only bounds memory
+CURRENT_DAY_CACHE_TIMEOUT = 60 * 60 * 24 * 2
+SETTLE_SECONDS = 5  # Bills closing right now may not be committed yet; include them next time
+UNCATEGORIZED = 'Uncategorized'
+
+
+def empty_buckets():
+    return {'items': {}, 'categories': {}, 'hours': {}}
+
+
+def merge(into, buckets):
+    """Add one set of {group: [qty, revenue_cents]} buckets to another"""
+    for name, groups in buckets.items():
+        for key, (qty, revenue) in groups.items():
+            totals = into[name].setdefault(key, [0, 0])
+            totals[0] += qty
+            totals[1] += revenue
+    return into
+
+
+def start_of(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def aggregate(restaurant_id, start, end):
+    """
+    {local day: buckets} for the lines of bills closed in [start, end): quantity and revenue
+    by item name, by category and by the hour they were ordered, grouped in the database
+    """
+    tz = timezone.get_current_timezone()
+    groupings = {
+        'items': F('name_snapshot'),
+        'categories': Coalesce('item__category__name', Value(UNCATEGORIZED)),
+        'hours': ExtractHour('ordered_at', tzinfo=tz),
+    }
+    days = defaultdict(empty_buckets)
+    for bills in closed_bills(restaurant_id=restaurant_id, closed_at__gte=start, closed_at__lt=end):
+        Line = bills.model._meta.get_field('lines').related_model
+        lines = Line.objects.filter(bill__in=bills).annotate(day=TruncDate('bill__closed_at', tzinfo=tz))
+        for name, group in groupings.items():
+            rows = (
+                lines.annotate(group=group)
+                .values('day', 'group')
+                .annotate(qty=Sum('qty'), revenue=Sum('line_total_cents'))
+                .values_list('day', 'group', 'qty', 'revenue')
+                .order_by()
+            )
+            for day, key, qty, revenue in rows:
+                merge(days[day], {name: {key: [qty, revenue]}})
+    return days
+
+
+def day_cache_key(restaurant_id, day):
+    return f'analytics:items:{restaurant_id}:{day.isoformat()}'
+
+
+def current_day_buckets(restaurant_id, day, settled):
+    """Buckets for the day in progress, from the cached partial day plus bills closed since"""
+    key = f'{day_cache_key(restaurant_id, day)}:partial'
+    through, buckets = cache.get(key) or (start_of(day), empty_buckets())
+    if settled > through:
+        for fresh in aggregate(restaurant_id, through, settled).values():
+            merge(buckets, fresh)
+        # Concurrent refreshes each store the same base plus their own range, so none double counts
+        cache.set(key, (settled, buckets), CURRENT_DAY_CACHE_TIMEOUT)
+    return buckets
+
+
+def item_sales(restaurant_id, first_day, last_day):
+    """Summed buckets for the local days first_day to last_day inclusive"""
+    settled = timezone.now() - timedelta(seconds=SETTLE_SECONDS)
+    days = [first_day + timedelta(days=n) for n in range((last_day - first_day).days + 1)]
+    closed_days = [day for day in days if start_of(day + timedelta(days=1)) <= settled]
+
+    keys = {day: day_cache_key(restaurant_id, day) for day in closed_days}
+    cached = cache.get_many(list(keys.values()))
+    missing = [day for day in closed_days if keys[day] not in cached]
+    if missing:
+        # One set of grouped queries over the span of uncached days
+        fresh = aggregate(restaurant_id, start_of(missing[0]), start_of(missing[-1] + timedelta(days=1)))
+        computed = {keys[day]: fresh.get(day, empty_buckets()) for day in missing}
+        cache.set_many(computed, DAY_CACHE_TIMEOUT)
+        cached.update(computed)
+
+    result = empty_buckets()
+    for day in closed_days:
+        merge(result, cached[keys[day]])
+    for day in days:
+        if start_of(day) <= settled < start_of(day + timedelta(days=1)):
+            merge(result, current_day_buckets(restaurant_id, day, settled))
+    return result
@@ -1,6 +1,203 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
+from .cache import TTLCache
 from .models import Restaurant, Table
+import copy
+import uuid
+
+
+# Token resolution cache
+# token hash -> row id, row id -> column values. Rows are evicted when a Restaurant/Table
+# is saved or deleted (see signals.py); token mappings are re-checked against the row,
+# so a rotated token simply misses.
+# Restaurant rows (menu_version drives the menu ETag) are tagged with the restaurant's
+# generation, a key in Django's cache that invalidate_restaurant moves, so a change made
+# by one worker also evicts the copies in every other worker's local cache. Only
+# get_restaurant() caches them, having read the generation before the row.
+TOKEN_CACHE_TTL = getattr(settings, 'TOKEN_CACHE_TTL', 30)
+TOKEN_CACHE_MAX_ENTRIES = getattr(settings, 'TOKEN_CACHE_MAX_ENTRIES', 10000)
+TOKEN_CACHE_SHARED = getattr(settings, 'TOKEN_CACHE_SHARED', False)  # Also keep entries in Django's cache
+
+_local_cache = TTLCache(TOKEN_CACHE_MAX_ENTRIES, TOKEN_CACHE_TTL)
+
+
+def _cache_get(key):
+    value = _local_cache.get(key)
+    if value is None and TOKEN_CACHE_SHARED:
+        value = cache.get(key)
+        if value is not None:
+            _local_cache.set(key, value)
+    return value
+
+
+def _cache_set(key, value):
+    _local_cache.set(key, value)
+    if TOKEN_CACHE_SHARED:
+        cache.set(key, value, TOKEN_CACHE_TTL)
+
+
+def _cache_delete(key):
+    _local_cache.delete(key)
+    if TOKEN_CACHE_SHARED:
+        cache.delete(key)
+
+
+async def _acache_get(key):
+    value = _local_cache.get(key)
+    if value is None and TOKEN_CACHE_SHARED:
+        value = await cache.aget(key)
+        if value is not None:
+            _local_cache.set(key, value)
+    return value
+
+
+async def _acache_set(key, value):
+    _local_cache.set(key, value)
+    if TOKEN_CACHE_SHARED:
+        await cache.aset(key, value, TOKEN_CACHE_TTL)
+
+
+async def _acache_delete(key):
+    _local_cache.delete(key)
+    if TOKEN_CACHE_SHARED:
+        await cache.adelete(key)
+
+
+def _generation_key(restaurant_id):
+    return f'restaurant-generation:{restaurant_id}'
+
+
+def _restaurant_generation(restaurant_id):
+    return cache.get(_generation_key(restaurant_id), 0)
+
+
+async def _arestaurant_generation(restaurant_id):
+    return await cache.aget(_generation_key(restaurant_id), 0)
+
+
+def _row(instance):
+    return {field.attname: getattr(instance, field.attname) for field in instance._meta.concrete_fields}
+
+
+def _instance(model, row):
+    """Rebuild a model instance from cached column values (copied, so callers may mutate it)"""
+    names = list(row)
+    return model.from_db(DEFAULT_DB_ALIAS, names, [copy.deepcopy(row[name]) for name in names])
+
+
+def _cache_table(table):
+    _cache_set(f'table:{table.pk}', _row(table))
+
+
+async def _acache_table(table):
+    await _acache_set(f'table:{table.pk}', _row(table))
+
+
+def _cached_restaurant(cached, generation):
+    """The Restaurant of a cached (generation, row) entry, or None if missing or invalidated since"""
+    if cached is None or cached[0] != generation:
+        return None
+    return _instance(Restaurant, cached[1])
+
+
+def invalidate_restaurant(restaurant_id):
+    _cache_delete(f'restaurant:{restaurant_id}')
+    cache.set(_generation_key(restaurant_id), uuid.uuid4().hex, None)
+
+
+def invalidate_table(table_id):
+    _cache_delete(f'table:{table_id}')
+
+
+def clear_token_cache():
+    """Drop every locally cached entry (the shared cache expires on its own)"""
+    _local_cache.clear()
+
+
+def get_restaurant(restaurant_id):
+    """Return Restaurant by id, or None"""
+    generation = _restaurant_generation(restaurant_id)
+    restaurant = _cached_restaurant(_cache_get(f'restaurant:{restaurant_id}'), generation)
+    if restaurant is not None:
+        return restaurant
+
+    try:
+        restaurant = Restaurant.objects.get(id=restaurant_id)
+    except Restaurant.DoesNotExist:
+        return None
+    # Tagged with the generation read before the row, so an invalidation in between outdates it
+    _cache_set(f'restaurant:{restaurant.pk}', (generation, _row(restaurant)))
+    return restaurant
+
+
+def get_table(table_id):
+    """Return Table by id with .restaurant attached, or None"""
+    row = _cache_get(f'table:{table_id}')
+    if row is not None:
+        restaurant = get_restaurant(row['restaurant_id'])
+        if restaurant is not None:
+            table = _instance(Table, row)
+            table.restaurant = restaurant
+            return table
+
+    try:
+        table = Table.objects.select_related('restaurant').get(id=table_id)
+    except Table.DoesNotExist:
+        return None
+    _cache_table(table)
+    return table
+
+
+async def aget_restaurant(restaurant_id):
+    """Async get_restaurant() for the ASGI views"""
+    generation = await _arestaurant_generation(restaurant_id)
+    restaurant = _cached_restaurant(await _acache_get(f'restaurant:{restaurant_id}'), generation)
+    if restaurant is not None:
+        return restaurant
+
+    restaurant = await Restaurant.objects.filter(id=restaurant_id).afirst()
+    if restaurant is not None:
+        await _acache_set(f'restaurant:{restaurant.pk}', (generation, _row(restaurant)))
+    return restaurant
+
+
+async def aget_table(table_id):
+    """Async get_table() for the ASGI views"""
+    row = await _acache_get(f'table:{table_id}')
+    if row is not None:
+        restaurant = await aget_restaurant(row['restaurant_id'])
+        if restaurant is not None:
+            table = _instance(Table, row)
+            table.restaurant = restaurant
+            return table
+
+    table = await Table.objects.select_related('restaurant').filter(id=table_id).afirst()
+    if table is not None:
+        await _acache_table(table)
+    return table
+
+
+def get_restaurant_from_admin_token(admin_token):
+    """Resolve an admin token to its Restaurant, or None"""
+    admin_token_hash = Restaurant.hash_token(admin_token)
+    key = f'token:admin:{admin_token_hash}'
+
+    restaurant_id = _cache_get(key)
+    if restaurant_id is not None:
+        restaurant = get_restaurant(restaurant_id)
+        if restaurant is not None and restaurant.admin_token_hash == admin_token_hash:
+            return restaurant
+        _cache_delete(key)
+
+    try:
+        restaurant = Restaurant.objects.get(admin_token_hash=admin_token_hash)
+    except Restaurant.DoesNotExist:
+        return None
+    _cache_set(key, restaurant.pk)  # The row is cached by get_restaurant(), which knows its generation
+    return restaurant
 
 
 class AdminTokenAuthentication(BaseAuthentication):
@@ -9,19 +206,21 @@ class AdminTokenAuthentication(BaseAuthentication):
     """
     def authenticate(self, request):
         admin_token = request.headers.get('X-Admin-Token')
-        
+
         if not admin_token:
             return None
-        
-        admin_token_hash = Restaurant.hash_token(admin_token)
-        
-        try:
-            restaurant = Restaurant.objects.get(admin_token_hash=admin_token_hash)
-            # Store restaurant in request for use in views
-            return (restaurant, admin_token)
-        except Restaurant.DoesNotExist:
+
+        restaurant = get_restaurant_from_admin_token(admin_token)
+        if restaurant is None:
             raise AuthenticationFailed('Invalid admin token')
 
+        # Store restaurant in request for use in views
+        return (restaurant, admin_token)
+
+    def authenticate_header(self, request):
+        # Makes a missing token a 401 rather than a 403 (see permissions.IsRestaurantAdmin)
+        return 'X-Admin-Token'
+
 
 def get_restaurant_from_table_token(table_token):
     """
@@ -29,9 +228,39 @@ def get_restaurant_from_table_token(table_token):
     Returns (restaurant, table) tuple
     """
     table_token_hash = Table.hash_token(table_token)
-    
+    key = f'token:table:{table_token_hash}'
+
+    table_id = _cache_get(key)
+    if table_id is not None:
+        table = get_table(table_id)
+        if table is not None and table.table_token_hash == table_token_hash:
+            return table.restaurant, table
+        _cache_delete(key)
+
     try:
         table = Table.objects.select_related('restaurant').get(table_token_hash=table_token_hash)
-        return table.restaurant, table
     except Table.DoesNotExist:
         return None, None
+    _cache_table(table)
+    _cache_set(key, table.pk)
+    return table.restaurant, table
+
+
+async def aget_restaurant_from_table_token(table_token):
+    """Async get_restaurant_from_table_token() for the ASGI views"""
+    table_token_hash = Table.hash_token(table_token)
+    key = f'token:table:{table_token_hash}'
+
+    table_id = await _acache_get(key)
+    if table_id is not None:
+        table = await aget_table(table_id)
+        if table is not None and table.table_token_hash == table_token_hash:
+            return table.restaurant, table
+        await _acache_delete(key)
+
+    table = await Table.objects.select_related('restaurant').filter(table_token_hash=table_token_hash).afirst()
+    if table is None:
+        return None, None
+    await _acache_table(table)
+    await _acache_set(key, table.pk)
+    return table.restaurant, table
@@ -0,0 +1,106 @@
+"""
+Closed-bill history export (accounting) as JSON Lines or CSV, across live and archived bills
+"""
+import csv
+import json
+
+from django.db.models import Q
+
+from .menu_io import Echo, aiter_chunks
+from .models import closed_bills
+from .renderers import FastJSONRenderer
+
+
+PAGE_SIZE = 500  # Bills per keyset page; their lines and payments are read with one query each
+
+BILL_COLUMNS = ['id', 'table_id', 'created_at', 'closed_at', 'subtotal_cents', 'tax_cents',
+                'service_fee_cents', 'tip_cents', 'total_cents', 'paid_cents']
+LINE_COLUMNS = ['id', 'bill_id', 'item_id', 'name_snapshot', 'options_snapshot', 'qty',
+                'unit_price_cents', 'line_total_cents', 'session_id', 'ordered_at']
+PAYMENT_COLUMNS = ['id', 'bill_id', 'status', 'amount_cents', 'provider', 'provider_ref',
+                   'session_id', 'created_at']
+
+# One CSV layout for all three record kinds; each row fills the columns of its kind
+CSV_COLUMNS = [
+    'record', 'bill_id', 'table_id', 'bill_created_at', 'closed_at', 'subtotal_cents', 'tax_cents',
+    'service_fee_cents', 'tip_cents', 'total_cents', 'paid_cents',
+    'line_id', 'item_id', 'name', 'options', 'qty', 'unit_price_cents', 'line_total_cents',
+    'payment_id', 'status', 'amount_cents', 'provider', 'provider_ref', 'session_id', 'at',
+]
+
+
+def bill_pages(bills):
+    """
+    Yield lists of bill rows ordered by (closed_at, id), each with its 'lines' and 'payments'.
+    Keyset pagination on the restaurant/closed_at index, so every page costs the same.
+    """
+    Line = bills.model._meta.get_field('lines').related_model
+    Payment = bills.model._meta.get_field('payments').related_model
+    bills = bills.order_by('closed_at', 'id').values(*BILL_COLUMNS)
+    after = None
+    while True:
+        page = bills
+        if after is not None:
+            page = page.filter(Q(closed_at__gt=after[0]) | Q(closed_at=after[0], id__gt=after[1]))
+        page = list(page[:PAGE_SIZE])
+        if not page:
+            return
+        after = page[-1]['closed_at'], page[-1]['id']
+
+        by_id = {}
+        for bill in page:
+            bill['lines'], bill['payments'] = [], []
+            by_id[bill['id']] = bill
+        for line in Line.objects.filter(bill_id__in=by_id).order_by('id').values(*LINE_COLUMNS):
+            by_id[line['bill_id']]['lines'].append(line)
+        for payment in Payment.objects.filter(bill_id__in=by_id).order_by('id').values(*PAYMENT_COLUMNS):
+            by_id[payment['bill_id']]['payments'].append(payment)
+        yield page
+
+
+def csv_rows(bill):
+    """The bill's CSV rows: the bill itself, then one per line and per payment"""
+    yield {
+        'record': 'bill', 'bill_id': bill['id'], 'table_id': bill['table_id'],
+        'bill_created_at': bill['created_at'].isoformat(), 'closed_at': bill['closed_at'].isoformat(),
+        **{column: bill[column] for column in BILL_COLUMNS[4:]},
+    }
+    for line in bill['lines']:
+        yield {
+            'record': 'line', 'bill_id': bill['id'], 'line_id': line['id'], 'item_id': line['item_id'],
+            'name': line['name_snapshot'], 'options': json.dumps(line['options_snapshot']),
+            'qty': line['qty'], 'unit_price_cents': line['unit_price_cents'],
+            'line_total_cents': line['line_total_cents'], 'session_id': line['session_id'],
+            'at': line['ordered_at'].isoformat(),
+        }
+    for payment in bill['payments']:
+        yield {
+            'record': 'payment', 'bill_id': bill['id'], 'payment_id': payment['id'],
+            'status': payment['status'], 'amount_cents': payment['amount_cents'],
+            'provider': payment['provider'], 'provider_ref': payment['provider_ref'],
+            'session_id': payment['session_id'], 'at': payment['created_at'].isoformat(),
+        }
+
+
+def export_bills(restaurant, start, end, fmt):
+    """
+    Yield the restaurant's bills closed in [start, end), with lines and payments, as encoded
+    chunks of one page each: archived bills first, then live ones, each in close order
+    """
+    renderer = FastJSONRenderer()
+    writer = csv.DictWriter(Echo(), CSV_COLUMNS)
+    if fmt == 'csv':
+        yield writer.writerow(dict(zip(CSV_COLUMNS, CSV_COLUMNS))).encode()
+
+    for bills in reversed(closed_bills(restaurant=restaurant, closed_at__gte=start, closed_at__lt=end)):
+        for page in bill_pages(bills):
+            if fmt == 'csv':
+                chunk = ''.join(writer.writerow(row) for bill in page for row in csv_rows(bill)).encode()
+            else:
+                chunk = b''.join(renderer.render(bill) + b'\n' for bill in page)
+            yield chunk
+
+
+def aexport_bills(restaurant, start, end, fmt):
+    """export_bills() as an async iterator, for streaming under ASGI"""
+    return aiter_chunks(export_bills(restaurant, start, end, fmt))
@@ -0,0 +1,143 @@
+"""
+Caching helpers for hot public read paths
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+from django.utils.http import parse_etags
+
+from .renderers import FastJSONRenderer
+from .serializers import menu_data
+
+
+MENU_CACHE_TIMEOUT = 60 * 60 * 24  # Keys are versioned, so this only bounds memory
+BUILD_LOCK_TIMEOUT = 10  # Seconds another worker waits for a rebuild before doing its own
+
+
+class TTLCache:
+    """
+    Thread-safe in-process LRU cache whose entries expire ttl seconds after being set
+    """
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+_inflight = {}
+_inflight_guard = threading.Lock()
+
+
+def _inflight_lock(key):
+    with _inflight_guard:
+        lock = _inflight.get(key)
+        if lock is None:
+            lock = _inflight[key] = threading.Lock()
+        return lock
+
+
+def get_or_build(key, build, timeout):
+    """
+    Return cache[key], calling build() on a miss.
+    Concurrent misses are collapsed: threads in this process queue on a local lock,
+    other processes sharing the cache wait on a cache.add() lock for the winner's result.
+    """
+    value = cache.get(key)
+    if value is not None:
+        return value
+
+    with _inflight_lock(key):
+        value = cache.get(key)
+        if value is not None:
+            return value
+
+        lock_key = f'{key}:lock'
+        acquired = cache.add(lock_key, 1, BUILD_LOCK_TIMEOUT)
+        if not acquired:
+            deadline = time.monotonic() + BUILD_LOCK_TIMEOUT
+            while time.monotonic() < deadline:
+                time.sleep(0.05)
+                value = cache.get(key)
+                if value is not None:
+                    return value
+
+        try:
+            value = build()
+            cache.set(key, value, timeout)
+        finally:
+            if acquired:
+                cache.delete(lock_key)
+            with _inflight_guard:
+                _inflight.pop(key, None)
+
+    return value
+
+
+def etag_matches(request, etag):
+    """True if the request's If-None-Match header covers etag"""
+    if_none_match = request.headers.get('If-None-Match')
+    if not if_none_match:
+        return False
+    etags = parse_etags(if_none_match)
+    return '*' in etags or etag in etags
+
+
+def menu_cache_key(restaurant_id, version):
+    return f'menu:{restaurant_id}:v{version}'
+
+
+def get_menu_payload(restaurant):
+    """
+    Return (etag, body) for the restaurant's public menu at its current menu_version.
+    The body is the exact JSON the serializer path renders.
+    """
+    def build():
+        body = FastJSONRenderer().render(menu_data(restaurant.id))
+        etag = '"%s"' % hashlib.sha256(body).hexdigest()[:32]
+        return etag, body
+
+    return get_or_build(
+        menu_cache_key(restaurant.id, restaurant.menu_version),
+        build,
+        MENU_CACHE_TIMEOUT,
+    )
+
+
+async def aget_menu_payload(restaurant):
+    """Async get_menu_payload(): a cache hit needs no thread; a miss builds in one"""
+    value = await cache.aget(menu_cache_key(restaurant.id, restaurant.menu_version))
+    if value is not None:
+        return value
+    return await sync_to_async(get_menu_payload)(restaurant)
@@ -0,0 +1,110 @@
+"""
+Idempotency-Key support for retry-prone POST endpoints
+"""
+import functools
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction, IntegrityError
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+
+IDEMPOTENCY_KEY_TTL = getattr(settings, 'IDEMPOTENCY_KEY_TTL', 24 * 60 * 60)  # Seconds
+
+
+CONFLICT_ERROR = {'error': 'Idempotency-Key was already used with a different request'}
+
+
+def _request_hash(data):
+    body = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def _replay(record):
+    response = Response(record.response_body, status=record.response_status)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _claim(scope, key, request_hash):
+    """
+    Insert the key row, or find the one an earlier request with the same key stored.
+    Call inside transaction.atomic(). Returns (record, None) to go ahead or (None, existing).
+    """
+    for attempt in range(2):
+        try:
+            with transaction.atomic():
+                record = IdempotencyKey.objects.create(
+                    scope=scope,
+                    key=key,
+                    request_hash=request_hash,
+                    expires_at=timezone.now() + timedelta(seconds=IDEMPOTENCY_KEY_TTL),
+                )
+            return record, None
+        except IntegrityError:
+            # The first request has committed (we blocked on the unique index until it did)
+            existing = IdempotencyKey.objects.get(scope=scope, key=key)
+            if existing.expires_at <= timezone.now() and attempt == 0:
+                existing.delete()
+                continue
+            return None, existing
+
+
+def idempotent(view_method):
+    """
+    Decorator for APIView handlers. With an Idempotency-Key header, the first request runs
+    and its response is stored; repeats of the same key on the same path get the stored
+    response without re-executing. A concurrent repeat waits for the first to commit.
+    Requests without the header run as before.
+    """
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get('Idempotency-Key')
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > 255:
+            return Response({'error': 'Idempotency-Key too long'}, status=status.HTTP_400_BAD_REQUEST)
+
+        request_hash = _request_hash(request.data)
+        with transaction.atomic():
+            record, existing = _claim(request.path, key, request_hash)
+            if existing is not None:
+                if existing.request_hash != request_hash:
+                    return Response(CONFLICT_ERROR, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+                return _replay(existing)
+
+            # Errors raised here roll back the key too, so the client can retry
+            response = view_method(self, request, *args, **kwargs)
+            record.response_status = response.status_code
+            record.response_body = response.data
+            record.save(update_fields=['response_status', 'response_body'])
+            return response
+
+    return wrapper
+
+
+def run_idempotent(scope, key, data, call):
+    """
+    Function form of @idempotent for code outside DRF views (the async API runs it through
+    sync_to_async). call() returns (body, status) and runs in the transaction that stores it.
+    Returns (body, status, replayed).
+    """
+    request_hash = _request_hash(data)
+    with transaction.atomic():
+        record, existing = _claim(scope, key, request_hash)
+        if existing is not None:
+            if existing.request_hash != request_hash:
+                return CONFLICT_ERROR, status.HTTP_422_UNPROCESSABLE_ENTITY, False
+            return existing.response_body, existing.response_status, True
+
+        body, response_status = call()
+        record.response_status = response_status
+        record.response_body = body
+        record.save(update_fields=['response_status', 'response_body'])
+        return body, response_status, False
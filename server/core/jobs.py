@@ -0,0 +1,123 @@
+"""
+Lightweight DB-backed job queue.
+
+Handlers are registered with @job (see core.tasks), enqueued with enqueue() inside the request's
+transaction and run by the run_jobs management command on a thread pool. A failed job is retried
+with exponential backoff until max_attempts, then kept as failed with its traceback. The worker
+renews claimed_at of its running jobs (heartbeat), so only jobs of a dead worker are released.
+"""
+import random
+import traceback
+import uuid
+from collections import namedtuple
+from datetime import timedelta
+
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+
+# concurrency: most jobs of the kind running at once per worker (None: only the pool size limits it)
+# backoff: seconds before the first retry, doubled for each one after
+JobSpec = namedtuple('JobSpec', ['func', 'max_attempts', 'concurrency', 'backoff'])
+
+
+REGISTRY = {}
+
+
+def job(kind=None, max_attempts=5, concurrency=None, backoff=30):
+    """Register a function as the handler for a job kind (default: the function name)"""
+    def register(func):
+        REGISTRY[kind or func.__name__] = JobSpec(func, max_attempts, concurrency, backoff)
+        return func
+    return register
+
+
+def enqueue(kind, run_at=None, **payload):
+    """
+    Create a job for the registered kind; payload becomes its handler's keyword arguments
+    and must be JSON serializable. Call inside the transaction of the write it belongs to.
+    """
+    spec = REGISTRY[kind]
+    return Job.objects.create(kind=kind, payload=payload, max_attempts=spec.max_attempts, run_at=run_at or timezone.now())
+
+
+def claim(capacity, limit, worker_id):
+    """
+    Claim up to limit due jobs for this worker, at most capacity[kind] of each kind (None: no
+    limit of its own). One SELECT over the due index and one conditional UPDATE, which makes a
+    job already taken by another worker simply drop out of the batch. Returns the claimed jobs
+    with attempts counted.
+    """
+    capacity = {kind: slots for kind, slots in capacity.items() if slots is None or slots > 0}
+    if not capacity or limit < 1:
+        return []
+
+    due = Job.objects.filter(status='queued', kind__in=capacity, run_at__lte=timezone.now())
+    ids = []
+    for job_id, kind in due.order_by('run_at', 'id').values_list('id', 'kind')[:limit]:
+        if capacity[kind] is None:
+            ids.append(job_id)
+        elif capacity[kind] > 0:
+            capacity[kind] -= 1
+            ids.append(job_id)
+    if not ids:
+        return []
+
+    token = f'{worker_id}:{uuid.uuid4().hex[:12]}'
+    Job.objects.filter(id__in=ids, status='queued').update(
+        status='running', claimed_by=token, claimed_at=timezone.now(), attempts=F('attempts') + 1,
+    )
+    return list(Job.objects.filter(id__in=ids, claimed_by=token).order_by('run_at', 'id'))
+
+
+def run(job):
+    """
+    Run one claimed job and record the outcome. Returns 'done', 'retry' or 'failed'.
+    Outcomes are written only while this worker still holds the claim.
+    """
+    spec = REGISTRY.get(job.kind)
+    mine = Job.objects.filter(pk=job.pk, claimed_by=job.claimed_by)
+    try:
+        if spec is None:
+            raise LookupError(f'No handler registered for job kind {job.kind!r}')
+        spec.func(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        if spec is not None and job.attempts < job.max_attempts:
+            # Exponential backoff with jitter, so failures from one outage don't retry in lockstep
+            delay = spec.backoff * 2 ** (job.attempts - 1) * random.uniform(1, 1.25)
+            mine.update(status='queued', run_at=timezone.now() + timedelta(seconds=delay),
+                        claimed_by='', claimed_at=None, last_error=error)
+            return 'retry'
+        mine.update(status='failed', finished_at=timezone.now(), last_error=error)
+        return 'failed'
+
+    mine.update(status='done', finished_at=timezone.now())
+    return 'done'
+
+
+def heartbeat(jobs):
+    """
+    Mark claimed jobs as still running: their worker is alive, so requeue_stale must leave
+    them alone however long they take. Jobs whose claim was lost are not touched.
+    """
+    if jobs:
+        Job.objects.filter(
+            pk__in=[job.pk for job in jobs], status='running', claimed_by__in={job.claimed_by for job in jobs},
+        ).update(claimed_at=timezone.now())
+
+
+def requeue_stale(timeout):
+    """
+    Release jobs with no heartbeat for timeout seconds, whose worker has presumably died:
+    queued again, or failed if that was their last attempt. Returns how many were released.
+    """
+    stale = Job.objects.filter(status='running', claimed_at__lt=timezone.now() - timedelta(seconds=timeout))
+    error = 'Worker stopped before the job finished'
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status='failed', finished_at=timezone.now(), last_error=error,
+    )
+    queued = stale.update(status='queued', claimed_by='', claimed_at=None, last_error=error)
+    return failed + queued
@@ -0,0 +1,68 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from core.models import Bill, BillLine, Payment, ArchivedBill, ArchivedBillLine, ArchivedPayment
+
+
+def copy_rows(source_rows, archive_model):
+    """Unsaved archive instances with the same column values (and ids) as the live rows"""
+    names = [field.attname for field in archive_model._meta.concrete_fields if field.name != 'archived_at']
+    return [archive_model(**{name: getattr(row, name) for name in names}) for row in source_rows]
+
+
+class Command(BaseCommand):
+    help = 'Move closed bills older than --days, with their lines and payments, into the archive tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90, help='Archive bills closed more than this many days ago')
+        parser.add_argument('--batch-size', type=int, default=500, help='Bills moved per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Only count what would be archived')
+        parser.add_argument('--every', type=int, help='Keep running, archiving every this many seconds')
+
+    def handle(self, *args, **options):
+        while True:
+            self.archive(options)
+            if not options['every']:
+                return
+            time.sleep(options['every'])
+
+    def archive(self, options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        candidates = Bill.objects.filter(is_open=False, closed_at__lt=cutoff)
+
+        if options['dry_run']:
+            self.stdout.write(f'Would archive {candidates.count()} bills closed before {cutoff:%Y-%m-%d %H:%M}')
+            return
+
+        archived = lines = payments = 0
+        last_id = 0
+        while True:
+            ids = list(
+                candidates.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:options['batch_size']]
+            )
+            if not ids:
+                break
+            last_id = ids[-1]
+
+            with transaction.atomic():
+                # Lock and re-check, so a bill is copied exactly as it is deleted
+                bills = list(Bill.objects.select_for_update().filter(id__in=ids, is_open=False).order_by('id'))
+                ids = [bill.id for bill in bills]
+                bill_lines = list(BillLine.objects.filter(bill_id__in=ids))
+                bill_payments = list(Payment.objects.filter(bill_id__in=ids))
+
+                ArchivedBill.objects.bulk_create(copy_rows(bills, ArchivedBill))
+                ArchivedBillLine.objects.bulk_create(copy_rows(bill_lines, ArchivedBillLine))
+                ArchivedPayment.objects.bulk_create(copy_rows(bill_payments, ArchivedPayment))
+                # Lines, payments and stream events go with the bill (CASCADE)
+                Bill.objects.filter(id__in=ids).delete()
+
+            archived += len(bills)
+            lines += len(bill_lines)
+            payments += len(bill_payments)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Archived {archived} bills ({lines} lines, {payments} payments) closed before {cutoff:%Y-%m-%d %H:%M}'
+        ))
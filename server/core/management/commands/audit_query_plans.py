@@ -0,0 +1,133 @@
+import re
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+from core.authentication import clear_token_cache
+from core.models import Restaurant, Table, MenuItem, Bill
+
+
+# SQLite: "SCAN core_bill" is a full table scan; "SEARCH ... USING INDEX" is not
+SQLITE_SCAN = re.compile(r'^SCAN (\w+)(?! USING (?:COVERING )?INDEX)')
+POSTGRES_SCAN = re.compile(r'Seq Scan on (\w+)')
+
+
+class Command(BaseCommand):
+    help = (
+        'Run every API endpoint against the current database, EXPLAIN each query it issues '
+        'and flag sequential scans on tables larger than --min-rows'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--restaurant', type=int, help='Restaurant id to exercise (default: most recently billed)')
+        parser.add_argument('--min-rows', type=int, default=1000,
+                            help='Ignore scans of tables smaller than this; planners prefer scans on tiny tables')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every plan, not just flagged ones')
+
+    def handle(self, *args, **options):
+        restaurant, table, item = self.sample(options['restaurant'])
+        endpoints = self.endpoints(table, item)
+
+        self.row_counts = {}
+        self.table_names = set(connection.introspection.table_names())
+        flagged = 0
+        # Bypass the menu/token caches so each endpoint issues its cold-path queries;
+        # writes are rolled back at the end.
+        with override_settings(
+            ALLOWED_HOSTS=['*'],
+            CACHES={'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}},
+        ), transaction.atomic():
+            client = APIClient()
+            for name, method, path, data, admin in endpoints:
+                clear_token_cache()
+                client.force_authenticate(user=restaurant if admin else None)
+                with CaptureQueriesContext(connection) as captured:
+                    response = getattr(client, method)(path, data=data, format='json')
+                self.stdout.write(f'{name}: HTTP {response.status_code}, {len(captured)} queries')
+                for query in captured:
+                    flagged += self.explain(query['sql'], options)
+            transaction.set_rollback(True)
+
+        if flagged:
+            raise CommandError(f'{flagged} sequential scan(s) on large tables')
+        self.stdout.write(self.style.SUCCESS('✓ No sequential scans on large tables'))
+
+    def sample(self, restaurant_id):
+        if restaurant_id:
+            restaurant = Restaurant.objects.filter(id=restaurant_id).first()
+        else:
+            latest = Bill.objects.order_by('-id').values_list('restaurant_id', flat=True).first()
+            restaurant = Restaurant.objects.filter(id=latest).first() if latest else Restaurant.objects.first()
+        if restaurant is None:
+            raise CommandError('No restaurant found; run the seed command first')
+
+        table = (
+            Table.objects.filter(restaurant=restaurant, bills__is_open=True).first()
+            or Table.objects.filter(restaurant=restaurant).first()
+        )
+        item = MenuItem.objects.filter(restaurant=restaurant, available=True).first()
+        if table is None or item is None:
+            raise CommandError(f'Restaurant {restaurant.id} needs at least one table and one available menu item')
+        return restaurant, table, item
+
+    @staticmethod
+    def endpoints(table, item):
+        """(name, method, path, data, admin) for each endpoint; payment runs last since it may close the bill"""
+        bill_path = f'/api/public/tables/{table.id}/bill'
+        return [
+            ('table-context', 'get', f'/api/public/table-context/{table.table_token}', None, False),
+            ('public-menu', 'get', f'/api/public/menu/{table.table_token}', None, False),
+            ('table-bill', 'get', bill_path, None, False),
+            ('table-bill-sessions', 'get', f'{bill_path}/sessions', None, False),
+            ('add-bill-item', 'post', f'{bill_path}/items', {'itemId': item.id, 'sessionId': 'audit'}, False),
+            ('add-bill-items-batch', 'post', f'{bill_path}/items/batch',
+             {'items': [{'itemId': item.id}, {'itemId': item.id, 'qty': 2}], 'sessionId': 'audit'}, False),
+            ('admin-dashboard', 'get', '/api/admin/dashboard', None, True),
+            ('admin-orders', 'get', '/api/admin/orders', None, True),
+            ('admin-orders-filtered', 'get', f'/api/admin/orders?table={table.id}', None, True),
+            ('admin-kitchen-queue', 'get', '/api/admin/kitchen/queue', None, True),
+            ('admin-categories', 'get', '/api/admin/menu/categories', None, True),
+            ('admin-items', 'get', '/api/admin/menu/items', None, True),
+            ('admin-tables', 'get', '/api/admin/tables', None, True),
+            ('admin-settings', 'get', '/api/admin/settings', None, True),
+            ('payment-intent', 'post', f'/api/public/tables/{table.id}/payment/intent',
+             {'mode': 'mine_only', 'sessionId': 'audit'}, False),
+        ]
+
+    def explain(self, sql, options):
+        """EXPLAIN one captured statement; return how many large-table scans it has"""
+        if not sql.lstrip().upper().startswith(('SELECT', 'UPDATE', 'DELETE')):
+            return 0
+
+        if connection.vendor == 'postgresql':
+            explain, pattern = 'EXPLAIN ', POSTGRES_SCAN
+        elif connection.vendor == 'sqlite':
+            explain, pattern = 'EXPLAIN QUERY PLAN ', SQLITE_SCAN
+        else:
+            raise CommandError(f'Unsupported database vendor: {connection.vendor}')
+
+        with connection.cursor() as cursor:
+            cursor.execute(explain + sql)
+            plan = [str(row[-1]) for row in cursor.fetchall()]
+
+        flagged = 0
+        for line in plan:
+            match = pattern.search(line.strip())
+            if match and self.row_count(match.group(1)) >= options['min_rows']:
+                flagged += 1
+        if flagged or options['verbose_plans']:
+            style = self.style.ERROR if flagged else self.style.NOTICE
+            self.stdout.write(style(f'  {sql[:200]}'))
+            for line in plan:
+                self.stdout.write(f'    {line}')
+        return flagged
+
+    def row_count(self, table_name):
+        """Rows in the table; 0 for plan names that are not tables (SQLite's "SCAN subquery")"""
+        if table_name not in self.table_names:
+            return 0
+        if table_name not in self.row_counts:
+            with connection.cursor() as cursor:
+                cursor.execute(f'SELECT COUNT(*) FROM {connection.ops.quote_name(table_name)}')
+                self.row_counts[table_name] = cursor.fetchone()[0]
+        return self.row_counts[table_name]
@@ -0,0 +1,134 @@
+from collections import defaultdict
+from itertools import chain
+from datetime import datetime, time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from core.models import RevenueRollup, closed_bills
+
+ROLLUP_FIELDS = ['revenue_cents', 'tax_cents', 'service_fee_cents', 'tip_cents', 'bill_count', 'covers']
+
+
+def rollup_totals(querysets, chunk_size):
+    """
+    Stream the closed bills of querysets and sum them per (restaurant_id, granularity, bucket_start).
+    Returns (totals, bill_count).
+    """
+    totals = defaultdict(lambda: defaultdict(int))
+    rows = chain.from_iterable(
+        bills.annotate(
+            session_count=Count('lines__session_id', distinct=True)
+        ).values_list(
+            'restaurant_id', 'closed_at', 'total_cents', 'tax_cents', 'service_fee_cents', 'tip_cents', 'session_count'
+        ).iterator(chunk_size=chunk_size)
+        for bills in querysets
+    )
+
+    bill_count = 0
+    for restaurant_id, closed_at, total, tax, service_fee, tip, sessions in rows:
+        bill_count += 1
+        for bucket in RevenueRollup.buckets(closed_at):
+            bucket_totals = totals[(restaurant_id,) + bucket]
+            bucket_totals['revenue_cents'] += total
+            bucket_totals['tax_cents'] += tax
+            bucket_totals['service_fee_cents'] += service_fee
+            bucket_totals['tip_cents'] += tip
+            bucket_totals['bill_count'] += 1
+            bucket_totals['covers'] += max(sessions, 1)
+    return totals, bill_count
+
+
+class Command(BaseCommand):
+    help = 'Rebuild daily and hourly revenue rollups from closed bills, live and archived'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--restaurant', type=int, help='Only this restaurant id')
+        parser.add_argument('--since', help='Only bills closed on or after this date (YYYY-MM-DD)')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        # Buckets before today's local midnight no longer change, so they are replaced wholesale.
+        # Today's buckets are still being added to by record_close and are rebuilt under a lock
+        cutoff = timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
+        filters = {'closed_at__lt': cutoff}
+        rollups = RevenueRollup.objects.filter(bucket_start__lt=cutoff)
+
+        if options['restaurant']:
+            filters['restaurant_id'] = options['restaurant']
+            rollups = rollups.filter(restaurant_id=options['restaurant'])
+
+        since = None
+        if options['since']:
+            since = parse_date(options['since'])
+            if since is None:
+                raise CommandError('--since must be a date (YYYY-MM-DD)')
+            since = timezone.make_aware(datetime.combine(since, time.min))
+            filters['closed_at__gte'] = since
+            rollups = rollups.filter(bucket_start__gte=since)
+
+        # Scan and replace in one transaction. On PostgreSQL it reads a single snapshot, so a bill
+        # the archiver moves mid-scan is counted once, not in both or neither of its tables
+        repeatable_read = connection.vendor == 'postgresql' and not connection.in_atomic_block
+        with transaction.atomic():
+            if repeatable_read:
+                with connection.cursor() as cursor:
+                    cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ')
+
+            totals, bill_count = rollup_totals(closed_bills(**filters), options['chunk_size'])
+            rollups.delete()
+            RevenueRollup.objects.bulk_create([
+                RevenueRollup(restaurant_id=restaurant_id, granularity=granularity, bucket_start=bucket_start, **amounts)
+                for (restaurant_id, granularity, bucket_start), amounts in totals.items()
+            ], batch_size=options['chunk_size'])
+        bucket_count = len(totals)
+
+        if since is None or since <= cutoff:
+            today_bills, today_buckets = self.rebuild_today(cutoff, options['restaurant'], options['chunk_size'])
+            bill_count += today_bills
+            bucket_count += today_buckets
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Rolled up {bill_count} bills into {bucket_count} buckets'))
+
+    @staticmethod
+    def rebuild_today(cutoff, restaurant_id, chunk_size):
+        """
+        Recompute today's buckets from closed_bills() with their rows locked. A close that
+        committed before the lock is in the scan; one still in flight waits on the day row,
+        then adds itself to the rebuilt totals. Returns (bill_count, bucket_count).
+        """
+        filters = {'closed_at__gte': cutoff}
+        today = RevenueRollup.objects.filter(bucket_start__gte=cutoff)
+        if restaurant_id:
+            filters['restaurant_id'] = restaurant_id
+            today = today.filter(restaurant_id=restaurant_id)
+
+        # Read committed (the default), so the scan after the lock sees every close that got the lock first
+        with transaction.atomic():
+            # Give every bucket a bill has closed into a row to lock; closes lock the day row first, as here
+            hours = {
+                (restaurant, hour)
+                for bills in closed_bills(**filters)
+                for restaurant, closed_at in bills.values_list('restaurant_id', 'closed_at')
+                for granularity, hour in RevenueRollup.buckets(closed_at) if granularity == 'hour'
+            }
+            for restaurant, hour in sorted(hours):
+                RevenueRollup.add(restaurant, hour)
+
+            locked = {
+                (rollup.restaurant_id, rollup.granularity, rollup.bucket_start): rollup
+                for rollup in today.select_for_update().order_by('restaurant_id', 'granularity', 'bucket_start')
+            }
+            restaurants = {restaurant for restaurant, _, _ in locked}
+            totals, bill_count = rollup_totals(closed_bills(**filters, restaurant_id__in=restaurants), chunk_size)
+
+            # A bucket missing from locked was created since the first scan by live closes only, which counted themselves
+            now = timezone.now()
+            for key, rollup in locked.items():
+                amounts = totals.get(key, {})
+                for field in ROLLUP_FIELDS:
+                    setattr(rollup, field, amounts.get(field, 0))
+                rollup.updated_at = now  # bulk_update() skips auto_now
+            RevenueRollup.objects.bulk_update(locked.values(), ROLLUP_FIELDS + ['updated_at'], batch_size=chunk_size)
+        return bill_count, len(locked)
@@ -0,0 +1,132 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from core.authentication import get_restaurant_from_table_token
+from core.models import MenuItem
+from core.management.commands.loadtest import Stats
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the diner endpoints under WSGI (sync DRF views, gthread workers) and ASGI '
+        '(async views, uvicorn workers) with the same number of worker processes. Prints JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--table-token', default='rest1-1', help='Table to hit (run seed first)')
+        parser.add_argument('--workers', type=int, default=1, help='Worker processes for each server')
+        parser.add_argument('--threads', type=int, default=4, help='Threads per WSGI worker')
+        parser.add_argument('--concurrency', type=int, default=64, help='Concurrent clients')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds per server')
+        parser.add_argument('--writes', action='store_true', help='Also add an item to the bill every cycle')
+        parser.add_argument('--output', help='Also write the JSON report to this file')
+
+    def handle(self, *args, **options):
+        restaurant, table = get_restaurant_from_table_token(options['table_token'])
+        if table is None:
+            raise CommandError(f"Unknown table token {options['table_token']!r}; run the seed command first")
+        item = MenuItem.objects.filter(restaurant=restaurant, available=True).first()
+        if options['writes'] and item is None:
+            raise CommandError('--writes needs an available menu item')
+
+        bind = '127.0.0.1:{port}'
+        servers = {
+            'wsgi': ['server.wsgi:application', '-k', 'gthread', '--threads', str(options['threads'])],
+            'asgi': ['server.asgi:application', '-k', 'uvicorn.workers.UvicornWorker'],
+        }
+        report = {'config': {key: options[key] for key in (
+            'table_token', 'workers', 'threads', 'concurrency', 'duration', 'writes'
+        )}}
+        for name, args in servers.items():
+            port = free_port()
+            env = {
+                **os.environ,
+                'ASYNC_PUBLIC_API': 'True' if name == 'asgi' else 'False',
+                'ALLOWED_HOSTS': ','.join([*settings.ALLOWED_HOSTS, '127.0.0.1']),
+                'DEBUG': 'False',  # DEBUG keeps every query in memory
+            }
+            process = subprocess.Popen(
+                [sys.executable, '-m', 'gunicorn', *args, '-w', str(options['workers']),
+                 '-b', bind.format(port=port), '--log-level', 'warning'],
+                cwd=settings.BASE_DIR, env=env,
+            )
+            try:
+                base_url = f'http://127.0.0.1:{port}'
+                self.wait_until_up(base_url, process)
+                self.stdout.write(f'Benchmarking {name} on {base_url} for {options["duration"]}s...')
+                report[name] = self.run(base_url, table, item, options)
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+
+        output = json.dumps(report, indent=2)
+        self.stdout.write(output)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+
+    @staticmethod
+    def wait_until_up(base_url, process, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError('Server exited during startup; is gunicorn installed?')
+            try:
+                urllib.request.urlopen(f'{base_url}/api/', timeout=1)
+                return
+            except urllib.error.HTTPError:
+                return  # Any HTTP answer means it is serving
+            except OSError:
+                time.sleep(0.2)
+        raise CommandError(f'Server at {base_url} did not start within {timeout}s')
+
+    def run(self, base_url, table, item, options):
+        stats = Stats()
+        token = options['table_token']
+        requests = [
+            ('table-context', 'GET', f'/api/public/table-context/{token}', None),
+            ('public-menu', 'GET', f'/api/public/menu/{token}', None),
+            ('table-bill', 'GET', f'/api/public/tables/{table.id}/bill', None),
+        ]
+        if options['writes']:
+            requests.append(('add-bill-item', 'POST', f'/api/public/tables/{table.id}/bill/items',
+                             json.dumps({'itemId': item.id, 'qty': 1, 'sessionId': 'benchmark'}).encode()))
+
+        deadline = time.monotonic() + options['duration']
+
+        def client():
+            while time.monotonic() < deadline:
+                for name, method, path, body in requests:
+                    request = urllib.request.Request(f'{base_url}{path}', data=body, method=method,
+                                                     headers={'Content-Type': 'application/json'})
+                    started = time.perf_counter()
+                    try:
+                        with urllib.request.urlopen(request, timeout=30) as response:
+                            response.read()
+                            ok = True
+                    except OSError:
+                        ok = False
+                    stats.record(name, time.perf_counter() - started, ok)
+
+        started = time.perf_counter()
+        clients = [threading.Thread(target=client) for _ in range(options['concurrency'])]
+        for thread in clients:
+            thread.start()
+        for thread in clients:
+            thread.join()
+        return stats.report(time.perf_counter() - started)
@@ -0,0 +1,81 @@
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from core.authentication import get_restaurant_from_table_token
+from core.models import MenuCategory, MenuItem, Bill, BillLine
+from core.renderers import FastJSONRenderer
+from core.serializers import BillSerializer, MenuCategorySerializer, bill_data, menu_data
+
+
+class Command(BaseCommand):
+    help = (
+        'Microbenchmark the bill and menu responses: ModelSerializer + JSONRenderer against '
+        'the values()-based row serializers + FastJSONRenderer. Checks the bytes match.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--table-token', default='rest1-1', help='Table whose restaurant menu is used')
+        parser.add_argument('--lines', type=int, default=200, help='Lines on the benchmark bill')
+        parser.add_argument('--iterations', type=int, default=200)
+
+    def handle(self, *args, **options):
+        restaurant, table = get_restaurant_from_table_token(options['table_token'])
+        if table is None:
+            raise CommandError(f"Unknown table token {options['table_token']!r}; run the seed command first")
+        items = list(MenuItem.objects.filter(restaurant=restaurant))
+        if not items:
+            raise CommandError('The restaurant has no menu items')
+
+        report = {'iterations': options['iterations']}
+        # The benchmark bill is rolled back afterwards
+        with transaction.atomic():
+            bill = Bill.objects.create(restaurant=restaurant, table=table, is_open=False)
+            rng = random.Random(1)
+            BillLine.objects.bulk_create([
+                BillLine(
+                    bill=bill, restaurant=restaurant, item=item, name_snapshot=item.name, options_snapshot={'note': 'benchmark'},
+                    qty=1, unit_price_cents=item.price_cents, line_total_cents=item.price_cents,
+                    session_id=f'session-{n % 6}',
+                )
+                for n, item in enumerate(rng.choices(items, k=options['lines']))
+            ])
+            bill.recalculate_totals(restaurant)
+
+            report['bill'] = self.compare(
+                options['iterations'],
+                lambda: JSONRenderer().render(BillSerializer(bill).data),
+                lambda: FastJSONRenderer().render(bill_data(bill)),
+            )
+            report['bill']['lines'] = options['lines']
+            transaction.set_rollback(True)
+
+        report['menu'] = self.compare(
+            options['iterations'],
+            lambda: JSONRenderer().render(MenuCategorySerializer(
+                MenuCategory.objects.filter(restaurant=restaurant).prefetch_related('items'), many=True
+            ).data),
+            lambda: FastJSONRenderer().render(menu_data(restaurant.id)),
+        )
+        report['menu']['items'] = len(items)
+
+        self.stdout.write(json.dumps(report, indent=2))
+        if not all(report[name]['identical'] for name in ('bill', 'menu')):
+            raise CommandError('Fast path output differs from the serializer output')
+
+    @staticmethod
+    def compare(iterations, serializer_path, fast_path):
+        """Per-call milliseconds for each path (queries included) and whether their bytes match"""
+        identical = serializer_path() == fast_path()
+        timings = {}
+        for name, render in (('serializer_ms', serializer_path), ('fast_ms', fast_path)):
+            started = time.perf_counter()
+            for _ in range(iterations):
+                render()
+            timings[name] = round((time.perf_counter() - started) * 1000 / iterations, 3)
+        timings['speedup'] = round(timings['serializer_ms'] / timings['fast_ms'], 2) if timings['fast_ms'] else None
+        timings['identical'] = identical
+        return timings
@@ -0,0 +1,265 @@
+import json
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler, get_internal_wsgi_application
+from django.db import connection
+from django.test.utils import override_settings
+from django.urls import resolve, Resolver404
+from core.models import Restaurant, Table, MenuCategory, MenuItem
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class Stats:
+    """Thread-safe latency and query-count samples per endpoint"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.queries = defaultdict(list)
+
+    def record(self, name, seconds, ok):
+        with self.lock:
+            self.latencies[name].append(seconds * 1000)
+            if not ok:
+                self.errors[name] += 1
+
+    def record_queries(self, name, count):
+        with self.lock:
+            self.queries[name].append(count)
+
+    def report(self, duration):
+        endpoints = {}
+        for name in sorted(self.latencies):
+            latencies = sorted(self.latencies[name])
+            queries = sorted(self.queries.get(name, []))
+            endpoints[name] = {
+                'requests': len(latencies),
+                'errors': self.errors[name],
+                'rps': round(len(latencies) / duration, 2),
+                'p50_ms': round(percentile(latencies, 50), 2),
+                'p95_ms': round(percentile(latencies, 95), 2),
+                'p99_ms': round(percentile(latencies, 99), 2),
+                'queries_avg': round(sum(queries) / len(queries), 2) if queries else None,
+                'queries_max': queries[-1] if queries else None,
+            }
+        total = sum(len(values) for values in self.latencies.values())
+        return {
+            'duration_s': round(duration, 3),
+            'requests': total,
+            'errors': sum(self.errors.values()),
+            'rps': round(total / duration, 2),
+            'endpoints': endpoints,
+        }
+
+
+class Command(BaseCommand):
+    help = (
+        'Load test the diner and admin flows: N restaurants x M tables x K concurrent diners doing '
+        'scan -> menu -> add items -> pay while admin screens poll /api/admin/orders. '
+        'Prints per-endpoint latency percentiles, RPS and DB query counts as JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--restaurants', type=int, default=2)
+        parser.add_argument('--tables', type=int, default=5, help='Tables per restaurant')
+        parser.add_argument('--diners', type=int, default=4, help='Concurrent diners per table')
+        parser.add_argument('--items', type=int, default=3, help='Items each diner orders')
+        parser.add_argument('--admin-interval', type=float, default=1.0, help='Seconds between admin polls')
+        parser.add_argument('--max-workers', type=int, default=64, help='Diner threads')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--url', help='Target an already running server instead of an in-process one '
+                                          '(DB query counts are then unavailable)')
+        parser.add_argument('--output', help='Also write the JSON report to this file')
+
+    def handle(self, *args, **options):
+        self.stats = Stats()
+        self.random = random.Random(options['seed'])
+        fixtures = self.fixtures(options['restaurants'], options['tables'])
+
+        server = None
+        base_url = options['url']
+        if not base_url:
+            server = self.start_server()
+            # The in-process server answers on 127.0.0.1:<random port>
+            settings_override = override_settings(ALLOWED_HOSTS=['*'])
+            settings_override.enable()
+            base_url = f'http://127.0.0.1:{server.server_address[1]}'
+        base_url = base_url.rstrip('/')
+
+        try:
+            duration = self.run(base_url, fixtures, options)
+        finally:
+            if server:
+                server.shutdown()
+                server.server_close()
+                settings_override.disable()
+
+        report = self.stats.report(duration)
+        report['config'] = {key: options[key] for key in (
+            'restaurants', 'tables', 'diners', 'items', 'admin_interval', 'max_workers', 'seed'
+        )}
+        output = json.dumps(report, indent=2)
+        self.stdout.write(output)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+
+    def fixtures(self, restaurant_count, table_count):
+        """Load test restaurants with known tokens: admin 'loadtest-admin-<i>', tables 'lt<i>-<j>'"""
+        fixtures = []
+        for i in range(1, restaurant_count + 1):
+            admin_token = f'loadtest-admin-{i}'
+            restaurant, created = Restaurant.objects.get_or_create(
+                admin_token_hash=Restaurant.hash_token(admin_token),
+                defaults={'name': f'Load Test {i}', 'tax_rate': 0.0875, 'service_fee_rate': 0.03},
+            )
+            if created or not MenuItem.objects.filter(restaurant=restaurant).exists():
+                category = MenuCategory.objects.create(restaurant=restaurant, name='Load Test', position=1)
+                MenuItem.objects.bulk_create([
+                    MenuItem(restaurant=restaurant, category=category, name=f'Item {n}', price_cents=500 + 100 * n)
+                    for n in range(1, 9)
+                ])
+                restaurant.bump_menu_version()
+
+            table_tokens = []
+            for j in range(1, table_count + 1):
+                slug = f'lt{i}'
+                Table.objects.get_or_create(
+                    table_token_hash=Table.hash_token(f'{slug}-{j}'),
+                    defaults={'restaurant': restaurant, 'restaurant_slug': slug, 'table_number': str(j),
+                              'name': f'Load Test Table {j}'},
+                )
+                table_tokens.append(f'{slug}-{j}')
+            fixtures.append((admin_token, table_tokens))
+        return fixtures
+
+    def start_server(self):
+        application = get_internal_wsgi_application()
+        stats = self.stats
+
+        def counting_application(environ, start_response):
+            # Count queries per resolved URL name on the server thread handling the request
+            queries = []
+
+            def count(execute, sql, params, many, context):
+                queries.append(1)
+                return execute(sql, params, many, context)
+
+            with connection.execute_wrapper(count):
+                response = application(environ, start_response)
+            try:
+                stats.record_queries(resolve(environ['PATH_INFO']).url_name, len(queries))
+            except Resolver404:
+                pass
+            return response
+
+        server = ThreadedWSGIServer(('127.0.0.1', 0), QuietRequestHandler)
+        server.set_app(counting_application)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    def request(self, base_url, name, method, path, body=None, headers=None, ok_statuses=(200, 201)):
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(f'{base_url}{path}', data=data, method=method, headers={
+            'Content-Type': 'application/json', **(headers or {}),
+        })
+        started = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                status, payload = response.status, response.read()
+        except urllib.error.HTTPError as error:
+            status, payload = error.code, error.read()
+        except OSError:
+            status, payload = None, b''
+        self.stats.record(name, time.perf_counter() - started, status in ok_statuses)
+        try:
+            return status, json.loads(payload) if payload else None
+        except ValueError:
+            return status, None
+
+    def diner(self, base_url, table_token, session_id, item_count, table_done):
+        status, context = self.request(base_url, 'table-context', 'GET', f'/api/public/table-context/{table_token}')
+        if status != 200:
+            return
+        table_id = context['tableId']
+        status, menu = self.request(base_url, 'public-menu', 'GET', f'/api/public/menu/{table_token}')
+        item_ids = [item['id'] for category in (menu or []) for item in category['items'] if item['available']]
+        if not item_ids:
+            return
+
+        for _ in range(item_count):
+            self.request(base_url, 'add-bill-item', 'POST', f'/api/public/tables/{table_id}/bill/items', {
+                'itemId': self.random.choice(item_ids), 'qty': 1, 'sessionId': session_id,
+            })
+        self.request(base_url, 'table-bill', 'GET', f'/api/public/tables/{table_id}/bill')
+        self.request(base_url, 'payment-intent', 'POST', f'/api/public/tables/{table_id}/payment/intent', {
+            'mode': 'mine_only', 'sessionId': session_id, 'tip': 100,
+        }, ok_statuses=(201, 404))
+
+        # The last diner at the table settles whatever rounding left on the bill
+        if table_done():
+            self.request(base_url, 'payment-intent', 'POST', f'/api/public/tables/{table_id}/payment/intent', {
+                'mode': 'full',
+            }, ok_statuses=(201, 404))
+
+    def admin(self, base_url, admin_token, interval, stop):
+        while not stop.is_set():
+            self.request(base_url, 'admin-orders', 'GET', '/api/admin/orders', headers={'X-Admin-Token': admin_token})
+            stop.wait(interval)
+
+    def run(self, base_url, fixtures, options):
+        stop = threading.Event()
+        admins = [
+            threading.Thread(target=self.admin, args=(base_url, admin_token, options['admin_interval'], stop))
+            for admin_token, _ in fixtures
+        ]
+
+        diners = []
+        for _, table_tokens in fixtures:
+            for table_token in table_tokens:
+                remaining = [options['diners']]
+                lock = threading.Lock()
+
+                def table_done(remaining=remaining, lock=lock):
+                    with lock:
+                        remaining[0] -= 1
+                        return remaining[0] == 0
+
+                for k in range(options['diners']):
+                    diners.append((table_token, f'loadtest-{table_token}-{k}-{self.random.random():.8f}', table_done))
+        if not diners:
+            raise CommandError('Nothing to run: --restaurants, --tables and --diners must be positive')
+
+        started = time.perf_counter()
+        for thread in admins:
+            thread.start()
+        with ThreadPoolExecutor(max_workers=options['max_workers']) as pool:
+            futures = [
+                pool.submit(self.diner, base_url, table_token, session_id, options['items'], table_done)
+                for table_token, session_id, table_done in diners
+            ]
+            for future in futures:
+                future.result()
+        stop.set()
+        for thread in admins:
+            thread.join()
+        return time.perf_counter() - started
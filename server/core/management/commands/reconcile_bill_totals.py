@@ -0,0 +1,168 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from core.models import Bill, BillLine, BillSession, Payment, charge_cents
+
+SESSION_FIELDS = ['subtotal_cents', 'item_count', 'paid_cents']
+
+
+def per_bill_sum(queryset, field):
+    """Subquery summing field over queryset's rows for the outer bill, 0 if none"""
+    return Coalesce(Subquery(
+        queryset.filter(bill=OuterRef('pk')).order_by().values('bill').annotate(total=Sum(field)).values('total')
+    ), 0)
+
+
+class Command(BaseCommand):
+    help = 'Recompute bill totals and diner sessions from their lines and payments in bulk and fix any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Include closed bills (default: open bills only)')
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without writing')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        bills = Bill.objects.select_related('restaurant').annotate(
+            lines_subtotal=per_bill_sum(BillLine.objects.all(), 'line_total_cents'),
+            payments_paid=per_bill_sum(Payment.objects.filter(status='succeeded'), 'amount_cents'),
+        ).order_by('id')
+        if not options['all']:
+            bills = bills.filter(is_open=True)
+
+        checked = 0
+        fixed = 0
+        sessions_fixed = 0
+        last_id = 0
+        while True:
+            batch = list(bills.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1].id
+            checked += len(batch)
+
+            drifted = []
+            for bill in batch:
+                expected = self.expected_totals(bill, bill.lines_subtotal, bill.payments_paid)
+                current = (bill.subtotal_cents, bill.tax_cents, bill.service_fee_cents, bill.total_cents,
+                           bill.paid_cents, bill.remaining_cents)
+                if expected != current:
+                    self.stdout.write(
+                        f'Bill #{bill.id}: subtotal {bill.subtotal_cents} -> {expected[0]}, '
+                        f'total {bill.total_cents} -> {expected[3]}, paid {bill.paid_cents} -> {expected[4]}'
+                    )
+                    drifted.append(bill)
+            drifted_sessions = self.drifted_sessions([bill.id for bill in batch])
+            for (bill_id, session_id), (current, expected) in drifted_sessions.items():
+                self.stdout.write(
+                    f'Bill #{bill_id} session {session_id or "unknown"}: '
+                    + ', '.join(f'{field} {was} -> {now}' for field, was, now in zip(SESSION_FIELDS, current, expected)
+                                if was != now)
+                )
+            if (drifted or drifted_sessions) and not options['dry_run']:
+                self.fix(drifted, {bill_id for bill_id, _ in drifted_sessions})
+            fixed += len(drifted)
+            sessions_fixed += len(drifted_sessions)
+
+        verb = 'Found' if options['dry_run'] else 'Fixed'
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Checked {checked} bills. {verb} {fixed} with drifted totals and {sessions_fixed} drifted sessions'
+        ))
+
+    @staticmethod
+    def expected_totals(bill, subtotal, paid):
+        tax = charge_cents(subtotal, bill.restaurant.tax_rate)
+        service_fee = charge_cents(subtotal, bill.restaurant.service_fee_rate)
+        total = subtotal + tax + service_fee + bill.tip_cents
+        return subtotal, tax, service_fee, total, paid, total - paid
+
+    @staticmethod
+    def expected_sessions(bill_ids):
+        """(bill_id, session_id) -> (subtotal_cents, item_count, paid_cents) summed from lines and succeeded payments"""
+        expected = {}
+        lines = (
+            BillLine.objects.filter(bill_id__in=bill_ids).order_by()
+            .values('bill_id', 'session_id')
+            .annotate(subtotal=Sum('line_total_cents'), items=Sum('qty'))
+            .values_list('bill_id', 'session_id', 'subtotal', 'items')
+        )
+        for bill_id, session_id, subtotal, items in lines:
+            expected[bill_id, session_id] = (subtotal, items, 0)
+        payments = (
+            Payment.objects.filter(bill_id__in=bill_ids, status='succeeded').exclude(session_id='').order_by()
+            .values('bill_id', 'session_id')
+            .annotate(paid=Sum('amount_cents'))
+            .values_list('bill_id', 'session_id', 'paid')
+        )
+        for bill_id, session_id, paid in payments:
+            subtotal, items, _ = expected.get((bill_id, session_id), (0, 0, 0))
+            expected[bill_id, session_id] = (subtotal, items, paid)
+        return expected
+
+    def drifted_sessions(self, bill_ids):
+        """(bill_id, session_id) -> (current, expected) for each session whose row disagrees with its lines and payments"""
+        expected = self.expected_sessions(bill_ids)
+        current = {
+            (bill_id, session_id): tuple(values) for bill_id, session_id, *values in
+            BillSession.objects.filter(bill_id__in=bill_ids).values_list('bill_id', 'session_id', *SESSION_FIELDS)
+        }
+        return {
+            key: (current.get(key, (0, 0, 0)), expected.get(key, (0, 0, 0)))
+            for key in expected.keys() | current.keys()
+            if current.get(key, (0, 0, 0)) != expected.get(key, (0, 0, 0))
+        }
+
+    def fix(self, drifted, session_bill_ids):
+        """
+        Lock the drifted bills, recompute their totals and sessions from committed lines and
+        payments and bulk update. Concurrent line and payment writers queue on the row lock and
+        apply their deltas on top afterwards.
+        """
+        with transaction.atomic():
+            locked = {
+                bill.id: bill for bill in
+                Bill.objects.select_for_update().filter(id__in=[b.id for b in drifted] + list(session_bill_ids))
+            }
+            subtotals = dict(
+                BillLine.objects.filter(bill_id__in=[b.id for b in drifted]).order_by()
+                .values('bill_id')
+                .annotate(total=Sum('line_total_cents'))
+                .values_list('bill_id', 'total')
+            )
+            paid = dict(
+                Payment.objects.filter(bill_id__in=[b.id for b in drifted], status='succeeded').order_by()
+                .values('bill_id')
+                .annotate(total=Sum('amount_cents'))
+                .values_list('bill_id', 'total')
+            )
+            for bill in drifted:
+                fresh = locked[bill.id]
+                fresh.restaurant = bill.restaurant
+                (fresh.subtotal_cents, fresh.tax_cents, fresh.service_fee_cents, fresh.total_cents,
+                 fresh.paid_cents, fresh.remaining_cents) = self.expected_totals(
+                    fresh, subtotals.get(bill.id, 0), paid.get(bill.id, 0)
+                )
+                fresh.version += 1  # Cached copies (ETag) of the drifted totals must not match
+            Bill.objects.bulk_update([locked[bill.id] for bill in drifted], Bill.TOTAL_FIELDS + ['paid_cents', 'version'])
+
+            # Sessions are only written with their bill locked, so these sums are final until commit
+            sessions = self.drifted_sessions(list(session_bill_ids))
+            rows = {
+                (row.bill_id, row.session_id): row
+                for row in BillSession.objects.filter(bill_id__in=session_bill_ids)
+            }
+            now = timezone.now()
+            updated, created = [], []
+            for key, (_, expected) in sessions.items():
+                row = rows.get(key)
+                if row is None:
+                    created.append(BillSession(bill_id=key[0], session_id=key[1], **dict(zip(SESSION_FIELDS, expected))))
+                    continue
+                for field, value in zip(SESSION_FIELDS, expected):
+                    setattr(row, field, value)
+                row.updated_at = now  # bulk_update() skips auto_now
+                updated.append(row)
+            BillSession.objects.bulk_update(updated, SESSION_FIELDS + ['updated_at'])
+            BillSession.objects.bulk_create(created)
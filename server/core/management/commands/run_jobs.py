@@ -0,0 +1,117 @@
+import os
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from core.jobs import REGISTRY, claim, enqueue, heartbeat, requeue_stale, run
+from core.models import Job
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (receipt emails, pruning) on a thread pool, retrying failures with backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4, help='Jobs run at once (thread pool size)')
+        parser.add_argument('--kinds', help='Comma-separated job kinds to run (default: all registered)')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds between polls when idle')
+        parser.add_argument('--stale-after', type=int, default=600,
+                            help='Requeue running jobs with no heartbeat from their worker for this many seconds')
+        parser.add_argument('--schedule', action='append', default=[], metavar='KIND=SECONDS',
+                            help='Enqueue a job of KIND every SECONDS, e.g. prune_bill_events=3600 (repeatable)')
+        parser.add_argument('--once', action='store_true', help='Exit once no due jobs are left')
+
+    def handle(self, *args, **options):
+        kinds = options['kinds'].split(',') if options['kinds'] else list(REGISTRY)
+        unknown = [kind for kind in kinds if kind not in REGISTRY]
+        if unknown:
+            raise CommandError(f'Unknown job kinds: {", ".join(unknown)}. Registered: {", ".join(REGISTRY)}')
+        schedule = {}
+        for entry in options['schedule']:
+            kind, _, seconds = entry.partition('=')
+            if kind not in REGISTRY or not seconds.isdigit():
+                raise CommandError(f'Invalid --schedule {entry!r}; expected KIND=SECONDS with a registered kind')
+            schedule[kind] = int(seconds)
+
+        worker_id = f'{socket.gethostname()}:{os.getpid()}'
+        concurrency = options['concurrency']
+        next_due = {kind: 0 for kind in schedule}
+        in_flight = {}  # future -> job
+        outcomes = {'done': 0, 'retry': 0, 'failed': 0}
+        last_stale_check = 0
+        # Well inside --stale-after, so a slow job is never mistaken for one whose worker died
+        heartbeat_interval = min(30, options['stale_after'] / 3)
+        last_heartbeat = 0
+
+        self.stdout.write(f'Worker {worker_id} running {", ".join(kinds)} with {concurrency} threads')
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='job') as pool:
+            try:
+                while True:
+                    for future in [future for future in in_flight if future.done()]:
+                        in_flight.pop(future)
+                        outcomes[future.result()] += 1
+
+                    now = time.monotonic()
+                    if now - last_heartbeat >= heartbeat_interval:
+                        heartbeat(list(in_flight.values()))
+                        last_heartbeat = now
+                    self.enqueue_scheduled(next_due, schedule, now)
+                    if now - last_stale_check >= 60:
+                        released = requeue_stale(options['stale_after'])
+                        if released:
+                            self.stdout.write(self.style.WARNING(f'Released {released} stale jobs'))
+                        last_stale_check = now
+
+                    jobs = claim(self.capacity(kinds, in_flight), concurrency - len(in_flight), worker_id)
+                    for job in jobs:
+                        in_flight[pool.submit(self.run_job, job)] = job
+
+                    if options['once'] and not jobs and not in_flight:
+                        break
+                    if not jobs:
+                        if in_flight:
+                            wait(in_flight, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                        else:
+                            time.sleep(options['poll_interval'])
+            except KeyboardInterrupt:
+                self.stdout.write('Stopping; waiting for running jobs to finish...')
+                wait(in_flight)
+                for future in in_flight:
+                    outcomes[future.result()] += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Ran {sum(outcomes.values())} jobs: {outcomes['done']} done, "
+            f"{outcomes['retry']} to retry, {outcomes['failed']} failed"
+        ))
+
+    @staticmethod
+    def capacity(kinds, in_flight):
+        """Free slots per kind under its own concurrency limit, or None if it has none"""
+        running = {}
+        for job in in_flight.values():
+            running[job.kind] = running.get(job.kind, 0) + 1
+        slots = {}
+        for kind in kinds:
+            limit = REGISTRY[kind].concurrency
+            slots[kind] = None if limit is None else limit - running.get(kind, 0)
+        return slots
+
+    @staticmethod
+    def enqueue_scheduled(next_due, schedule, now):
+        """Enqueue scheduled kinds that are due, unless one is already waiting or running"""
+        for kind, interval in schedule.items():
+            if now < next_due[kind]:
+                continue
+            if not Job.objects.filter(kind=kind, status__in=['queued', 'running']).exists():
+                enqueue(kind)
+            next_due[kind] = now + interval
+
+    @staticmethod
+    def run_job(job):
+        # Pool threads keep their own connections; treat each job like a request
+        close_old_connections()
+        try:
+            return run(job)
+        finally:
+            close_old_connections()
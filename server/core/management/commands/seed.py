@@ -1,10 +1,50 @@
+import random
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 from django.core.management.base import BaseCommand
-from core.models import Restaurant, Table, MenuCategory, MenuItem
+from django.db import transaction
+from django.utils import timezone
+from core.models import Restaurant, Table, MenuCategory, MenuItem, Bill, BillLine, Payment, RevenueRollup, charge_cents
+
+
+CATEGORY_NAMES = ['Starters', 'Salads', 'Mains', 'Grill', 'Pasta', 'Sides', 'Desserts', 'Drinks']
+DISH_ADJECTIVES = ['Roasted', 'Grilled', 'Smoked', 'Crispy', 'Braised', 'Spicy', 'Garlic', 'Herb', 'Honey', 'Lemon']
+DISH_NOUNS = ['Chicken', 'Salmon', 'Tofu', 'Pork Belly', 'Mushrooms', 'Lamb', 'Shrimp', 'Eggplant', 'Steak', 'Duck',
+              'Gnocchi', 'Risotto', 'Tacos', 'Burger', 'Cauliflower', 'Halloumi', 'Octopus', 'Ramen', 'Brisket', 'Beets']
+
+
+@contextmanager
+def historical_timestamps(*models):
+    """Let bulk_create keep the created_at/updated_at values we set instead of stamping now()"""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
 
 
 class Command(BaseCommand):
     help = 'Seed database with initial restaurant, table, and menu data'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--restaurants', type=int, default=0,
+                            help='Also generate this many synthetic restaurants (admin tokens synthetic-admin-<i>)')
+        parser.add_argument('--tables', type=int, default=20, help='Tables per synthetic restaurant')
+        parser.add_argument('--items', type=int, default=60, help='Menu items per synthetic restaurant')
+        parser.add_argument('--history-days', type=int, default=30, help='Days of closed bills to generate')
+        parser.add_argument('--turns', type=float, default=1.5, help='Average closed bills per table per day')
+        parser.add_argument('--random-seed', type=int, default=42, help='Same seed and sizes give the same data')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
     def handle(self, *args, **options):
         self.stdout.write('Seeding database...')
         
@@ -239,6 +279,7 @@ class Command(BaseCommand):
                 options_json={'type': ['Black', 'With Cream', 'Cappuccino', 'Latte']}
             )
             
+            restaurant.bump_menu_version()
             self.stdout.write(self.style.SUCCESS('✓ Created menu categories and items'))
         else:
             self.stdout.write('Menu already exists')
@@ -248,3 +289,193 @@ class Command(BaseCommand):
         self.stdout.write(self.style.WARNING(f'Admin URL: http://localhost:3000/admin/{ADMIN_TOKEN}'))
         self.stdout.write(self.style.WARNING(f'Table URLs: http://localhost:3000/t/{RESTAURANT_ID}-1, {RESTAURANT_ID}-2, etc.'))
         self.stdout.write('')
+
+        if options['restaurants']:
+            self.generate(options)
+
+    def generate(self, options):
+        """Synthetic restaurants with menus, tables and closed bill history, written with bulk_create"""
+        started = time.monotonic()
+        rng = random.Random(options['random_seed'])
+        self.batch_size = options['batch_size']
+        self.counts = defaultdict(int)
+
+        tokens = {i: Restaurant.hash_token(f'synthetic-admin-{i}') for i in range(1, options['restaurants'] + 1)}
+        existing = set(Restaurant.objects.filter(admin_token_hash__in=tokens.values()).values_list('admin_token_hash', flat=True))
+
+        for i, admin_token_hash in tokens.items():
+            # Draw every restaurant's parameters even when skipping it, so reruns stay deterministic
+            restaurant_rng = random.Random(rng.random())
+            if admin_token_hash in existing:
+                continue
+            with transaction.atomic():
+                restaurant = self.generate_restaurant(i, admin_token_hash, restaurant_rng, options)
+                tables = self.generate_tables(i, restaurant, options['tables'])
+                items = self.generate_menu(restaurant, restaurant_rng, options['items'])
+            self.generate_history(restaurant, tables, items, restaurant_rng, options)
+            if i % 10 == 0:
+                self.stdout.write(f'  {i}/{len(tokens)} restaurants, {self.counts["bills"]} bills')
+
+        summary = ', '.join(f'{count} {name}' for name, count in self.counts.items())
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Generated {summary or "nothing new"} in {time.monotonic() - started:.1f}s'
+        ))
+        if self.counts['restaurants']:
+            self.stdout.write(self.style.WARNING('  Admin tokens: synthetic-admin-<n>, table tokens: syn<n>-<table>'))
+
+    def bulk_create(self, model, objects):
+        model.objects.bulk_create(objects, batch_size=self.batch_size)
+        self.counts[str(model._meta.verbose_name_plural).lower()] += len(objects)
+        return objects
+
+    def generate_restaurant(self, i, admin_token_hash, rng, options):
+        return self.bulk_create(Restaurant, [Restaurant(
+            name=f'Synthetic Restaurant {i}',
+            theme_json={'primaryColor': '#4F46E5', 'secondaryColor': '#10B981', 'logo': ''},
+            tax_rate=rng.choice(['0.0625', '0.0725', '0.0875', '0.1000']),
+            service_fee_rate=rng.choice(['0', '0', '0.0300', '0.0500']),
+            tip_presets_json=[0.15, 0.18, 0.20, 0.25],
+            admin_token_hash=admin_token_hash,
+        )])[0]
+
+    def generate_tables(self, i, restaurant, count):
+        slug = f'syn{i}'
+        return self.bulk_create(Table, [
+            Table(
+                restaurant=restaurant,
+                restaurant_slug=slug,
+                table_number=str(j),
+                name=f'Table {j}',
+                table_token_hash=Table.hash_token(f'{slug}-{j}'),
+            )
+            for j in range(1, count + 1)
+        ])
+
+    def generate_menu(self, restaurant, rng, count):
+        categories = self.bulk_create(MenuCategory, [
+            MenuCategory(restaurant=restaurant, name=name, position=position)
+            for position, name in enumerate(CATEGORY_NAMES, start=1)
+        ])
+        items = []
+        for n in range(count):
+            category = categories[n % len(categories)]
+            dish = f'{rng.choice(DISH_ADJECTIVES)} {rng.choice(DISH_NOUNS)}'
+            items.append(MenuItem(
+                restaurant=restaurant,
+                category=category,
+                name=f'{dish} #{n + 1}' if n >= len(DISH_ADJECTIVES) * len(DISH_NOUNS) else dish,
+                description=f'{dish} from the {category.name.lower()} menu',
+                price_cents=rng.randint(3, 45) * 100 - 5,
+                available=rng.random() > 0.05,
+                options_json={},
+            ))
+        return self.bulk_create(MenuItem, items)
+
+    def generate_history(self, restaurant, tables, items, rng, options):
+        """Closed bills for the last --history-days, flushed every --batch-size bills"""
+        if not items:
+            return
+        # A few dishes sell far more than the rest
+        weights = [1 / (rank + 1) for rank in range(len(items))]
+        tax_rate, service_fee_rate = restaurant.tax_rate, restaurant.service_fee_rate
+        today = timezone.localdate()
+        rollups = defaultdict(lambda: defaultdict(int))
+        pending = []
+
+        for days_ago in range(options['history_days'], 0, -1):
+            midnight = timezone.make_aware(datetime.combine(today - timedelta(days=days_ago), datetime.min.time()))
+            for table in tables:
+                bill_count = int(options['turns']) + (rng.random() < options['turns'] % 1)
+                for _ in range(bill_count):
+                    created_at = midnight + timedelta(minutes=rng.randint(11 * 60, 22 * 60))
+                    closed_at = created_at + timedelta(minutes=rng.randint(30, 120))
+                    covers = rng.randint(1, 6)
+
+                    lines = []
+                    for cover in range(covers):
+                        session_id = f'seed-{cover}'
+                        for item in rng.choices(items, weights=weights, k=rng.randint(1, 4)):
+                            qty = 1 if rng.random() < 0.85 else 2
+                            lines.append(BillLine(
+                                restaurant=restaurant,
+                                item=item,
+                                name_snapshot=item.name,
+                                qty=qty,
+                                unit_price_cents=item.price_cents,
+                                line_total_cents=item.price_cents * qty,
+                                session_id=session_id,
+                                ordered_at=created_at + timedelta(minutes=rng.randint(0, 25)),
+                                status='served',
+                                created_at=created_at,
+                            ))
+
+                    subtotal = sum(line.line_total_cents for line in lines)
+                    tax = charge_cents(subtotal, tax_rate)
+                    service_fee = charge_cents(subtotal, service_fee_rate)
+                    tip = int(subtotal * rng.choice([0, 0.15, 0.18, 0.20, 0.25]))
+                    total = subtotal + tax + service_fee + tip
+                    bill = Bill(
+                        restaurant=restaurant,
+                        table=table,
+                        is_open=False,
+                        subtotal_cents=subtotal,
+                        tax_cents=tax,
+                        service_fee_cents=service_fee,
+                        tip_cents=tip,
+                        total_cents=total,
+                        paid_cents=total,
+                        remaining_cents=0,
+                        closed_at=closed_at,
+                        created_at=created_at,
+                        updated_at=closed_at,
+                    )
+
+                    # Either one diner pays everything or the bill is split evenly
+                    splits = 1 if rng.random() < 0.5 else covers
+                    payments = [
+                        Payment(
+                            status='succeeded',
+                            amount_cents=total // splits + (1 if n < total % splits else 0),
+                            provider='stripe',
+                            provider_ref=f'seed_{rng.getrandbits(48):012x}',
+                            created_at=closed_at,
+                            updated_at=closed_at,
+                        )
+                        for n in range(splits)
+                    ]
+                    pending.append((bill, lines, payments))
+
+                    for bucket in RevenueRollup.buckets(closed_at):
+                        bucket_totals = rollups[bucket]
+                        bucket_totals['revenue_cents'] += total
+                        bucket_totals['tax_cents'] += tax
+                        bucket_totals['service_fee_cents'] += service_fee
+                        bucket_totals['tip_cents'] += tip
+                        bucket_totals['bill_count'] += 1
+                        bucket_totals['covers'] += covers
+
+                    if len(pending) >= self.batch_size:
+                        self.flush_bills(pending)
+                        pending = []
+
+        self.flush_bills(pending)
+        self.bulk_create(RevenueRollup, [
+            RevenueRollup(restaurant=restaurant, granularity=granularity, bucket_start=bucket_start, **amounts)
+            for (granularity, bucket_start), amounts in rollups.items()
+        ])
+
+    def flush_bills(self, pending):
+        if not pending:
+            return
+        with transaction.atomic(), historical_timestamps(Bill, BillLine, Payment):
+            self.bulk_create(Bill, [bill for bill, _, _ in pending])
+            lines, payments = [], []
+            for bill, bill_lines, bill_payments in pending:
+                for obj in bill_lines:
+                    obj.bill = bill
+                for obj in bill_payments:
+                    obj.bill = bill
+                lines.extend(bill_lines)
+                payments.extend(bill_payments)
+            self.bulk_create(BillLine, lines)
+            self.bulk_create(Payment, payments)
@@ -0,0 +1,181 @@
+"""
+Bulk menu import/export as JSON Lines or CSV, one menu item per line/row
+"""
+import codecs
+import csv
+import json
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.utils import timezone
+
+from .models import MenuCategory, MenuItem
+from .renderers import FastJSONRenderer
+from .serializers import AdminMenuItemImportSerializer
+
+
+COLUMNS = ['id', 'category', 'category_position', 'name', 'description', 'price_cents', 'image_url', 'available', 'options_json']
+ITEM_FIELDS = ['category', 'name', 'description', 'price_cents', 'image_url', 'available', 'options_json']
+EXPORT_CHUNK_SIZE = 500  # Rows fetched per round trip and written per streamed chunk
+WRITE_BATCH_SIZE = 500
+
+
+class Echo:
+    """File-like object for csv.writer that hands each formatted row back instead of storing it"""
+    def write(self, value):
+        return value
+
+
+async def aiter_chunks(chunks):
+    """
+    Async iterator over a sync generator of byte chunks, producing each one in sync_to_async.
+    Django's ASGI handler reads a sync iterator to the end before sending anything, so
+    streamed exports hand it this instead.
+    """
+    chunks = iter(chunks)
+    while True:
+        chunk = await sync_to_async(next)(chunks, None)
+        if chunk is None:
+            return
+        yield chunk
+
+
+def read_rows(lines, fmt):
+    """
+    Yield (line number, row, error) for each item in an iterable of UTF-8 byte lines.
+    Empty CSV cells are left out of the row, so model defaults apply as in a JSON row without them.
+    """
+    lines = codecs.iterdecode(lines, 'utf-8-sig')
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        for row in reader:
+            row = {key: value for key, value in row.items() if key is not None and value not in (None, '')}
+            if 'options_json' in row:
+                try:
+                    row['options_json'] = json.loads(row['options_json'])
+                except ValueError:
+                    yield reader.line_num, None, 'options_json is not valid JSON'
+                    continue
+            yield reader.line_num, row, None
+        return
+
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield number, None, 'Line is not valid JSON'
+            continue
+        if not isinstance(row, dict):
+            yield number, None, 'Line must be a JSON object'
+            continue
+        yield number, row, None
+
+
+def import_menu(restaurant, rows):
+    """
+    Validate every row against the restaurant's menu (two queries up front), then create and
+    update the items with bulk_create/bulk_update in one transaction. A row updates the item
+    with its id if that is one of the restaurant's, else the item with the same category and
+    name; unknown categories are created. Returns (counts, errors); nothing is written if any
+    row has errors.
+    """
+    categories = {}
+    category_names = {}
+    for category in MenuCategory.objects.filter(restaurant=restaurant):
+        categories.setdefault(category.name, category)  # Rows naming a duplicated category get the first
+        category_names[category.id] = category.name
+    by_id = {}
+    by_name = {}
+    for item in MenuItem.objects.filter(restaurant=restaurant):
+        by_id[item.id] = item
+        by_name[(category_names[item.category_id], item.name)] = item
+
+    valid, errors, seen = [], [], set()
+    for line, row, error in rows:
+        if error:
+            errors.append({'line': line, 'errors': {'non_field_errors': [error]}})
+            continue
+        serializer = AdminMenuItemImportSerializer(data=row)
+        if not serializer.is_valid():
+            errors.append({'line': line, 'errors': serializer.errors})
+            continue
+        data = serializer.validated_data
+        item = by_id.get(data.get('id')) or by_name.get((data['category'], data['name']))
+        key = item.id if item else (data['category'], data['name'])
+        if key in seen:
+            errors.append({'line': line, 'errors': {'non_field_errors': ['Same item as an earlier row']}})
+            continue
+        seen.add(key)
+        valid.append((data, item))
+
+    if errors:
+        return None, errors
+
+    now = timezone.now()
+    with transaction.atomic():
+        new_categories = []
+        for data, _ in valid:
+            if data['category'] not in categories:
+                category = MenuCategory(
+                    restaurant=restaurant, name=data['category'], position=data.get('category_position') or 0
+                )
+                categories[category.name] = category
+                new_categories.append(category)
+        MenuCategory.objects.bulk_create(new_categories)
+
+        to_create, to_update = [], []
+        for data, item in valid:
+            fields = {field: data[field] for field in ITEM_FIELDS if field in data}
+            fields['category'] = categories[data['category']]
+            if item is None:
+                to_create.append(MenuItem(restaurant=restaurant, **fields))
+            else:
+                for field, value in fields.items():
+                    setattr(item, field, value)
+                item.updated_at = now  # bulk_update() skips auto_now
+                to_update.append(item)
+        MenuItem.objects.bulk_create(to_create, batch_size=WRITE_BATCH_SIZE)
+        MenuItem.objects.bulk_update(to_update, ITEM_FIELDS + ['updated_at'], batch_size=WRITE_BATCH_SIZE)
+
+    # After commit, so no request can cache the old menu under the new version
+    restaurant.bump_menu_version()
+    return {'created': len(to_create), 'updated': len(to_update), 'categoriesCreated': len(new_categories)}, []
+
+
+def export_menu(restaurant, fmt):
+    """
+    Yield the restaurant's menu as JSON Lines or CSV in byte chunks of EXPORT_CHUNK_SIZE rows,
+    reading the items with iterator() so memory stays flat however large the menu is
+    """
+    items = (
+        MenuItem.objects.filter(restaurant=restaurant)
+        .order_by('category__position', 'category_id', 'id')
+        .values_list('id', 'category__name', 'category__position', 'name', 'description',
+                     'price_cents', 'image_url', 'available', 'options_json')
+        .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    )
+
+    writer = csv.writer(Echo())
+    renderer = FastJSONRenderer()
+
+    def encode(row):
+        if fmt == 'csv':
+            return writer.writerow([*row[:6], row[6] or '', 'true' if row[7] else 'false', json.dumps(row[8])])
+        return renderer.render(dict(zip(COLUMNS, row))).decode() + '\n'
+
+    chunk = [writer.writerow(COLUMNS)] if fmt == 'csv' else []
+
+    for row in items:
+        chunk.append(encode(row))
+        if len(chunk) >= EXPORT_CHUNK_SIZE:
+            yield ''.join(chunk).encode()
+            chunk = []
+    if chunk:
+        yield ''.join(chunk).encode()
+
+
+def aexport_menu(restaurant, fmt):
+    """export_menu() as an async iterator, for streaming under ASGI"""
+    return aiter_chunks(export_menu(restaurant, fmt))
@@ -0,0 +1,162 @@
+"""
+Per-request timing and query-count metrics, kept in process and exported in Prometheus text format
+"""
+import contextvars
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # Seconds
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+
+class Histogram:
+    """Thread-safe cumulative histogram keyed by a tuple of label values"""
+    def __init__(self, name, help_text, buckets, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.label_names = label_names
+        self._series = {}  # labels -> [count per bucket..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            else:
+                series[len(self.buckets)] += 1
+            series[-1] += value
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for labels in sorted(snapshot):
+            series = snapshot[labels]
+            label_text = ','.join(f'{name}="{_escape(value)}"' for name, value in zip(self.label_names, labels))
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {series[-1]:.6f}')
+            lines.append(f'{self.name}_count{{{label_text}}} {cumulative}')
+        return '\n'.join(lines)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+LABELS = ('view', 'method')
+KNOWN_METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}  # Keeps label cardinality bounded
+
+REQUEST_DURATION = Histogram(
+    'billpay_request_duration_seconds', 'Wall time per request by URL name', DURATION_BUCKETS, LABELS
+)
+REQUEST_DB_DURATION = Histogram(
+    'billpay_request_db_duration_seconds', 'Time spent in database queries per request by URL name',
+    DURATION_BUCKETS, LABELS
+)
+REQUEST_QUERIES = Histogram(
+    'billpay_request_queries', 'Database queries per request by URL name', QUERY_BUCKETS, LABELS
+)
+HISTOGRAMS = [REQUEST_DURATION, REQUEST_DB_DURATION, REQUEST_QUERIES]
+
+
+def render_metrics():
+    return '\n'.join(histogram.render() for histogram in HISTOGRAMS) + '\n'
+
+
+def reset_metrics():
+    for histogram in HISTOGRAMS:
+        histogram.clear()
+
+
+class RequestSample:
+    __slots__ = ('queries', 'db_time')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+
+
+# The sample for the request being handled. Context variables follow sync_to_async into
+# its worker thread, so ORM calls from async views are counted too.
+_current_sample = contextvars.ContextVar('request_metrics_sample', default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper installed on every connection (see install_query_recorder)"""
+    sample = _current_sample.get()
+    if sample is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        sample.queries += 1
+        sample.db_time += time.perf_counter() - started
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """connection_created receiver"""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, record_query)
+
+
+class RequestMetricsMiddleware:
+    """
+    Records wall time, DB time and query count for every request under its resolved
+    URL name. Streaming responses are timed until the response object is returned.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        sample = RequestSample()
+        token = _current_sample.set(sample)
+        started = time.perf_counter()
+        try:
+            return self.get_response(request)
+        finally:
+            _current_sample.reset(token)
+            self.observe(request, sample, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        sample = RequestSample()
+        token = _current_sample.set(sample)
+        started = time.perf_counter()
+        try:
+            return await self.get_response(request)
+        finally:
+            _current_sample.reset(token)
+            self.observe(request, sample, time.perf_counter() - started)
+
+    @staticmethod
+    def observe(request, sample, elapsed):
+        match = getattr(request, 'resolver_match', None)
+        method = request.method if request.method in KNOWN_METHODS else 'other'
+        labels = ((match.url_name or match.view_name) if match else 'unmatched', method)
+        REQUEST_DURATION.observe(labels, elapsed)
+        REQUEST_DB_DURATION.observe(labels, sample.db_time)
+        REQUEST_QUERIES.observe(labels, sample.queries)
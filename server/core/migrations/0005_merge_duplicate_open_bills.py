@@ -0,0 +1,48 @@
+# Generated by Django 4.2.30 on 2026-10-18 00:01
+
+from decimal import Decimal
+from django.db import migrations
+from django.db.models import Count, Sum
+
+
+def merge_duplicate_open_bills(apps, schema_editor):
+    """Fold extra open bills on a table into the oldest one so the constraint can be created"""
+    Bill = apps.get_model('core', 'Bill')
+    BillLine = apps.get_model('core', 'BillLine')
+    Payment = apps.get_model('core', 'Payment')
+
+    duplicated = (
+        Bill.objects.filter(is_open=True)
+        .values('table_id')
+        .annotate(n=Count('id'))
+        .filter(n__gt=1)
+        .values_list('table_id', flat=True)
+    )
+    for table_id in list(duplicated):
+        bills = list(Bill.objects.filter(table_id=table_id, is_open=True).select_related('restaurant').order_by('id'))
+        keep, extras = bills[0], bills[1:]
+        extra_ids = [bill.id for bill in extras]
+        BillLine.objects.filter(bill_id__in=extra_ids).update(bill_id=keep.id)
+        Payment.objects.filter(bill_id__in=extra_ids).update(bill_id=keep.id)
+
+        keep.tip_cents += sum(bill.tip_cents for bill in extras)
+        keep.subtotal_cents = BillLine.objects.filter(bill_id=keep.id).aggregate(t=Sum('line_total_cents'))['t'] or 0
+        keep.tax_cents = int(Decimal(keep.subtotal_cents) * keep.restaurant.tax_rate)
+        keep.service_fee_cents = int(Decimal(keep.subtotal_cents) * keep.restaurant.service_fee_rate)
+        keep.total_cents = keep.subtotal_cents + keep.tax_cents + keep.service_fee_cents + keep.tip_cents
+        keep.save()
+        Bill.objects.filter(id__in=extra_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_restaurant_menu_version'),
+    ]
+
+    operations = [
+        # Separate from the AddConstraint in 0005_one_open_bill_per_table: on PostgreSQL the
+        # re-pointed lines and payments leave deferred FK trigger events that would make the
+        # CREATE UNIQUE INDEX on core_bill fail in the same transaction
+        migrations.RunPython(merge_duplicate_open_bills, migrations.RunPython.noop),
+    ]
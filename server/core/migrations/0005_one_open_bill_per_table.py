@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 00:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_merge_duplicate_open_bills'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='bill',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_open', True)), fields=('table',), name='one_open_bill_per_table'),
+        ),
+    ]
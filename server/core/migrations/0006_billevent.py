@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 00:03
+
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_one_open_bill_per_table'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BillEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('line_added', 'Line added'), ('line_removed', 'Line removed'), ('payment', 'Payment'), ('bill_closed', 'Bill closed')], max_length=20)),
+                ('payload', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('bill', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='core.bill')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='bill_events', to='core.restaurant')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['restaurant', 'id'], name='billevent_restaurant_cursor')],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.30 on 2026-10-18 00:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def set_closed_at(apps, schema_editor):
+    """Closed bills were last saved when they closed, so updated_at is the best estimate"""
+    Bill = apps.get_model('core', 'Bill')
+    Bill.objects.filter(is_open=False, closed_at__isnull=True).update(closed_at=models.F('updated_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_billevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bill',
+            name='closed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(set_closed_at, migrations.RunPython.noop),
+        migrations.CreateModel(
+            name='RevenueRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('granularity', models.CharField(choices=[('day', 'Day'), ('hour', 'Hour')], max_length=4)),
+                ('bucket_start', models.DateTimeField()),
+                ('revenue_cents', models.BigIntegerField(default=0)),
+                ('tax_cents', models.BigIntegerField(default=0)),
+                ('service_fee_cents', models.BigIntegerField(default=0)),
+                ('tip_cents', models.BigIntegerField(default=0)),
+                ('bill_count', models.IntegerField(default=0)),
+                ('covers', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='revenue_rollups', to='core.restaurant')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='revenuerollup',
+            constraint=models.UniqueConstraint(fields=('restaurant', 'granularity', 'bucket_start'), name='one_rollup_per_bucket'),
+        ),
+    ]
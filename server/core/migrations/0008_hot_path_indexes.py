@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-18 00:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_revenue_rollups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(condition=models.Q(('is_open', True)), fields=['restaurant', '-updated_at', '-id'], name='bill_open_by_restaurant'),
+        ),
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(fields=['restaurant', 'is_open'], name='bill_restaurant_is_open'),
+        ),
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(fields=['restaurant', 'created_at'], name='bill_restaurant_created'),
+        ),
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(condition=models.Q(('is_open', False)), fields=['restaurant', 'closed_at'], name='bill_closed_by_restaurant'),
+        ),
+        migrations.AddIndex(
+            model_name='billline',
+            index=models.Index(fields=['bill', 'session_id'], name='billline_bill_session'),
+        ),
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['bill', 'status'], name='payment_bill_status'),
+        ),
+    ]
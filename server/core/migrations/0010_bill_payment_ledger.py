@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-18 00:08
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def fill_ledger(apps, schema_editor):
+    Bill = apps.get_model('core', 'Bill')
+    Payment = apps.get_model('core', 'Payment')
+    paid = (
+        Payment.objects.filter(bill=OuterRef('pk'), status='succeeded')
+        .values('bill')
+        .annotate(total=Sum('amount_cents'))
+        .values('total')
+    )
+    Bill.objects.update(paid_cents=Coalesce(Subquery(paid), 0))
+    Bill.objects.update(remaining_cents=F('total_cents') - F('paid_cents'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_idempotency_keys'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bill',
+            name='paid_cents',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='bill',
+            name='remaining_cents',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(fill_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 4.2.30 on 2026-10-18 00:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_bill_payment_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedBill',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('is_open', models.BooleanField(default=False)),
+                ('subtotal_cents', models.IntegerField(default=0)),
+                ('tax_cents', models.IntegerField(default=0)),
+                ('service_fee_cents', models.IntegerField(default=0)),
+                ('tip_cents', models.IntegerField(default=0)),
+                ('total_cents', models.IntegerField(default=0)),
+                ('paid_cents', models.IntegerField(default=0)),
+                ('remaining_cents', models.IntegerField(default=0)),
+                ('closed_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_bills', to='core.restaurant')),
+                ('table', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_bills', to='core.table')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedPayment',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], max_length=20)),
+                ('amount_cents', models.IntegerField()),
+                ('provider', models.CharField(max_length=50)),
+                ('provider_ref', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('bill', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payments', to='core.archivedbill')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedBillLine',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('name_snapshot', models.CharField(max_length=255)),
+                ('options_snapshot', models.JSONField(blank=True, default=dict)),
+                ('qty', models.IntegerField(default=1)),
+                ('unit_price_cents', models.IntegerField()),
+                ('line_total_cents', models.IntegerField()),
+                ('session_id', models.CharField(blank=True, default='', max_length=255)),
+                ('ordered_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField()),
+                ('bill', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='core.archivedbill')),
+                ('item', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.menuitem')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='archivedbill',
+            index=models.Index(fields=['restaurant', 'closed_at'], name='archivedbill_closed'),
+        ),
+    ]
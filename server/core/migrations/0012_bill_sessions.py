@@ -0,0 +1,60 @@
+# Generated by Django 4.2.30 on 2026-10-18 00:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Sum
+
+
+def fill_open_bill_sessions(apps, schema_editor):
+    # Only open bills need session rows; closed history keeps its lines
+    BillLine = apps.get_model('core', 'BillLine')
+    BillSession = apps.get_model('core', 'BillSession')
+    rows = (
+        BillLine.objects.filter(bill__is_open=True)
+        .values('bill_id', 'session_id')
+        .annotate(subtotal=Sum('line_total_cents'), items=Sum('qty'))
+        .order_by()
+    )
+    BillSession.objects.bulk_create([
+        BillSession(bill_id=row['bill_id'], session_id=row['session_id'],
+                    subtotal_cents=row['subtotal'], item_count=row['items'])
+        for row in rows
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_archive_tables'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='session_id',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='archivedpayment',
+            name='session_id',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.CreateModel(
+            name='BillSession',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('session_id', models.CharField(blank=True, default='', max_length=255)),
+                ('subtotal_cents', models.IntegerField(default=0)),
+                ('item_count', models.IntegerField(default=0)),
+                ('paid_cents', models.IntegerField(default=0)),
+                ('tip_cents', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('bill', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sessions', to='core.bill')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='billsession',
+            constraint=models.UniqueConstraint(fields=('bill', 'session_id'), name='one_row_per_bill_session'),
+        ),
+        migrations.RunPython(fill_open_bill_sessions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-18 00:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_bill_version'),
+    ]
+
+    operations = [
+        # Lines ordered before kitchen tracking count as served, so they stay out of the queue
+        migrations.AddField(
+            model_name='billline',
+            name='status',
+            field=models.CharField(choices=[('sent', 'Sent to kitchen'), ('preparing', 'Preparing'), ('served', 'Served')], default='served', max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='billline',
+            name='status',
+            field=models.CharField(choices=[('sent', 'Sent to kitchen'), ('preparing', 'Preparing'), ('served', 'Served')], default='sent', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='billline',
+            name='status_changed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='billline',
+            index=models.Index(condition=models.Q(('status', 'served'), _negated=True), fields=['ordered_at', 'id'], name='billline_kitchen_queue'),
+        ),
+    ]
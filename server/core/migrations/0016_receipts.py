@@ -0,0 +1,24 @@
+# Generated by Django 4.2.30 on 2026-10-18 00:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_jobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Receipt',
+            fields=[
+                ('bill_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('json_gz', models.BinaryField()),
+                ('html_gz', models.BinaryField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='receipts', to='core.restaurant')),
+            ],
+        ),
+    ]
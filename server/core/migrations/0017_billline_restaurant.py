@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-18 01:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_receipts'),
+    ]
+
+    operations = [
+        # Nullable until 0018 fills it; each step is its own migration (and transaction), as
+        # PostgreSQL refuses to ALTER a table with pending deferred FK trigger events
+        migrations.AddField(
+            model_name='billline',
+            name='restaurant',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.restaurant'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-18 01:10
+
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def fill_line_restaurants(apps, schema_editor):
+    Bill = apps.get_model('core', 'Bill')
+    BillLine = apps.get_model('core', 'BillLine')
+    BillLine.objects.update(
+        restaurant_id=Subquery(Bill.objects.filter(id=OuterRef('bill_id')).values('restaurant_id')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_billline_restaurant'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_line_restaurants, migrations.RunPython.noop),
+    ]
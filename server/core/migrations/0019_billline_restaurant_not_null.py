@@ -0,0 +1,27 @@
+# Generated by Django 4.2.30 on 2026-10-18 01:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_fill_billline_restaurant'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='billline',
+            name='restaurant',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.restaurant'),
+        ),
+        migrations.RemoveIndex(
+            model_name='billline',
+            name='billline_kitchen_queue',
+        ),
+        migrations.AddIndex(
+            model_name='billline',
+            index=models.Index(condition=models.Q(('status', 'served'), _negated=True), fields=['restaurant', 'ordered_at', 'id'], name='billline_kitchen_queue'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-18 01:40
+
+import secrets
+
+from django.db import migrations, models
+
+
+def fill_receipt_tokens(apps, schema_editor):
+    Receipt = apps.get_model('core', 'Receipt')
+    receipts = list(Receipt.objects.only('bill_id'))
+    for receipt in receipts:
+        receipt.token = secrets.token_urlsafe(24)
+    Receipt.objects.bulk_update(receipts, ['token'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_billline_restaurant_not_null'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='receipt',
+            name='token',
+            field=models.CharField(max_length=64, null=True),
+        ),
+        migrations.RunPython(fill_receipt_tokens, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='receipt',
+            name='token',
+            field=models.CharField(max_length=64, unique=True),
+        ),
+    ]
@@ -1,7 +1,28 @@
-from django.db import models
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction, IntegrityError
+from django.db.models import F, Q, Sum, Value, DecimalField, IntegerField, ExpressionWrapper
+from django.db.models.functions import Cast, Floor
+from django.utils import timezone
+from decimal import Decimal
 import hashlib
 
 
+def charge_cents(subtotal_cents, rate):
+    """Tax/service fee for a subtotal, truncated to whole cents"""
+    return int(Decimal(subtotal_cents) * Decimal(rate))
+
+
+def charge_cents_expression(subtotal, rate):
+    """Database-side equivalent of charge_cents() for use in UPDATE statements"""
+    return Cast(
+        Floor(ExpressionWrapper(
+            subtotal * Value(Decimal(rate)),
+            output_field=DecimalField(max_digits=18, decimal_places=6),
+        )),
+        IntegerField(),
+    )
+
+
 class Restaurant(models.Model):
     name = models.CharField(max_length=255)
     theme_json = models.JSONField(default=dict, blank=True)
@@ -9,6 +30,7 @@ class Restaurant(models.Model):
     service_fee_rate = models.DecimalField(max_digits=5, decimal_places=4, default=0.0)
     tip_presets_json = models.JSONField(default=list, blank=True)  # e.g., [0.15, 0.18, 0.20]
     admin_token_hash = models.CharField(max_length=64, unique=True)
+    menu_version = models.PositiveIntegerField(default=1)  # Bumped on every menu write; keys the public menu cache
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -19,6 +41,12 @@ class Restaurant(models.Model):
     def hash_token(token):
         return hashlib.sha256(token.encode()).hexdigest()
 
+    def bump_menu_version(self):
+        """Invalidate cached menu payloads by moving to a new version"""
+        from .authentication import invalidate_restaurant
+        Restaurant.objects.filter(pk=self.pk).update(menu_version=models.F('menu_version') + 1)
+        invalidate_restaurant(self.pk)  # update() skips the post_save signal
+
 
 class Table(models.Model):
     restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='tables')
@@ -82,23 +110,141 @@ class Bill(models.Model):
     service_fee_cents = models.IntegerField(default=0)
     tip_cents = models.IntegerField(default=0)
     total_cents = models.IntegerField(default=0)
+    paid_cents = models.IntegerField(default=0)  # Sum of succeeded payments
+    remaining_cents = models.IntegerField(default=0)  # total_cents - paid_cents
+    version = models.PositiveIntegerField(default=1)  # Bumped by every line, payment or totals change
+    closed_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            # At most one open bill per table; closed bills are unrestricted
+            models.UniqueConstraint(fields=['table'], condition=Q(is_open=True), name='one_open_bill_per_table'),
+        ]
+        indexes = [
+            # Open checks per restaurant, newest activity first (orders view, dashboard count).
+            # Open bills by table are served by the one_open_bill_per_table unique index.
+            models.Index(fields=['restaurant', '-updated_at', '-id'], condition=Q(is_open=True), name='bill_open_by_restaurant'),
+            models.Index(fields=['restaurant', 'is_open'], name='bill_restaurant_is_open'),
+            models.Index(fields=['restaurant', 'created_at'], name='bill_restaurant_created'),
+            models.Index(fields=['restaurant', 'closed_at'], condition=Q(is_open=False), name='bill_closed_by_restaurant'),
+        ]
+
     def __str__(self):
         return f"Bill #{self.id} - {self.table.name} - {'Open' if self.is_open else 'Closed'}"
 
-    def recalculate_totals(self):
-        """Recalculate bill totals based on line items"""
-        self.subtotal_cents = sum(line.line_total_cents for line in self.lines.all())
-        self.tax_cents = int(self.subtotal_cents * float(self.restaurant.tax_rate))
-        self.service_fee_cents = int(self.subtotal_cents * float(self.restaurant.service_fee_rate))
+    @property
+    def etag(self):
+        """Strong ETag of the full bill response; changes whenever version does"""
+        return f'"bill-{self.id}-v{self.version}"'
+
+    def changes_etag(self, since_version):
+        """Strong ETag of the ?since_version= delta response, distinct from the full bill's"""
+        return f'"bill-{self.id}-v{self.version}-since{since_version}"'
+
+    @classmethod
+    def open_for_table(cls, table, lock=False, create=True):
+        """
+        Return the table's open bill, creating it if needed (or None when create=False).
+        With lock=True the row is locked FOR UPDATE, so the caller must be inside
+        transaction.atomic(); concurrent writers to the same bill then serialize on it.
+        Creation races are settled by the one_open_bill_per_table constraint.
+        """
+        queryset = cls.objects.select_for_update() if lock else cls.objects
+        try:
+            return queryset.get(table=table, is_open=True)
+        except cls.DoesNotExist:
+            if not create:
+                return None
+
+        try:
+            with transaction.atomic():
+                return cls.objects.create(table=table, restaurant_id=table.restaurant_id)
+        except IntegrityError:
+            # Another request opened the bill first; use theirs
+            return queryset.get(table=table, is_open=True)
+
+    def count_covers(self):
+        """Diners on the bill, counted as distinct ordering sessions (at least one)"""
+        return max(self.lines.values('session_id').distinct().count(), 1)
+
+    TOTAL_FIELDS = ['subtotal_cents', 'tax_cents', 'service_fee_cents', 'total_cents', 'remaining_cents']
+
+    def recalculate_totals(self, restaurant=None):
+        """
+        Recalculate bill totals from scratch based on line items.
+        Used for reconciliation; the ordering path uses apply_line_delta().
+        """
+        restaurant = restaurant or self.restaurant
+        self.subtotal_cents = self.lines.aggregate(total=Sum('line_total_cents'))['total'] or 0
+        self.tax_cents = charge_cents(self.subtotal_cents, restaurant.tax_rate)
+        self.service_fee_cents = charge_cents(self.subtotal_cents, restaurant.service_fee_rate)
         self.total_cents = self.subtotal_cents + self.tax_cents + self.service_fee_cents + self.tip_cents
-        self.save()
+        self.remaining_cents = self.total_cents - self.paid_cents
+        self.version = F('version') + 1
+        self.save(update_fields=self.TOTAL_FIELDS + ['version', 'updated_at'])
+        self.refresh_from_db(fields=['version'])
+
+    def apply_line_delta(self, delta_cents, restaurant):
+        """
+        Apply a change in line subtotal with a single UPDATE and reload the totals and version.
+        Call inside the same transaction as the BillLine insert/delete, before stamping the
+        line (or its BillLineRemoval) with the new version.
+        """
+        subtotal = F('subtotal_cents') + delta_cents
+        tax = charge_cents_expression(subtotal, restaurant.tax_rate)
+        service_fee = charge_cents_expression(subtotal, restaurant.service_fee_rate)
+        total = subtotal + tax + service_fee + F('tip_cents')
+        Bill.objects.filter(pk=self.pk).update(
+            subtotal_cents=subtotal,
+            tax_cents=tax,
+            service_fee_cents=service_fee,
+            total_cents=total,
+            remaining_cents=total - F('paid_cents'),
+            version=F('version') + 1,
+            updated_at=timezone.now(),
+        )
+        self.refresh_from_db(fields=self.TOTAL_FIELDS + ['version', 'updated_at'])
+
+    def apply_payment(self, amount_cents, tip_cents=0):
+        """
+        Record a succeeded payment (and any tip it adds) on the ledger columns, then close
+        the bill with one conditional UPDATE if nothing remains. Returns True if this call
+        closed it. Call with the bill row locked, in the transaction that creates the Payment.
+        """
+        now = timezone.now()
+        bills = Bill.objects.filter(pk=self.pk)
+        bills.update(
+            tip_cents=F('tip_cents') + tip_cents,
+            total_cents=F('total_cents') + tip_cents,
+            paid_cents=F('paid_cents') + amount_cents,
+            remaining_cents=F('remaining_cents') + tip_cents - amount_cents,
+            version=F('version') + 1,
+            updated_at=now,
+        )
+        closed = bills.filter(is_open=True, remaining_cents__lte=0).update(is_open=False, closed_at=now)
+        self.refresh_from_db(fields=[
+            'tip_cents', 'total_cents', 'paid_cents', 'remaining_cents', 'version', 'is_open', 'closed_at', 'updated_at',
+        ])
+        return bool(closed)
 
 
 class BillLine(models.Model):
+    STATUS_CHOICES = [
+        ('sent', 'Sent to kitchen'),
+        ('preparing', 'Preparing'),
+        ('served', 'Served'),
+    ]
+    # Allowed moves for the kitchen: new status -> statuses it may come from
+    STATUS_TRANSITIONS = {
+        'preparing': ['sent'],
+        'served': ['sent', 'preparing'],
+    }
+
     bill = models.ForeignKey(Bill, on_delete=models.CASCADE, related_name='lines')
+    # Copy of bill.restaurant, so the kitchen queue index can lead with it
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='+')
     item = models.ForeignKey(MenuItem, on_delete=models.SET_NULL, null=True, blank=True)
     name_snapshot = models.CharField(max_length=255)
     options_snapshot = models.JSONField(default=dict, blank=True)
@@ -107,12 +253,35 @@ class BillLine(models.Model):
     line_total_cents = models.IntegerField()
     session_id = models.CharField(max_length=255, blank=True, default='')  # Track which customer ordered this
     ordered_at = models.DateTimeField(auto_now_add=True)  # When this item was ordered
+    bill_version = models.PositiveIntegerField(default=0)  # Bill version that added this line
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='sent')
+    status_changed_at = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['bill', 'session_id'], name='billline_bill_session'),
+            # Kitchen queue: one restaurant's lines not yet served, in order (small however many lines exist)
+            models.Index(fields=['restaurant', 'ordered_at', 'id'], condition=~Q(status='served'), name='billline_kitchen_queue'),
+        ]
+
     def __str__(self):
         return f"{self.name_snapshot} x{self.qty} - ${self.line_total_cents / 100:.2f}"
 
 
+class BillLineRemoval(models.Model):
+    """
+    Tombstone for a deleted bill line, so ?since_version= deltas can report removals.
+    Goes away with the bill (CASCADE), including when it is archived.
+    """
+    bill = models.ForeignKey(Bill, on_delete=models.CASCADE, related_name='line_removals')
+    line_id = models.BigIntegerField()
+    bill_version = models.PositiveIntegerField()  # Bill version that removed the line
+
+    def __str__(self):
+        return f"Line #{self.line_id} removed from Bill #{self.bill_id} at v{self.bill_version}"
+
+
 class Payment(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -125,8 +294,331 @@ class Payment(models.Model):
     amount_cents = models.IntegerField()
     provider = models.CharField(max_length=50, default='stripe')
     provider_ref = models.CharField(max_length=255, blank=True)
+    session_id = models.CharField(max_length=255, blank=True, default='')  # Diner who paid, if known
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['bill', 'status'], name='payment_bill_status'),
+        ]
+
     def __str__(self):
         return f"Payment #{self.id} - ${self.amount_cents / 100:.2f} - {self.status}"
+
+
+class BillSession(models.Model):
+    """
+    Running per-diner totals for a bill, updated in the same transaction as the line or
+    payment that changes them, so split payments and the session breakdown read one row
+    per diner instead of the bill's lines
+    """
+    bill = models.ForeignKey(Bill, on_delete=models.CASCADE, related_name='sessions')
+    session_id = models.CharField(max_length=255, blank=True, default='')
+    subtotal_cents = models.IntegerField(default=0)
+    item_count = models.IntegerField(default=0)
+    paid_cents = models.IntegerField(default=0)  # Including tips
+    tip_cents = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['bill', 'session_id'], name='one_row_per_bill_session'),
+        ]
+
+    def __str__(self):
+        return f"Bill #{self.bill_id} - session {self.session_id or 'unknown'}"
+
+    @classmethod
+    def add(cls, bill_id, session_id, **amounts):
+        """Add amounts (subtotal_cents=..., item_count=...) to the session's row, creating it if needed"""
+        rows = cls.objects.filter(bill_id=bill_id, session_id=session_id)
+        increments = {field: F(field) + value for field, value in amounts.items()}
+        if rows.update(**increments, updated_at=timezone.now()):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(bill_id=bill_id, session_id=session_id, **amounts)
+        except IntegrityError:
+            rows.update(**increments, updated_at=timezone.now())
+
+    def charges(self, bill):
+        """(tax, service fee) share of the bill's charges, in proportion to this session's subtotal"""
+        if bill.subtotal_cents <= 0:
+            return 0, 0
+        proportion = self.subtotal_cents / bill.subtotal_cents
+        return int(bill.tax_cents * proportion), int(bill.service_fee_cents * proportion)
+
+    def remaining(self, bill):
+        """This session's share of the bill (subtotal, tax and fee) not yet covered by its payments, tips aside"""
+        tax, service_fee = self.charges(bill)
+        return max(self.subtotal_cents + tax + service_fee - (self.paid_cents - self.tip_cents), 0)
+
+
+class BillEvent(models.Model):
+    """
+    Append-only feed of bill changes per restaurant, streamed to admin screens.
+    The id doubles as the resume cursor (SSE Last-Event-ID).
+    """
+    KIND_CHOICES = [
+        ('line_added', 'Line added'),
+        ('line_removed', 'Line removed'),
+        ('payment', 'Payment'),
+        ('bill_closed', 'Bill closed'),
+    ]
+
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='bill_events')
+    bill = models.ForeignKey(Bill, on_delete=models.CASCADE, related_name='events')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['restaurant', 'id'], name='billevent_restaurant_cursor'),
+        ]
+
+    def __str__(self):
+        return f"Event #{self.id} - {self.kind} - Bill #{self.bill_id}"
+
+    @staticmethod
+    def line_payload(line):
+        return {
+            'id': line.id,
+            'name': line.name_snapshot,
+            'qty': line.qty,
+            'price': line.unit_price_cents / 100,
+            'lineTotal': line.line_total_cents / 100,
+            'orderedAt': line.ordered_at.isoformat() if line.ordered_at else None,
+            'sessionId': line.session_id or 'unknown',
+        }
+
+    @classmethod
+    def for_bill(cls, bill, kind, payload):
+        """Unsaved event for bill; create with .save() or bulk_create() inside the write's transaction"""
+        return cls(restaurant_id=bill.restaurant_id, bill_id=bill.id, kind=kind, payload={
+            'billId': bill.id,
+            'tableId': bill.table_id,
+            'total': bill.total_cents / 100,
+            **payload,
+        })
+
+
+class RevenueRollup(models.Model):
+    """
+    Per-restaurant revenue totals for closed bills, bucketed by the local day or hour they closed in.
+    Updated in the same transaction that closes a bill; rebuilt from closed bills by the backfill_revenue_rollups command.
+    """
+    GRANULARITY_CHOICES = [
+        ('day', 'Day'),
+        ('hour', 'Hour'),
+    ]
+
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='revenue_rollups')
+    granularity = models.CharField(max_length=4, choices=GRANULARITY_CHOICES)
+    bucket_start = models.DateTimeField()  # Local midnight or top of the hour
+    revenue_cents = models.BigIntegerField(default=0)
+    tax_cents = models.BigIntegerField(default=0)
+    service_fee_cents = models.BigIntegerField(default=0)
+    tip_cents = models.BigIntegerField(default=0)
+    bill_count = models.IntegerField(default=0)
+    covers = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['restaurant', 'granularity', 'bucket_start'], name='one_rollup_per_bucket'),
+        ]
+
+    def __str__(self):
+        return f"{self.restaurant.name} - {self.granularity} {self.bucket_start:%Y-%m-%d %H:%M}"
+
+    @staticmethod
+    def buckets(moment):
+        """(granularity, bucket_start) pairs a moment falls in, in the current time zone"""
+        local = timezone.localtime(moment)
+        hour = local.replace(minute=0, second=0, microsecond=0)
+        return [('day', hour.replace(hour=0)), ('hour', hour)]
+
+    @classmethod
+    def add(cls, restaurant_id, moment, **amounts):
+        """Add amounts (revenue_cents=..., bill_count=...) to the day and hour buckets of moment"""
+        for granularity, bucket_start in cls.buckets(moment):
+            rollups = cls.objects.filter(restaurant_id=restaurant_id, granularity=granularity, bucket_start=bucket_start)
+            increments = {field: F(field) + value for field, value in amounts.items()}
+            if rollups.update(**increments, updated_at=timezone.now()):
+                continue
+            try:
+                with transaction.atomic():
+                    cls.objects.create(restaurant_id=restaurant_id, granularity=granularity,
+                                       bucket_start=bucket_start, **amounts)
+            except IntegrityError:
+                # Another close created the bucket first
+                rollups.update(**increments, updated_at=timezone.now())
+
+    @classmethod
+    def record_close(cls, bill, covers):
+        """Roll a just-closed bill into its buckets; call in the transaction that closes it"""
+        cls.add(
+            bill.restaurant_id,
+            bill.closed_at,
+            revenue_cents=bill.total_cents,
+            tax_cents=bill.tax_cents,
+            service_fee_cents=bill.service_fee_cents,
+            tip_cents=bill.tip_cents,
+            bill_count=1,
+            covers=covers,
+        )
+
+
+class IdempotencyKey(models.Model):
+    """
+    Stored response for a request made with an Idempotency-Key header.
+    Inserted in the same transaction as the request's writes, so a concurrent
+    duplicate blocks on the unique index until the first request commits.
+    """
+    scope = models.CharField(max_length=255)  # Request path, e.g. /api/public/tables/3/bill/items
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    response_status = models.PositiveSmallIntegerField(null=True)
+    response_body = models.JSONField(null=True, encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'key'], name='one_response_per_idempotency_key'),
+        ]
+        indexes = [
+            models.Index(fields=['expires_at'], name='idempotencykey_expires'),
+        ]
+
+    def __str__(self):
+        return f"{self.scope} [{self.key}] - {self.response_status}"
+
+
+class Job(models.Model):
+    """
+    Background job for the run_jobs worker (see core.jobs). Created in the caller's transaction,
+    so a job exists exactly when the write that asked for it committed.
+    """
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=100)  # Name of a handler registered with @job
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)  # Handler keyword arguments
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)  # Not before; pushed back on each retry
+    claimed_by = models.CharField(max_length=100, blank=True)  # Worker and claim token while running
+    claimed_at = models.DateTimeField(null=True, blank=True)  # Renewed by the worker's heartbeat
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Due jobs, oldest first; only queued rows are in the index
+            models.Index(fields=['run_at', 'id'], condition=Q(status='queued'), name='job_queued_due'),
+            models.Index(fields=['claimed_at'], condition=Q(status='running'), name='job_running_claimed'),
+            models.Index(fields=['finished_at'], condition=Q(status__in=['done', 'failed']), name='job_finished'),
+        ]
+
+    def __str__(self):
+        return f"Job #{self.id} - {self.kind} - {self.status}"
+
+
+class Receipt(models.Model):
+    """
+    Receipt of a closed bill, rendered once as JSON and HTML (see core.receipts). Keyed by the
+    bill id rather than a foreign key so it outlives the bill's move to the archive tables, and
+    served by its random token, so receipts cannot be found by counting bill ids. Both documents
+    are stored gzip-compressed and sent as stored to clients that accept gzip.
+    """
+    bill_id = models.BigIntegerField(primary_key=True)
+    token = models.CharField(max_length=64, unique=True)
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='receipts')
+    json_gz = models.BinaryField()
+    html_gz = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Receipt for bill #{self.bill_id}"
+
+
+# Archive: closed bills older than the retention window move here (archive_closed_bills) so the
+# live Bill/BillLine/Payment tables only hold recent history. Rows keep their original ids and
+# column names, so code reading closed bills can run the same query against both (see closed_bills()).
+
+class ArchivedBill(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='archived_bills')
+    table = models.ForeignKey(Table, on_delete=models.CASCADE, related_name='archived_bills')
+    is_open = models.BooleanField(default=False)
+    subtotal_cents = models.IntegerField(default=0)
+    tax_cents = models.IntegerField(default=0)
+    service_fee_cents = models.IntegerField(default=0)
+    tip_cents = models.IntegerField(default=0)
+    total_cents = models.IntegerField(default=0)
+    paid_cents = models.IntegerField(default=0)
+    remaining_cents = models.IntegerField(default=0)
+    closed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['restaurant', 'closed_at'], name='archivedbill_closed'),
+        ]
+
+    def __str__(self):
+        return f"Archived bill #{self.id}"
+
+
+class ArchivedBillLine(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    bill = models.ForeignKey(ArchivedBill, on_delete=models.CASCADE, related_name='lines')
+    item = models.ForeignKey(MenuItem, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    name_snapshot = models.CharField(max_length=255)
+    options_snapshot = models.JSONField(default=dict, blank=True)
+    qty = models.IntegerField(default=1)
+    unit_price_cents = models.IntegerField()
+    line_total_cents = models.IntegerField()
+    session_id = models.CharField(max_length=255, blank=True, default='')
+    ordered_at = models.DateTimeField()
+    created_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name_snapshot} x{self.qty} (archived)"
+
+
+class ArchivedPayment(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    bill = models.ForeignKey(ArchivedBill, on_delete=models.CASCADE, related_name='payments')
+    status = models.CharField(max_length=20, choices=Payment.STATUS_CHOICES)
+    amount_cents = models.IntegerField()
+    provider = models.CharField(max_length=50)
+    provider_ref = models.CharField(max_length=255, blank=True)
+    session_id = models.CharField(max_length=255, blank=True, default='')
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Archived payment #{self.id} - {self.status}"
+
+
+def closed_bills(**filters):
+    """
+    Closed bills matching filters as two querysets, live then archived. Both have the same
+    columns and `lines`/`payments` relations, so reports run one query shape against each.
+    """
+    return [
+        Bill.objects.filter(is_open=False, **filters),
+        ArchivedBill.objects.filter(**filters),
+    ]
@@ -0,0 +1,29 @@
+from django.conf import settings
+from rest_framework.permissions import BasePermission
+from .models import Restaurant
+import hmac
+
+
+class IsRestaurantAdmin(BasePermission):
+    """
+    Allows requests authenticated by AdminTokenAuthentication, i.e. with a valid X-Admin-Token;
+    request.user is then the admin's Restaurant
+    """
+    message = 'Admin token required'
+
+    def has_permission(self, request, view):
+        return isinstance(request.user, Restaurant)
+
+
+class HasMetricsToken(BasePermission):
+    """
+    Allows requests with `Authorization: Bearer <METRICS_TOKEN>`. Metrics cover every restaurant
+    served by the process, so restaurant admin tokens don't grant them; with no METRICS_TOKEN
+    configured nobody gets them.
+    """
+    message = 'Metrics token required'
+
+    def has_permission(self, request, view):
+        expected = getattr(settings, 'METRICS_TOKEN', '')
+        scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+        return bool(expected) and scheme.lower() == 'bearer' and hmac.compare_digest(token.strip().encode(), expected.encode())
@@ -0,0 +1,114 @@
+"""
+Receipt documents for bills: the data a receipt shows and its rendering as HTML, text and email,
+and the stored JSON/HTML documents of closed bills served by GET /api/public/receipts/<token>
+"""
+import gzip
+import secrets
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.template.loader import render_to_string
+
+from .models import Bill, ArchivedBill, Receipt
+from .renderers import FastJSONRenderer
+
+
+# ?format= -> stored column and content type
+RECEIPT_FORMATS = {
+    'json': ('json_gz', 'application/json'),
+    'html': ('html_gz', 'text/html; charset=utf-8'),
+}
+
+
+def find_bill(bill_id):
+    """The live or archived bill with this id, with restaurant and table loaded; None if neither exists"""
+    for model in (Bill, ArchivedBill):
+        bill = model.objects.select_related('restaurant', 'table').filter(id=bill_id).first()
+        if bill is not None:
+            return bill
+    return None
+
+
+def receipt_data(bill):
+    """Everything a receipt shows, as JSON-ready values with amounts in cents"""
+    lines = bill.lines.order_by('id').values_list('name_snapshot', 'options_snapshot', 'qty', 'unit_price_cents', 'line_total_cents')
+    payments = bill.payments.filter(status='succeeded').order_by('id').values_list('id', 'amount_cents', 'provider', 'created_at')
+    return {
+        'billId': bill.id,
+        'restaurant': bill.restaurant.name,
+        'table': bill.table.name,
+        'isOpen': bill.is_open,
+        'createdAt': bill.created_at.isoformat(),
+        'closedAt': bill.closed_at.isoformat() if bill.closed_at else None,
+        'lines': [
+            {'name': name, 'options': options, 'qty': qty, 'unitPriceCents': unit_price, 'lineTotalCents': line_total}
+            for name, options, qty, unit_price, line_total in lines
+        ],
+        'subtotalCents': bill.subtotal_cents,
+        'taxCents': bill.tax_cents,
+        'serviceFeeCents': bill.service_fee_cents,
+        'tipCents': bill.tip_cents,
+        'totalCents': bill.total_cents,
+        'paidCents': bill.paid_cents,
+        'payments': [
+            {'id': payment_id, 'amountCents': amount, 'provider': provider, 'paidAt': paid_at.isoformat()}
+            for payment_id, amount, provider, paid_at in payments
+        ],
+    }
+
+
+def render_receipt_html(data):
+    return render_to_string('core/receipt.html', {'receipt': data})
+
+
+def receipt_email(data, to):
+    """The receipt as a text + HTML email to one address, ready to send()"""
+    message = EmailMultiAlternatives(
+        subject=f"Your receipt from {data['restaurant']}",
+        body=render_to_string('core/receipt.txt', {'receipt': data}),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[to],
+    )
+    message.attach_alternative(render_receipt_html(data), 'text/html')
+    return message
+
+
+def compress(body):
+    # mtime=0 so the same receipt always compresses to the same bytes
+    return gzip.compress(body, mtime=0)
+
+
+def store_receipt(bill):
+    """
+    Render a closed bill's receipt as JSON and HTML and store both under a new unguessable
+    token; call in the transaction that closes it. Returns the Receipt.
+    """
+    data = receipt_data(bill)
+    receipt = Receipt(
+        bill_id=bill.id,
+        token=secrets.token_urlsafe(24),
+        restaurant_id=bill.restaurant_id,
+        json_gz=compress(FastJSONRenderer().render(data)),
+        html_gz=compress(render_receipt_html(data).encode()),
+    )
+    receipt.save(force_insert=True)
+    return receipt
+
+
+def accepts_gzip(request):
+    """True if the Accept-Encoding header allows gzip (named or by *) with a q-value above 0"""
+    weights = {}
+    for coding in request.headers.get('Accept-Encoding', '').split(','):
+        name, _, params = coding.partition(';')
+        name = name.strip().lower()
+        q = 1.0
+        for param in params.split(';'):
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if name:
+            weights[name] = q
+    return weights.get('gzip', weights.get('x-gzip', weights.get('*', 0.0))) > 0
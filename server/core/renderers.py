@@ -0,0 +1,59 @@
+"""
+JSON rendering for API responses
+"""
+import math
+import re
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # Optional; without it responses go through the stdlib encoder as before
+    orjson = None
+
+
+# orjson writes 1e16 / 0.00001 where json.dumps writes 1e+16 / 1e-05. Such bodies (or any
+# string that merely looks like one) are re-rendered the slow way so output never differs.
+_EXPONENT = re.compile(rb'[0-9]e[-+]?[0-9]')
+
+_encoder_default = JSONEncoder().default  # Decimal, datetime, UUID, ... exactly as DRF encodes them
+
+# orjson's own datetimes end in +00:00 where DRF writes Z, so they go through _encoder_default too
+_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME if orjson else 0
+
+
+def _has_non_finite(data):
+    """True if data holds a NaN or infinite float (orjson writes null; DRF refuses to encode it)"""
+    if isinstance(data, float):
+        return not math.isfinite(data)
+    if isinstance(data, dict):
+        return any(_has_non_finite(value) for value in data.values())
+    if isinstance(data, (list, tuple)):
+        return any(_has_non_finite(value) for value in data)
+    return False
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    Drop-in JSONRenderer that encodes with orjson when it is installed. Output is byte-identical
+    to DRF's compact, UTF-8 rendering; indented (browsable API) responses use the stdlib path.
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or not self.compact or self.ensure_ascii:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            body = orjson.dumps(data, default=_encoder_default, option=_OPTIONS)
+        except TypeError:  # Includes orjson.JSONEncodeError, e.g. integers over 64 bits
+            return super().render(data, accepted_media_type, renderer_context)
+        if _EXPONENT.search(body):
+            return super().render(data, accepted_media_type, renderer_context)
+        if b'null' in body and _has_non_finite(data):
+            # Let DRF raise for NaN/Infinity as it would without orjson
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # DRF escapes these two so the JSON is also valid JavaScript
+        return body.replace('\u2028'.encode(), b'\\u2028').replace('\u2029'.encode(), b'\\u2029')
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Restaurant, Table, MenuCategory, MenuItem, Bill, BillLine, Payment
+from .models import Restaurant, Table, MenuCategory, MenuItem, Bill, BillLine, BillLineRemoval, Payment
 
 
 class MenuItemSerializer(serializers.ModelSerializer):
@@ -33,7 +33,7 @@ class BillSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Bill
-        fields = ['id', 'is_open', 'subtotal_cents', 'tax_cents', 'service_fee_cents', 'tip_cents', 'total_cents', 'created_at', 'lines']
+        fields = ['id', 'is_open', 'subtotal_cents', 'tax_cents', 'service_fee_cents', 'tip_cents', 'total_cents', 'paid_cents', 'remaining_cents', 'version', 'created_at', 'lines']
 
 
 class PaymentSerializer(serializers.ModelSerializer):
@@ -71,6 +71,17 @@ class AdminMenuCategorySerializer(serializers.ModelSerializer):
         read_only_fields = ['created_at', 'updated_at']
 
 
+class AdminMenuItemImportSerializer(serializers.ModelSerializer):
+    """One row of a menu import; the category is given by name so files move between restaurants"""
+    id = serializers.IntegerField(required=False, allow_null=True)
+    category = serializers.CharField(max_length=255)
+    category_position = serializers.IntegerField(required=False, allow_null=True)
+
+    class Meta:
+        model = MenuItem
+        fields = ['id', 'category', 'category_position', 'name', 'description', 'price_cents', 'image_url', 'available', 'options_json']
+
+
 class AdminTableSerializer(serializers.ModelSerializer):
     restaurant_id = serializers.CharField(source='restaurant_slug', read_only=True)
 
@@ -78,3 +89,117 @@ class AdminTableSerializer(serializers.ModelSerializer):
         model = Table
         fields = ['id', 'restaurant_id', 'table_number', 'name', 'table_token', 'created_at']
         read_only_fields = ['created_at', 'table_token']
+
+
+# Read-only fast paths
+class RowSerializer:
+    """
+    Precompiled read-only form of a flat ModelSerializer. Turns values_list() rows (or model
+    instances) into the same dicts serializer.data gives, without per-object field setup.
+    Fields whose output equals the database value are copied; the rest use the field's own
+    to_representation, so formats (e.g. DateTimeField) stay identical.
+    """
+    PASS_THROUGH = (
+        serializers.IntegerField, serializers.CharField, serializers.BooleanField,
+        serializers.JSONField, serializers.PrimaryKeyRelatedField,
+    )
+
+    def __init__(self, serializer_class, exclude=()):
+        self.serializer_class = serializer_class
+        self.exclude = exclude
+        self._compiled = None
+
+    def _compile(self):
+        if self._compiled is None:
+            fields = self.serializer_class().fields
+            names = [name for name in fields if name not in self.exclude]
+            converters = [
+                (index, fields[name].to_representation)
+                for index, name in enumerate(names)
+                if not isinstance(fields[name], self.PASS_THROUGH)
+            ]
+            self._compiled = names, converters
+        return self._compiled
+
+    @property
+    def columns(self):
+        """values_list() arguments, in output order (relation fields give their ids)"""
+        return self._compile()[0]
+
+    def row(self, values):
+        names, converters = self._compile()
+        if converters:
+            values = list(values)
+            for index, to_representation in converters:
+                if values[index] is not None:
+                    values[index] = to_representation(values[index])
+        return dict(zip(names, values))
+
+    def rows(self, rows):
+        return [self.row(values) for values in rows]
+
+    def instance(self, obj):
+        return self.row([getattr(obj, name) for name in self.columns])
+
+
+BILL_ROWS = RowSerializer(BillSerializer, exclude=['lines'])
+BILL_LINE_ROWS = RowSerializer(BillLineSerializer)
+MENU_CATEGORY_ROWS = RowSerializer(MenuCategorySerializer, exclude=['items'])
+MENU_ITEM_ROWS = RowSerializer(MenuItemSerializer)
+
+
+def bill_data(bill):
+    """BillSerializer(bill).data, with the lines read as one values_list() query"""
+    data = BILL_ROWS.instance(bill)
+    data['lines'] = BILL_LINE_ROWS.rows(BillLine.objects.filter(bill_id=bill.id).values_list(*BILL_LINE_ROWS.columns))
+    return data
+
+
+async def abill_data(bill):
+    """Async bill_data()"""
+    data = BILL_ROWS.instance(bill)
+    lines = BillLine.objects.filter(bill_id=bill.id).values_list(*BILL_LINE_ROWS.columns)
+    data['lines'] = BILL_LINE_ROWS.rows([values async for values in lines])
+    return data
+
+
+def bill_changes_data(bill, since_version):
+    """
+    The bill's totals with only the lines added, and the ids of lines removed, after since_version.
+    A line added and removed since then is only listed as removed.
+    """
+    data = BILL_ROWS.instance(bill)
+    data['since_version'] = since_version
+    data['lines'] = BILL_LINE_ROWS.rows(
+        BillLine.objects.filter(bill_id=bill.id, bill_version__gt=since_version).values_list(*BILL_LINE_ROWS.columns)
+    )
+    data['removed_line_ids'] = list(
+        BillLineRemoval.objects.filter(bill_id=bill.id, bill_version__gt=since_version).values_list('line_id', flat=True)
+    )
+    return data
+
+
+async def abill_changes_data(bill, since_version):
+    """Async bill_changes_data()"""
+    data = BILL_ROWS.instance(bill)
+    data['since_version'] = since_version
+    lines = BillLine.objects.filter(bill_id=bill.id, bill_version__gt=since_version).values_list(*BILL_LINE_ROWS.columns)
+    data['lines'] = BILL_LINE_ROWS.rows([values async for values in lines])
+    removals = BillLineRemoval.objects.filter(bill_id=bill.id, bill_version__gt=since_version).values_list('line_id', flat=True)
+    data['removed_line_ids'] = [line_id async for line_id in removals]
+    return data
+
+
+def menu_data(restaurant_id):
+    """MenuCategorySerializer(categories, many=True).data for a restaurant, from two values_list() queries"""
+    categories = MENU_CATEGORY_ROWS.rows(
+        MenuCategory.objects.filter(restaurant_id=restaurant_id).values_list(*MENU_CATEGORY_ROWS.columns)
+    )
+    items_by_category = {category['id']: [] for category in categories}
+    for item in MENU_ITEM_ROWS.rows(
+        MenuItem.objects.filter(category_id__in=list(items_by_category)).values_list(*MENU_ITEM_ROWS.columns)
+    ):
+        items_by_category[item['category']].append(item)
+    for category in categories:
+        category['items'] = items_by_category[category['id']]
+    return categories
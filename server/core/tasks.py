@@ -0,0 +1,38 @@
+"""
+Background job handlers, run by the run_jobs worker (see core.jobs)
+"""
+import io
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.utils import timezone
+
+from .jobs import job
+from .models import Job
+from .receipts import find_bill, receipt_data, receipt_email
+
+
+@job(max_attempts=5, concurrency=4, backoff=30)
+def send_receipt_email(bill_id, email):
+    """Render the bill's receipt and send it; SMTP errors raise and are retried"""
+    bill = find_bill(bill_id)
+    if bill is None:
+        raise LookupError(f'Bill {bill_id} not found')
+    receipt_email(receipt_data(bill), email).send()
+
+
+@job(max_attempts=1)
+def prune_bill_events(hours=24):
+    call_command('prune_bill_events', hours=hours, stdout=io.StringIO())
+
+
+@job(max_attempts=1)
+def prune_idempotency_keys():
+    call_command('prune_idempotency_keys', stdout=io.StringIO())
+
+
+@job(max_attempts=1)
+def prune_jobs(days=7):
+    """Delete finished (done or failed) jobs older than days"""
+    cutoff = timezone.now() - timedelta(days=days)
+    Job.objects.filter(status__in=['done', 'failed'], finished_at__lt=cutoff).delete()
@@ -0,0 +1,9 @@
+from django import template
+
+register = template.Library()
+
+
+@register.filter
+def cents(value):
+    """Format an amount in cents for display, e.g. 1295 -> 12.95"""
+    return f'{value / 100:.2f}'
@@ -0,0 +1,641 @@
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+import gzip
+import io
+import json
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from .jobs import claim, enqueue, heartbeat, requeue_stale
+from .models import Bill, BillEvent, BillLine, BillSession, Job, MenuCategory, MenuItem, Payment, Restaurant, RevenueRollup, Table
+from .renderers import FastJSONRenderer
+from . import authentication, views_public_async
+
+
+ADMIN_TOKEN = 'test-admin'
+
+
+def make_restaurant(admin_token=ADMIN_TOKEN, slug='test'):
+    restaurant = Restaurant.objects.create(name='Test Restaurant', admin_token_hash=Restaurant.hash_token(admin_token))
+    table = Table.objects.create(
+        restaurant=restaurant, restaurant_slug=slug, table_number='1', name='Table 1',
+        table_token_hash=Table.hash_token(f'{slug}-1'),
+    )
+    return restaurant, table
+
+
+def make_item(restaurant, name='Soup', price_cents=900, **fields):
+    category = MenuCategory.objects.get_or_create(restaurant=restaurant, name='Mains')[0]
+    return MenuItem.objects.create(restaurant=restaurant, category=category, name=name, price_cents=price_cents, **fields)
+
+
+def close_bill(table, closed_at, total_cents=1000):
+    return Bill.objects.create(
+        restaurant=table.restaurant, table=table, is_open=False, closed_at=closed_at,
+        subtotal_cents=total_cents, total_cents=total_cents, paid_cents=total_cents,
+    )
+
+
+def streamed(response):
+    return b''.join(response.streaming_content)
+
+
+async def astreamed(response):
+    """The chunks of an async streaming response, as sent"""
+    return [chunk async for chunk in response.streaming_content]
+
+
+class BillExportRangeTests(TestCase):
+    def setUp(self):
+        self.restaurant, self.table = make_restaurant()
+        self.client = APIClient()
+        self.client.credentials(HTTP_X_ADMIN_TOKEN=ADMIN_TOKEN)
+        self.morning = close_bill(self.table, datetime(2026, 10, 17, 9, tzinfo=dt_timezone.utc))
+        self.evening = close_bill(self.table, datetime(2026, 10, 17, 23, 30, tzinfo=dt_timezone.utc))
+        self.next_day = close_bill(self.table, datetime(2026, 10, 18, 0, 30, tzinfo=dt_timezone.utc))
+
+    def exported_ids(self, **params):
+        response = self.client.get('/api/admin/exports/bills', {'format': 'jsonl', **params})
+        self.assertEqual(response.status_code, 200)
+        return [int(line.split(b'"id":')[1].split(b',')[0]) for line in streamed(response).splitlines()]
+
+    def test_to_date_includes_that_day(self):
+        ids = self.exported_ids(**{'from': '2026-10-16', 'to': '2026-10-17'})
+        self.assertEqual(ids, [self.morning.id, self.evening.id])
+
+    def test_single_day_range(self):
+        ids = self.exported_ids(**{'from': '2026-10-18', 'to': '2026-10-18'})
+        self.assertEqual(ids, [self.next_day.id])
+
+    def test_to_datetime_is_exclusive(self):
+        ids = self.exported_ids(**{'from': '2026-10-17', 'to': '2026-10-17T23:30:00Z'})
+        self.assertEqual(ids, [self.morning.id])
+
+    async def test_streams_under_asgi(self):
+        with mock.patch('core.bill_export.PAGE_SIZE', 1):
+            response = await self.async_client.get(
+                '/api/admin/exports/bills?format=jsonl&from=2026-10-17&to=2026-10-18',
+                headers={'X-Admin-Token': ADMIN_TOKEN},
+            )
+            self.assertTrue(response.is_async)
+            chunks = await astreamed(response)
+        self.assertEqual(len(chunks), 3)
+
+
+class MenuExportStreamingTests(TestCase):
+    def setUp(self):
+        self.restaurant, _ = make_restaurant()
+        category = MenuCategory.objects.create(restaurant=self.restaurant, name='Mains')
+        for n in range(5):
+            MenuItem.objects.create(restaurant=self.restaurant, category=category, name=f'Item {n}', price_cents=100 + n)
+
+    async def test_streams_under_asgi(self):
+        with mock.patch('core.menu_io.EXPORT_CHUNK_SIZE', 2):
+            response = await self.async_client.get('/api/admin/menu/export?format=jsonl', headers={'X-Admin-Token': ADMIN_TOKEN})
+            self.assertTrue(response.is_async)
+            chunks = await astreamed(response)
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(b''.join(chunks).count(b'\n'), 5)
+
+
+class FastJSONRendererTests(TestCase):
+    def test_matches_drf_bytes(self):
+        data = {
+            'utc': datetime(2026, 10, 18, 9, 30, 15, 123456, tzinfo=dt_timezone.utc),
+            'offset': datetime(2026, 10, 18, 9, 30, tzinfo=dt_timezone(timedelta(hours=2))),
+            'naive': datetime(2026, 10, 18, 9, 30),
+            'day': date(2026, 10, 18),
+            'rate': Decimal('0.0875'),
+            'values': [1, 2.5, None, 'caf\u00e9 \u2028'],
+        }
+        self.assertEqual(FastJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_non_finite_floats_raise_like_drf(self):
+        for value in (float('nan'), float('inf')):
+            data = {'closedAt': None, 'rate': [value]}
+            with self.assertRaises(ValueError):
+                JSONRenderer().render(data)
+            with self.assertRaises(ValueError):
+                FastJSONRenderer().render(data)
+
+
+class KitchenQueueTests(TestCase):
+    def setUp(self):
+        self.restaurant, self.table = make_restaurant()
+        _, other_table = make_restaurant(admin_token='other-admin', slug='other')
+        self.client = APIClient()
+        self.client.credentials(HTTP_X_ADMIN_TOKEN=ADMIN_TOKEN)
+        self.settled = self.add_line(self.table, 'Soup', seconds_ago=60)
+        self.fresh = self.add_line(self.table, 'Salad', seconds_ago=0)
+        self.add_line(other_table, 'Elsewhere', seconds_ago=60)
+
+    def add_line(self, table, name, seconds_ago):
+        bill = Bill.objects.get_or_create(table=table, is_open=True, defaults={'restaurant': table.restaurant})[0]
+        line = BillLine.objects.create(bill=bill, restaurant=table.restaurant, name_snapshot=name,
+                                       unit_price_cents=500, line_total_cents=500)
+        BillLine.objects.filter(pk=line.pk).update(ordered_at=timezone.now() - timedelta(seconds=seconds_ago))
+        return line
+
+    def test_lists_settled_lines_of_this_restaurant(self):
+        response = self.client.get('/api/admin/kitchen/queue')
+        self.assertEqual([line['id'] for line in response.json()['lines']], [self.settled.id])
+
+    def test_closed_bills_leave_the_queue(self):
+        Bill.objects.filter(table=self.table).update(is_open=False, closed_at=timezone.now())
+        self.assertEqual(self.client.get('/api/admin/kitchen/queue').json()['lines'], [])
+
+    def test_lines_of_other_restaurants_cannot_be_moved(self):
+        other_line = BillLine.objects.get(name_snapshot='Elsewhere')
+        response = self.client.patch(f'/api/admin/kitchen/lines/{other_line.id}', {'status': 'served'}, format='json')
+        self.assertEqual(response.status_code, 404)
+        response = self.client.patch(f'/api/admin/kitchen/lines/{self.settled.id}', {'status': 'served'}, format='json')
+        self.assertEqual(response.status_code, 200)
+
+    def test_fresh_line_comes_once_settled(self):
+        cursor = self.client.get('/api/admin/kitchen/queue').json()['nextCursor']
+        BillLine.objects.filter(pk=self.fresh.pk).update(ordered_at=timezone.now() - timedelta(seconds=30))
+        response = self.client.get('/api/admin/kitchen/queue', {'after': cursor})
+        self.assertEqual([line['id'] for line in response.json()['lines']], [self.fresh.id])
+
+
+class OrderStreamTests(TestCase):
+    def setUp(self):
+        self.restaurant, self.table = make_restaurant()
+        bill = Bill.objects.create(restaurant=self.restaurant, table=self.table)
+        self.late = BillEvent.for_bill(bill, 'line_added', {})
+        self.late.save()
+        self.seen = BillEvent.for_bill(bill, 'payment', {})
+        self.seen.save()
+
+    async def open_stream(self, **headers):
+        response = await self.async_client.get('/api/admin/orders/stream', headers={'X-Admin-Token': ADMIN_TOKEN, **headers})
+        chunks = response.streaming_content
+        self.assertTrue((await chunks.__anext__()).startswith(b'retry: '))
+        return chunks
+
+    async def first_events(self, chunks, count):
+        ids = []
+        try:
+            while len(ids) < count:
+                chunk = await chunks.__anext__()
+                if chunk.startswith(b'id: ') and b'event: ' in chunk:
+                    ids.append(int(chunk.split(b'\n')[0][4:]))
+        finally:
+            await chunks.aclose()
+        return ids
+
+    async def test_resume_resends_recent_events_below_the_cursor(self):
+        # The client saw the higher id first; the lower one committed later
+        chunks = await self.open_stream(**{'Last-Event-ID': str(self.seen.id)})
+        self.assertEqual(await self.first_events(chunks, 2), [self.late.id, self.seen.id])
+
+    async def test_new_client_gets_only_new_events(self):
+        chunks = await self.open_stream()
+        bill = await Bill.objects.aget(table=self.table)
+        fresh = BillEvent.for_bill(bill, 'bill_closed', {})
+        await fresh.asave()
+        self.assertEqual(await self.first_events(chunks, 1), [fresh.id])
+
+
+class ReceiptTests(TestCase):
+    def setUp(self):
+        self.restaurant, self.table = make_restaurant()
+        category = MenuCategory.objects.create(restaurant=self.restaurant, name='Mains')
+        item = MenuItem.objects.create(restaurant=self.restaurant, category=category, name='Soup', price_cents=900)
+        self.client = APIClient()
+        self.client.post(f'/api/public/tables/{self.table.id}/bill/items', {'itemId': item.id, 'sessionId': 's1'}, format='json')
+        payment = self.client.post(f'/api/public/tables/{self.table.id}/payment/intent', {'mode': 'full'}, format='json').json()
+        self.url = payment['receiptUrl']
+
+    def test_served_by_token_without_payment_references(self):
+        self.assertEqual(len(self.url.rsplit('/', 1)[1]), 32)
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'private, max-age=31536000, immutable')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        receipt = json.loads(response.content)
+        self.assertEqual(receipt['totalCents'], 900)
+        self.assertNotIn('providerRef', receipt['payments'][0])
+
+    def test_gzip_only_when_accepted(self):
+        zipped = self.client.get(self.url, HTTP_ACCEPT_ENCODING='br, gzip;q=0.5')
+        self.assertEqual(zipped['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(zipped.content))['totalCents'], 900)
+        for header in ('gzip;q=0', '*;q=0', 'br, *;q=1, gzip;q=0', ''):
+            plain = self.client.get(self.url, HTTP_ACCEPT_ENCODING=header)
+            self.assertFalse(plain.has_header('Content-Encoding'), header)
+            self.assertNotEqual(plain['ETag'], zipped['ETag'])
+
+    def test_not_modified_only_for_existing_receipts(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get('/api/public/receipts/unknown', HTTP_IF_NONE_MATCH=etag).status_code, 404)
+        self.assertEqual(self.client.get('/api/public/receipts/1').status_code, 404)
+
+
+class JobHeartbeatTests(TestCase):
+    def setUp(self):
+        self.slow = enqueue('send_receipt_email', bill_id=1, email='a@example.com')
+        self.abandoned = enqueue('send_receipt_email', bill_id=2, email='b@example.com')
+        self.jobs = claim({'send_receipt_email': None}, 2, 'worker')
+        Job.objects.update(claimed_at=timezone.now() - timedelta(seconds=900))
+
+    def test_only_jobs_without_heartbeat_are_released(self):
+        heartbeat([job for job in self.jobs if job.pk == self.slow.pk])
+        self.assertEqual(requeue_stale(600), 1)
+        self.assertEqual(Job.objects.get(pk=self.slow.pk).status, 'running')
+        self.assertEqual(Job.objects.get(pk=self.abandoned.pk).status, 'queued')
+
+    def test_heartbeat_ignores_lost_claims(self):
+        requeue_stale(600)
+        heartbeat(self.jobs)
+        self.assertFalse(Job.objects.filter(status='running').exists())
+
+
+class AdminPermissionTests(TestCase):
+    def setUp(self):
+        make_restaurant()
+        self.client = APIClient()
+
+    def test_admin_views_need_an_admin_token(self):
+        for path in ('/api/admin/dashboard', '/api/admin/orders', '/api/admin/kitchen/queue', '/api/admin/menu/export'):
+            self.assertEqual(self.client.get(path).status_code, 401, path)
+        self.client.credentials(HTTP_X_ADMIN_TOKEN=ADMIN_TOKEN)
+        self.assertEqual(self.client.get('/api/admin/dashboard').status_code, 200)
+
+    @override_settings(METRICS_TOKEN='scrape-me')
+    def test_metrics_need_the_metrics_token(self):
+        self.client.credentials(HTTP_X_ADMIN_TOKEN=ADMIN_TOKEN)
+        self.assertEqual(self.client.get('/api/admin/metrics').status_code, 403)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(self.client.get('/api/admin/metrics').status_code, 403)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer scrape-me')
+        response = self.client.get('/api/admin/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'billpay_request_duration_seconds', response.content)
+
+    def test_metrics_off_without_a_token_configured(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ')
+        self.assertEqual(self.client.get('/api/admin/metrics').status_code, 403)
+
+
+class BillDeltaETagTests(TestCase):
+    def setUp(self):
+        _, self.table = make_restaurant()
+        self.client = APIClient()
+        self.url = f'/api/public/tables/{self.table.id}/bill'
+
+    def test_delta_and_full_bill_have_distinct_validators(self):
+        full = self.client.get(self.url)
+        delta = self.client.get(self.url, {'since_version': 0})
+        self.assertNotEqual(full['ETag'], delta['ETag'])
+        self.assertEqual(self.client.get(self.url, {'since_version': 0}, HTTP_IF_NONE_MATCH=full['ETag']).status_code, 200)
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=delta['ETag']).status_code, 200)
+        self.assertEqual(self.client.get(self.url, {'since_version': 0}, HTTP_IF_NONE_MATCH=delta['ETag']).status_code, 304)
+
+
+class AdminOrdersCountTests(TestCase):
+    def setUp(self):
+        self.restaurant, self.table = make_restaurant()
+        other = Table.objects.create(restaurant=self.restaurant, restaurant_slug='test', table_number='2', name='Table 2',
+                                     table_token_hash=Table.hash_token('test-2'))
+        for table in (self.table, other):
+            Bill.objects.create(restaurant=self.restaurant, table=table)
+        self.client = APIClient()
+        self.client.credentials(HTTP_X_ADMIN_TOKEN=ADMIN_TOKEN)
+
+    def test_total_counts_every_open_bill_whatever_the_filters(self):
+        data = self.client.get('/api/admin/orders', {'table': self.table.id, 'limit': 1}).json()
+        self.assertEqual((len(data['orders']), data['totalOpenBills'], data['matchingCount']), (1, 2, 1))
+        data = self.client.get('/api/admin/orders', {'limit': 1}).json()
+        self.assertEqual((data['totalOpenBills'], data['matchingCount']), (2, 2))
+
+
+class BackfillRevenueRollupsTests(TestCase):
+    def setUp(self):
+        self.restaurant, self.table = make_restaurant()
+        now = timezone.now()
+        close_bill(self.table, now - timedelta(days=2), total_cents=700)
+        close_bill(self.table, now, total_cents=500)  # Closed before the live rollup existed
+        RevenueRollup.add(self.restaurant.id, now, revenue_cents=300, bill_count=1)  # Live closes since
+
+    def day_revenue(self, moment):
+        (granularity, bucket_start), _ = RevenueRollup.buckets(moment)
+        return RevenueRollup.objects.get(restaurant=self.restaurant, granularity=granularity, bucket_start=bucket_start).revenue_cents
+
+    def test_rebuilds_past_days_and_today(self):
+        call_command('backfill_revenue_rollups', stdout=io.StringIO())
+        self.assertEqual(self.day_revenue(timezone.now() - timedelta(days=2)), 700)
+        self.assertEqual(self.day_revenue(timezone.now()), 500)
+        hours = RevenueRollup.objects.filter(restaurant=self.restaurant, granularity='hour', revenue_cents__gt=0)
+        self.assertEqual(sorted(hours.values_list('revenue_cents', flat=True)), [500, 700])
+
+    def test_live_closes_add_to_the_rebuilt_day(self):
+        call_command('backfill_revenue_rollups', stdout=io.StringIO())
+        RevenueRollup.record_close(close_bill(self.table, timezone.now(), total_cents=200), covers=1)
+        self.assertEqual(self.day_revenue(timezone.now()), 700)
+
+
+class MineOnlyPaymentTests(TestCase):
+    def setUp(self):
+        restaurant, self.table = make_restaurant()
+        category = MenuCategory.objects.create(restaurant=restaurant, name='Mains')
+        self.client = APIClient()
+        for session_id, price in (('a', 2500), ('b', 4000)):
+            item = MenuItem.objects.create(restaurant=restaurant, category=category, name=f'Dish {session_id}', price_cents=price)
+            self.client.post(f'/api/public/tables/{self.table.id}/bill/items', {'itemId': item.id, 'sessionId': session_id}, format='json')
+
+    def pay(self, session_id, tip=0):
+        return self.client.post(f'/api/public/tables/{self.table.id}/payment/intent',
+                                {'mode': 'mine_only', 'sessionId': session_id, 'tip': tip}, format='json')
+
+    def test_session_pays_its_share_once(self):
+        first = self.pay('b', tip=300)
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(self.pay('b').status_code, 400)
+        self.assertEqual(self.pay('a').status_code, 201)
+        bill = Bill.objects.get()
+        self.assertFalse(bill.is_open)
+        self.assertEqual((bill.paid_cents, bill.remaining_cents), (bill.total_cents, 0))
+
+
+class AsyncAddBillItemTests(TestCase):
+    """The async add-item view (served under ASGI) against the DRF one"""
+    def setUp(self):
+        restaurant, self.table = make_restaurant()
+        category = MenuCategory.objects.create(restaurant=restaurant, name='Mains')
+        self.item = MenuItem.objects.create(restaurant=restaurant, category=category, name='Soup', price_cents=900)
+        self.path = f'/api/public/tables/{self.table.id}/bill/items'
+        self.client = APIClient()
+
+    async def add_async(self, body, method='post', **headers):
+        request = getattr(AsyncRequestFactory(), method)(self.path, body, content_type='application/json', headers=headers)
+        return await views_public_async.add_bill_item(request, self.table.id)
+
+    async def test_replays_before_checking_the_item(self):
+        body = json.dumps({'itemId': self.item.id, 'sessionId': 's1'})
+        first = await self.add_async(body, **{'Idempotency-Key': 'k1'})
+        self.assertEqual(first.status_code, 201)
+        await MenuItem.objects.filter(pk=self.item.pk).aupdate(available=False)
+        retry = await self.add_async(body, **{'Idempotency-Key': 'k1'})
+        self.assertEqual((retry.status_code, retry['Idempotent-Replayed']), (201, 'true'))
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual((await self.add_async(body, **{'Idempotency-Key': 'k2'})).status_code, 400)
+        self.assertEqual(await BillLine.objects.acount(), 1)
+
+    async def test_errors_match_the_drf_view(self):
+        for method, body in (('get', ''), ('post', '{bad')):
+            expected = await sync_to_async(getattr(self.client, method))(self.path, body, content_type='application/json')
+            response = await self.add_async(body, method=method)
+            self.assertEqual((response.status_code, response.content), (expected.status_code, expected.content))
+            if response.status_code == 405:
+                self.assertEqual(response['Allow'], expected['Allow'])
+
+
+class BillLineDeltaTests(TestCase):
+    def setUp(self):
+        restaurant, self.table = make_restaurant()
+        Restaurant.objects.filter(pk=restaurant.pk).update(tax_rate=Decimal('0.0875'), service_fee_rate=Decimal('0.18'))
+        self.items = [make_item(restaurant, 'Soup', 1299), make_item(restaurant, 'Bread', 333)]
+        self.client = APIClient()
+        self.path = f'/api/public/tables/{self.table.id}/bill/items'
+
+    def assert_totals_match_recalculation(self):
+        bill = Bill.objects.get(table=self.table, is_open=True)
+        applied = [getattr(bill, field) for field in Bill.TOTAL_FIELDS]
+        bill.recalculate_totals()
+        bill.refresh_from_db()
+        self.assertEqual(applied, [getattr(bill, field) for field in Bill.TOTAL_FIELDS])
+
+    def test_deltas_equal_recalculated_totals(self):
+        for item, qty in ((self.items[0], 3), (self.items[1], 1), (self.items[1], 7)):
+            self.client.post(self.path, {'itemId': item.id, 'qty': qty}, format='json')
+            self.assert_totals_match_recalculation()
+        self.client.delete(f'{self.path}/{BillLine.objects.order_by("id").first().id}')
+        self.assert_totals_match_recalculation()
+
+
+class OneOpenBillPerTableTests(TestCase):
+    def setUp(self):
+        self.restaurant, self.table = make_restaurant()
+        self.bill = Bill.objects.create(restaurant=self.restaurant, table=self.table)
+
+    def test_second_open_bill_is_rejected(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Bill.objects.create(restaurant=self.restaurant, table=self.table)
+        close_bill(self.table, timezone.now())  # Closed bills don't count
+
+    def test_open_for_table_returns_the_existing_bill(self):
+        self.assertEqual(Bill.open_for_table(self.table), self.bill)
+        with mock.patch.object(Bill.objects, 'get', side_effect=[Bill.DoesNotExist, self.bill]) as get:
+            # Lost the race: the insert hits the constraint and the winner's bill is returned
+            self.assertEqual(Bill.open_for_table(self.table), self.bill)
+        self.assertEqual(get.call_count, 2)
+        self.assertEqual(Bill.objects.filter(table=self.table, is_open=True).count(), 1)
+
+
+class BatchAddTests(TestCase):
+    def setUp(self):
+        restaurant, self.table = make_restaurant()
+        self.items = [make_item(restaurant, f'Dish {n}', 500 + n) for n in range(3)]
+        self.client = APIClient()
+
+    def test_cart_is_one_insert_and_one_totals_update(self):
+        cart = [{'itemId': item.id, 'qty': 2} for item in self.items] + [{'itemId': self.items[0].id}]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(f'/api/public/tables/{self.table.id}/bill/items/batch',
+                                        {'items': cart, 'sessionId': 's1'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        bill_updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "core_bill" ')]
+        self.assertEqual(len(bill_updates), 1)
+        self.assertEqual(len([q for q in queries if q['sql'].startswith('INSERT INTO "core_billline" ')]), 1)
+        bill = Bill.objects.get()
+        self.assertEqual(bill.lines.count(), 4)
+        self.assertEqual(bill.subtotal_cents, 2 * (500 + 501 + 502) + 500)
+
+
+class IdempotencyKeyTests(TestCase):
+    def setUp(self):
+        restaurant, self.table = make_restaurant()
+        self.item = make_item(restaurant)
+        self.client = APIClient()
+        self.path = f'/api/public/tables/{self.table.id}/bill/items'
+
+    def add(self, key, qty=1):
+        return self.client.post(self.path, {'itemId': self.item.id, 'qty': qty}, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_repeat_replays_the_stored_response(self):
+        first = self.add('k1')
+        repeat = self.add('k1')
+        self.assertEqual((first.status_code, repeat.status_code), (201, 201))
+        self.assertEqual(repeat['Idempotent-Replayed'], 'true')
+        self.assertEqual(repeat.json(), first.json())
+        self.assertFalse(first.has_header('Idempotent-Replayed'))
+        self.assertEqual(BillLine.objects.count(), 1)
+        self.add('k2')
+        self.assertEqual(BillLine.objects.count(), 2)
+
+    def test_key_reused_with_another_body_is_rejected(self):
+        self.add('k1')
+        response = self.add('k1', qty=2)
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(BillLine.objects.count(), 1)
+
+
+class BillLedgerTests(TestCase):
+    def setUp(self):
+        restaurant, self.table = make_restaurant()
+        self.client = APIClient()
+        self.client.post(f'/api/public/tables/{self.table.id}/bill/items', {'itemId': make_item(restaurant).id}, format='json')
+
+    def test_only_the_payment_that_clears_the_bill_closes_it(self):
+        bill = Bill.objects.get()
+        owed = bill.remaining_cents
+        self.assertFalse(bill.apply_payment(owed - 100))
+        self.assertFalse(bill.apply_payment(100, tip_cents=50))  # The tip is owed too
+        self.assertTrue(bill.apply_payment(50))
+        closed_at = bill.closed_at
+        self.assertFalse(bill.apply_payment(10))
+        bill.refresh_from_db()
+        self.assertEqual((bill.is_open, bill.closed_at, bill.paid_cents), (False, closed_at, owed + 60))
+
+    def test_split_payments_roll_the_bill_up_once(self):
+        path = f'/api/public/tables/{self.table.id}/payment/intent'
+        for _ in range(2):
+            response = self.client.post(path, {'mode': 'split_even', 'seats': 2}, format='json')
+            self.assertEqual(response.status_code, 201)
+        bill = Bill.objects.get()
+        self.assertFalse(bill.is_open)
+        rollup = RevenueRollup.objects.get(granularity='day')
+        self.assertEqual((rollup.bill_count, rollup.revenue_cents), (1, bill.total_cents))
+
+
+class BillSessionAggregateTests(TestCase):
+    def test_sessions_match_their_lines_after_adds_and_removals(self):
+        restaurant, table = make_restaurant()
+        soup, steak = make_item(restaurant), make_item(restaurant, name='Steak', price_cents=2400)
+        client = APIClient()
+        path = f'/api/public/tables/{table.id}/bill/items'
+        for item, qty, session_id in ((soup, 2, 'a'), (steak, 1, 'a'), (steak, 3, 'b'), (soup, 1, 'b')):
+            client.post(path, {'itemId': item.id, 'qty': qty, 'sessionId': session_id}, format='json')
+        for line in BillLine.objects.filter(item=steak):
+            self.assertEqual(client.delete(f'{path}/{line.id}').status_code, 200)
+
+        sessions = {session.session_id: session for session in BillSession.objects.all()}
+        self.assertEqual(set(sessions), {'a', 'b'})
+        for session_id, session in sessions.items():
+            lines = BillLine.objects.filter(session_id=session_id)
+            self.assertEqual(session.subtotal_cents, sum(line.line_total_cents for line in lines))
+            self.assertEqual(session.item_count, sum(line.qty for line in lines))
+        self.assertEqual((sessions['a'].item_count, sessions['b'].subtotal_cents), (2, 900))
+
+
+class MenuImportTests(TestCase):
+    def setUp(self):
+        self.restaurant, _ = make_restaurant()
+        self.soup = make_item(self.restaurant)
+        self.client = APIClient()
+        self.client.credentials(HTTP_X_ADMIN_TOKEN=ADMIN_TOKEN)
+
+    def post(self, *rows):
+        body = ''.join(json.dumps(row) + '\n' for row in rows)
+        return self.client.generic('POST', '/api/admin/menu/import?format=jsonl', body, content_type='application/jsonl')
+
+    def test_rows_update_matching_items_and_create_the_rest(self):
+        response = self.post(
+            {'id': self.soup.id, 'category': 'Mains', 'name': 'Onion Soup', 'price_cents': 950},
+            {'category': 'Mains', 'name': 'Steak', 'price_cents': 2400},
+            {'category': 'Desserts', 'name': 'Tart', 'price_cents': 700},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'created': 2, 'updated': 1, 'categoriesCreated': 1})
+        self.soup.refresh_from_db()
+        self.assertEqual((self.soup.name, self.soup.price_cents), ('Onion Soup', 950))
+
+        # Again by category and name: everything now exists, so nothing is created
+        response = self.post(
+            {'category': 'Mains', 'name': 'Steak', 'price_cents': 2600},
+            {'category': 'Desserts', 'name': 'Tart', 'price_cents': 700},
+        )
+        self.assertEqual(response.json(), {'created': 0, 'updated': 2, 'categoriesCreated': 0})
+        self.assertEqual(MenuItem.objects.count(), 3)
+        self.assertEqual(MenuItem.objects.get(name='Steak').price_cents, 2600)
+
+    def test_invalid_row_writes_nothing(self):
+        response = self.post(
+            {'category': 'Mains', 'name': 'Steak', 'price_cents': 2400},
+            {'category': 'Mains', 'name': 'Broken'},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([row['line'] for row in response.json()['rows']], [2])
+        self.assertEqual(MenuItem.objects.count(), 1)
+
+
+class ReconcileBillTotalsTests(TestCase):
+    def setUp(self):
+        restaurant, table = make_restaurant()
+        client = APIClient()
+        item = make_item(restaurant)
+        for session_id in ('a', 'b'):
+            client.post(f'/api/public/tables/{table.id}/bill/items', {'itemId': item.id, 'sessionId': session_id}, format='json')
+        client.post(f'/api/public/tables/{table.id}/payment/intent', {'mode': 'mine_only', 'sessionId': 'a'}, format='json')
+        self.bill = Bill.objects.get()
+        self.expected_bill = {field: getattr(self.bill, field) for field in Bill.TOTAL_FIELDS + ['paid_cents']}
+        self.expected_sessions = set(BillSession.objects.values_list('session_id', 'subtotal_cents', 'item_count', 'paid_cents'))
+
+    def reconcile(self, *args):
+        out = io.StringIO()
+        call_command('reconcile_bill_totals', *args, stdout=out)
+        return out.getvalue()
+
+    def test_fixes_drifted_totals_payments_and_sessions(self):
+        Bill.objects.update(subtotal_cents=1, paid_cents=0, remaining_cents=5)
+        BillSession.objects.filter(session_id='a').update(subtotal_cents=0, paid_cents=0)
+        BillSession.objects.filter(session_id='b').delete()
+
+        self.assertIn('Found 1 with drifted totals and 2 drifted sessions', self.reconcile('--dry-run'))
+        self.assertEqual(Bill.objects.get().subtotal_cents, 1)
+        self.assertIn('Fixed 1 with drifted totals and 2 drifted sessions', self.reconcile())
+
+        bill = Bill.objects.get()
+        self.assertEqual({field: getattr(bill, field) for field in self.expected_bill}, self.expected_bill)
+        self.assertEqual(bill.paid_cents, Payment.objects.get().amount_cents)
+        self.assertGreater(bill.version, self.bill.version)
+        self.assertEqual(set(BillSession.objects.values_list('session_id', 'subtotal_cents', 'item_count', 'paid_cents')),
+                         self.expected_sessions)
+        self.assertIn('Fixed 0 with drifted totals and 0 drifted sessions', self.reconcile())
+
+
+class TokenCacheInvalidationTests(TestCase):
+    def setUp(self):
+        self.restaurant, self.table = make_restaurant()
+        authentication.clear_token_cache()
+
+    def bump_in_another_worker(self):
+        """bump_menu_version() as run by another process: this one's local cache is left as it was"""
+        with mock.patch.object(authentication._local_cache, 'delete'):
+            self.restaurant.bump_menu_version()
+
+    def test_other_workers_menu_bump_evicts_the_local_row(self):
+        version = authentication.get_restaurant(self.restaurant.id).menu_version
+        self.bump_in_another_worker()
+        self.assertEqual(authentication.get_restaurant(self.restaurant.id).menu_version, version + 1)
+        self.assertEqual(authentication.get_table(self.table.id).restaurant.menu_version, version + 1)
+        with self.assertNumQueries(0):
+            authentication.get_restaurant(self.restaurant.id)
+
+    async def test_async_lookups_see_the_bump(self):
+        await authentication.aget_restaurant_from_table_token('test-1')
+        version = (await authentication.aget_restaurant(self.restaurant.id)).menu_version
+        await sync_to_async(self.bump_in_another_worker)()
+        restaurant, _ = await authentication.aget_restaurant_from_table_token('test-1')
+        self.assertEqual(restaurant.menu_version, version + 1)
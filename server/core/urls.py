@@ -1,31 +1,59 @@
+from django.conf import settings
 from django.urls import path
 from .views_public import (
-    TableContextView, PublicMenuView, TableBillView,
-    AddBillItemView, RemoveBillItemView, PaymentIntentView, ReceiptEmailView
+    TableContextView, PublicMenuView, TableBillView, TableBillSessionsView,
+    AddBillItemView, AddBillItemsBatchView, RemoveBillItemView, PaymentIntentView, ReceiptEmailView,
+    ReceiptView
 )
 from .views_admin import (
     AdminDashboardView, AdminMenuCategoriesView, AdminMenuCategoryDetailView,
     AdminMenuItemsView, AdminMenuItemDetailView, AdminTablesView, AdminSettingsView,
-    AdminOrdersView
+    AdminOrdersView, AdminMetricsView, AdminMenuImportView, AdminMenuExportView, AdminBillExportView,
+    AdminItemAnalyticsView, AdminKitchenQueueView, AdminKitchenLineView
 )
+from .views_stream import admin_order_events
+from . import views_public_async
+
+if settings.ASYNC_PUBLIC_API:
+    # Under ASGI the hot diner endpoints are served by async views (see server/asgi.py)
+    table_context_view = views_public_async.table_context
+    public_menu_view = views_public_async.public_menu
+    table_bill_view = views_public_async.table_bill
+    add_bill_item_view = views_public_async.add_bill_item
+else:
+    table_context_view = TableContextView.as_view()
+    public_menu_view = PublicMenuView.as_view()
+    table_bill_view = TableBillView.as_view()
+    add_bill_item_view = AddBillItemView.as_view()
 
 urlpatterns = [
     # Public endpoints
-    path('public/table-context/<str:table_token>', TableContextView.as_view(), name='table-context'),
-    path('public/menu/<str:table_token>', PublicMenuView.as_view(), name='public-menu'),
-    path('public/tables/<int:table_id>/bill', TableBillView.as_view(), name='table-bill'),
-    path('public/tables/<int:table_id>/bill/items', AddBillItemView.as_view(), name='add-bill-item'),
+    path('public/table-context/<str:table_token>', table_context_view, name='table-context'),
+    path('public/menu/<str:table_token>', public_menu_view, name='public-menu'),
+    path('public/tables/<int:table_id>/bill', table_bill_view, name='table-bill'),
+    path('public/tables/<int:table_id>/bill/sessions', TableBillSessionsView.as_view(), name='table-bill-sessions'),
+    path('public/tables/<int:table_id>/bill/items', add_bill_item_view, name='add-bill-item'),
+    path('public/tables/<int:table_id>/bill/items/batch', AddBillItemsBatchView.as_view(), name='add-bill-items-batch'),
     path('public/tables/<int:table_id>/bill/items/<int:line_id>', RemoveBillItemView.as_view(), name='remove-bill-item'),
     path('public/tables/<int:table_id>/payment/intent', PaymentIntentView.as_view(), name='payment-intent'),
     path('public/receipt/email', ReceiptEmailView.as_view(), name='receipt-email'),
+    path('public/receipts/<str:token>', ReceiptView.as_view(), name='receipt'),
     
     # Admin endpoints
     path('admin/dashboard', AdminDashboardView.as_view(), name='admin-dashboard'),
     path('admin/orders', AdminOrdersView.as_view(), name='admin-orders'),
+    path('admin/orders/stream', admin_order_events, name='admin-order-events'),
+    path('admin/kitchen/queue', AdminKitchenQueueView.as_view(), name='admin-kitchen-queue'),
+    path('admin/kitchen/lines/<int:line_id>', AdminKitchenLineView.as_view(), name='admin-kitchen-line'),
     path('admin/menu/categories', AdminMenuCategoriesView.as_view(), name='admin-categories'),
     path('admin/menu/categories/<int:category_id>', AdminMenuCategoryDetailView.as_view(), name='admin-category-detail'),
     path('admin/menu/items', AdminMenuItemsView.as_view(), name='admin-items'),
     path('admin/menu/items/<int:item_id>', AdminMenuItemDetailView.as_view(), name='admin-item-detail'),
+    path('admin/menu/import', AdminMenuImportView.as_view(), name='admin-menu-import'),
+    path('admin/menu/export', AdminMenuExportView.as_view(), name='admin-menu-export'),
+    path('admin/analytics/items', AdminItemAnalyticsView.as_view(), name='admin-item-analytics'),
+    path('admin/exports/bills', AdminBillExportView.as_view(), name='admin-bill-export'),
     path('admin/tables', AdminTablesView.as_view(), name='admin-tables'),
     path('admin/settings', AdminSettingsView.as_view(), name='admin-settings'),
+    path('admin/metrics', AdminMetricsView.as_view(), name='admin-metrics'),
 ]
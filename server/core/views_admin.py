@@ -1,25 +1,38 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from rest_framework.permissions import IsAuthenticated
-from django.db.models import Sum, Count
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Sum, Count, Q
+from django.http import HttpResponse, StreamingHttpResponse
 from django.utils import timezone
-from datetime import timedelta
-from .models import Restaurant, Table, MenuCategory, MenuItem, Bill
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import datetime, time, timedelta
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+import binascii
+import csv
+from .models import Restaurant, Table, MenuCategory, MenuItem, Bill, BillLine, RevenueRollup
 from .serializers import (
     AdminMenuCategorySerializer, AdminMenuItemSerializer,
     MenuCategoryListSerializer, AdminTableSerializer,
     RestaurantSettingsSerializer
 )
 from .authentication import AdminTokenAuthentication
+from .permissions import HasMetricsToken, IsRestaurantAdmin
+from .metrics import render_metrics
+from .menu_io import aexport_menu, export_menu, import_menu, read_rows
+from .bill_export import aexport_bills, export_bills
+from .analytics import item_sales
 
 
 class AdminDashboardView(APIView):
     """
     GET /api/admin/dashboard
     Returns simple KPIs
+    Today's figures come from the revenue rollup for the current local day,
+    counted by when bills closed
     """
     authentication_classes = [AdminTokenAuthentication]
+    permission_classes = [IsRestaurantAdmin]
 
     def get(self, request):
         restaurant = request.user  # Restaurant object from authentication
@@ -30,26 +43,21 @@ class AdminDashboardView(APIView):
             is_open=True
         ).count()
         
-        # Today's revenue
-        today = timezone.now().date()
-        today_start = timezone.make_aware(timezone.datetime.combine(today, timezone.datetime.min.time()))
-        
-        today_revenue = Bill.objects.filter(
-            restaurant=restaurant,
-            is_open=False,
-            created_at__gte=today_start
-        ).aggregate(total=Sum('total_cents'))['total'] or 0
-        
-        # Total bills today
-        total_bills_today = Bill.objects.filter(
+        # Today's rollup (a single indexed row regardless of history size)
+        (granularity, today_start), _ = RevenueRollup.buckets(timezone.now())
+        today = RevenueRollup.objects.filter(
             restaurant=restaurant,
-            created_at__gte=today_start
-        ).count()
+            granularity=granularity,
+            bucket_start=today_start
+        ).first() or RevenueRollup()
         
         return Response({
             'openChecksCount': open_checks_count,
-            'todayRevenueCents': today_revenue,
-            'totalBillsToday': total_bills_today,
+            'todayRevenueCents': today.revenue_cents,
+            'totalBillsToday': today.bill_count,
+            'todayTaxCents': today.tax_cents,
+            'todayTipCents': today.tip_cents,
+            'todayCovers': today.covers,
         })
 
 
@@ -59,6 +67,7 @@ class AdminMenuCategoriesView(APIView):
     POST /api/admin/menu/categories - Create category
     """
     authentication_classes = [AdminTokenAuthentication]
+    permission_classes = [IsRestaurantAdmin]
 
     def get(self, request):
         restaurant = request.user
@@ -72,6 +81,7 @@ class AdminMenuCategoriesView(APIView):
         
         if serializer.is_valid():
             serializer.save(restaurant=restaurant)
+            restaurant.bump_menu_version()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -83,6 +93,7 @@ class AdminMenuCategoryDetailView(APIView):
     DELETE /api/admin/menu/categories/<id> - Delete category
     """
     authentication_classes = [AdminTokenAuthentication]
+    permission_classes = [IsRestaurantAdmin]
 
     def get(self, request, category_id):
         restaurant = request.user
@@ -104,6 +115,7 @@ class AdminMenuCategoryDetailView(APIView):
         serializer = AdminMenuCategorySerializer(category, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
+            restaurant.bump_menu_version()
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -115,6 +127,7 @@ class AdminMenuCategoryDetailView(APIView):
             return Response({'error': 'Category not found'}, status=status.HTTP_404_NOT_FOUND)
         
         category.delete()
+        restaurant.bump_menu_version()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -124,6 +137,7 @@ class AdminMenuItemsView(APIView):
     POST /api/admin/menu/items - Create item
     """
     authentication_classes = [AdminTokenAuthentication]
+    permission_classes = [IsRestaurantAdmin]
 
     def get(self, request):
         restaurant = request.user
@@ -144,6 +158,7 @@ class AdminMenuItemsView(APIView):
         serializer = AdminMenuItemSerializer(data=request.data)
         if serializer.is_valid():
             serializer.save(restaurant=restaurant)
+            restaurant.bump_menu_version()
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -155,6 +170,7 @@ class AdminMenuItemDetailView(APIView):
     DELETE /api/admin/menu/items/<id> - Delete item
     """
     authentication_classes = [AdminTokenAuthentication]
+    permission_classes = [IsRestaurantAdmin]
 
     def get(self, request, item_id):
         restaurant = request.user
@@ -183,6 +199,7 @@ class AdminMenuItemDetailView(APIView):
         serializer = AdminMenuItemSerializer(item, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
+            restaurant.bump_menu_version()
             return Response(serializer.data)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -194,15 +211,133 @@ class AdminMenuItemDetailView(APIView):
             return Response({'error': 'Item not found'}, status=status.HTTP_404_NOT_FOUND)
         
         item.delete()
+        restaurant.bump_menu_version()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+class AdminMenuImportView(APIView):
+    """
+    POST /api/admin/menu/import?format=jsonl|csv - Create or update menu items in bulk
+    Body: one item per JSON line or CSV row, as produced by the export
+    (format defaults to csv for a text/csv body, else jsonl)
+    Nothing is written unless every row is valid; per-row errors come back with 400
+    """
+    authentication_classes = [AdminTokenAuthentication]
+    permission_classes = [IsRestaurantAdmin]
+
+    def post(self, request):
+        fmt = requested_format(request)
+        if fmt is None:
+            return Response({'error': 'format must be jsonl or csv'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            counts, errors = import_menu(request.user, read_rows(request.stream or [], fmt))
+        except UnicodeDecodeError:
+            return Response({'error': 'Body must be UTF-8'}, status=status.HTTP_400_BAD_REQUEST)
+        except csv.Error as exc:
+            return Response({'error': f'Malformed CSV: {exc}'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if errors:
+            return Response({'error': 'Invalid rows', 'rows': errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(counts)
+
+
+class AdminMenuExportView(APIView):
+    """
+    GET /api/admin/menu/export?format=jsonl|csv - Download the whole menu, streamed
+    """
+    authentication_classes = [AdminTokenAuthentication]
+    permission_classes = [IsRestaurantAdmin]
+
+    def get(self, request):
+        fmt = requested_format(request)
+        if fmt is None:
+            return Response({'error': 'format must be jsonl or csv'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        export = aexport_menu if isinstance(request._request, ASGIRequest) else export_menu
+        response = StreamingHttpResponse(export(request.user, fmt), content_type=EXPORT_CONTENT_TYPES[fmt])
+        response['Content-Disposition'] = f'attachment; filename="menu-{request.user.id}.{fmt}"'
+        return response
+
+
+class AdminBillExportView(APIView):
+    """
+    GET /api/admin/exports/bills?from=&to=&format=jsonl|csv
+    Every bill closed in the range, live or archived, with its lines and payments, streamed.
+    from/to are ISO dates (to inclusive) or datetimes (to exclusive), in the server time zone.
+    """
+    authentication_classes = [AdminTokenAuthentication]
+    permission_classes = [IsRestaurantAdmin]
+
+    def get(self, request):
+        fmt = requested_format(request)
+        if fmt is None:
+            return Response({'error': 'format must be jsonl or csv'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        start = parse_range_bound(request.query_params.get('from'))
+        end = parse_range_bound(request.query_params.get('to'), end=True)
+        if start is None or end is None:
+            return Response({'error': 'from and to must be ISO dates or datetimes'}, status=status.HTTP_400_BAD_REQUEST)
+        if start >= end:
+            return Response({'error': 'from must be before to'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        export = aexport_bills if isinstance(request._request, ASGIRequest) else export_bills
+        response = StreamingHttpResponse(export(request.user, start, end, fmt), content_type=EXPORT_CONTENT_TYPES[fmt])
+        response['Content-Disposition'] = (
+            f'attachment; filename="bills-{request.user.id}-{start:%Y%m%d}-{end:%Y%m%d}.{fmt}"'
+        )
+        return response
+
+
+class AdminItemAnalyticsView(APIView):
+    """
+    GET /api/admin/analytics/items?from=&to=&limit=
+    Top sellers, revenue by category and sales by hour of day for the lines of bills closed
+    between two local dates (inclusive; default the last 30 days), from cached daily aggregates
+    """
+    authentication_classes = [AdminTokenAuthentication]
+    permission_classes = [IsRestaurantAdmin]
+
+    def get(self, request):
+        today = timezone.localdate()
+        try:
+            last_day = parse_date(request.query_params.get('to') or today.isoformat())
+            first_day = parse_date(request.query_params.get('from') or (last_day - timedelta(days=29)).isoformat())
+            limit = int(request.query_params.get('limit', 20))
+        except (TypeError, ValueError):
+            last_day = first_day = limit = None
+        if first_day is None or last_day is None or limit is None:
+            return Response({'error': 'from and to must be ISO dates and limit a number'}, status=status.HTTP_400_BAD_REQUEST)
+        if not 0 <= (last_day - first_day).days < 366:
+            return Response({'error': 'from must be before to and at most a year apart'}, status=status.HTTP_400_BAD_REQUEST)
+        limit = min(max(limit, 1), 100)
+        
+        sales = item_sales(request.user.id, first_day, min(last_day, today))
+        
+        def ranked(groups, label, key):
+            rows = [{label: name, 'qty': qty, 'revenueCents': revenue} for name, (qty, revenue) in groups.items()]
+            return sorted(rows, key=lambda row: (-row[key], str(row[label])))
+        
+        hours = sales['hours']
+        return Response({
+            'from': first_day.isoformat(),
+            'to': last_day.isoformat(),
+            'topItems': ranked(sales['items'], 'name', 'qty')[:limit],
+            'categories': ranked(sales['categories'], 'category', 'revenueCents'),
+            'hours': [
+                {'hour': hour, 'qty': hours.get(hour, [0, 0])[0], 'revenueCents': hours.get(hour, [0, 0])[1]}
+                for hour in range(24)
+            ],
+        })
+
+
 class AdminTablesView(APIView):
     """
     GET /api/admin/tables - List all tables
     POST /api/admin/tables - Create table (would generate token)
     """
     authentication_classes = [AdminTokenAuthentication]
+    permission_classes = [IsRestaurantAdmin]
 
     def get(self, request):
         restaurant = request.user
@@ -250,6 +385,7 @@ class AdminSettingsView(APIView):
     PATCH /api/admin/settings - Update restaurant settings
     """
     authentication_classes = [AdminTokenAuthentication]
+    permission_classes = [IsRestaurantAdmin]
 
     def get(self, request):
         restaurant = request.user
@@ -257,7 +393,8 @@ class AdminSettingsView(APIView):
         return Response(serializer.data)
 
     def patch(self, request):
-        restaurant = request.user
+        # request.user may come from the token cache; save against the current row
+        restaurant = Restaurant.objects.get(pk=request.user.pk)
         serializer = RestaurantSettingsSerializer(restaurant, data=request.data, partial=True)
         
         if serializer.is_valid():
@@ -269,61 +406,277 @@ class AdminSettingsView(APIView):
 class AdminOrdersView(APIView):
     """
     GET /api/admin/orders
-    Returns all active orders grouped by table with order details and timestamps
+    Returns active orders grouped by table with order details and timestamps
+    Query: ?updated_since=<iso datetime>, ?table=<table id>, ?limit=<n>, ?cursor=<nextCursor>
+    Bills are ordered by most recently updated; pass nextCursor back to get the next page
     """
     authentication_classes = [AdminTokenAuthentication]
+    permission_classes = [IsRestaurantAdmin]
+
+    DEFAULT_LIMIT = 50
+    MAX_LIMIT = 200
 
     def get(self, request):
         restaurant = request.user
         
-        # Get all open bills with their items
-        open_bills = Bill.objects.filter(
-            restaurant=restaurant,
-            is_open=True
-        ).prefetch_related('lines', 'table').order_by('-updated_at')
-        
-        orders = []
-        for bill in open_bills:
-            # Group items by session_id to see who ordered what
-            sessions = {}
-            for line in bill.lines.all():
-                session = line.session_id or 'unknown'
-                if session not in sessions:
-                    sessions[session] = []
-                sessions[session].append({
-                    'id': line.id,
-                    'name': line.name_snapshot,
-                    'qty': line.qty,
-                    'price': line.unit_price_cents / 100,
-                    'lineTotal': line.line_total_cents / 100,
-                    'orderedAt': line.ordered_at.isoformat() if line.ordered_at else None,
-                })
-            
-            orders.append({
-                'billId': bill.id,
-                'tableNumber': bill.table.table_token,
-                'tableName': bill.table.name,
-                'subtotal': bill.subtotal_cents / 100,
-                'tax': bill.tax_cents / 100,
-                'serviceFee': bill.service_fee_cents / 100,
-                'total': bill.total_cents / 100,
-                'createdAt': bill.created_at.isoformat(),
-                'updatedAt': bill.updated_at.isoformat(),
-                'sessionCount': len(sessions),
-                'sessions': sessions,
-                'allItems': [{
-                    'id': line.id,
-                    'name': line.name_snapshot,
-                    'qty': line.qty,
-                    'price': line.unit_price_cents / 100,
-                    'lineTotal': line.line_total_cents / 100,
-                    'orderedAt': line.ordered_at.isoformat() if line.ordered_at else None,
-                    'sessionId': line.session_id or 'unknown',
-                } for line in bill.lines.all()],
-            })
+        all_open_bills = open_bills = Bill.objects.filter(restaurant=restaurant, is_open=True)
+        
+        updated_since = request.query_params.get('updated_since')
+        if updated_since:
+            since = parse_datetime(updated_since)
+            if since is None:
+                return Response({'error': 'Invalid updated_since'}, status=status.HTTP_400_BAD_REQUEST)
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+            open_bills = open_bills.filter(updated_at__gt=since)
+        
+        table_id = request.query_params.get('table')
+        if table_id:
+            if not table_id.isdigit():
+                return Response({'error': 'Invalid table'}, status=status.HTTP_400_BAD_REQUEST)
+            open_bills = open_bills.filter(table_id=table_id)
+        
+        try:
+            limit = min(int(request.query_params.get('limit', self.DEFAULT_LIMIT)), self.MAX_LIMIT)
+        except ValueError:
+            return Response({'error': 'Invalid limit'}, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1:
+            return Response({'error': 'Invalid limit'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # totalOpenBills counts every open bill; matchingCount only those the filters let through
+        matching_count = open_bills.count()
+        total_open_bills = matching_count if open_bills is all_open_bills else all_open_bills.count()
+        
+        cursor = request.query_params.get('cursor')
+        if cursor:
+            position = decode_cursor(cursor)
+            if position is None:
+                return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+            cursor_updated_at, cursor_id = position
+            open_bills = open_bills.filter(
+                Q(updated_at__lt=cursor_updated_at) |
+                Q(updated_at=cursor_updated_at, id__lt=cursor_id)
+            )
+        
+        # Project only the columns the payload needs; the table comes from a join
+        bills = list(open_bills.order_by('-updated_at', '-id').values(
+            'id', 'subtotal_cents', 'tax_cents', 'service_fee_cents', 'total_cents',
+            'created_at', 'updated_at',
+            'table__name', 'table__restaurant_slug', 'table__table_number',
+        )[:limit + 1])
+        has_more = len(bills) > limit
+        bills = bills[:limit]
+        
+        orders = {}
+        for bill in bills:
+            orders[bill['id']] = {
+                'billId': bill['id'],
+                'tableNumber': f"{bill['table__restaurant_slug']}-{bill['table__table_number']}",
+                'tableName': bill['table__name'],
+                'subtotal': bill['subtotal_cents'] / 100,
+                'tax': bill['tax_cents'] / 100,
+                'serviceFee': bill['service_fee_cents'] / 100,
+                'total': bill['total_cents'] / 100,
+                'createdAt': bill['created_at'].isoformat(),
+                'updatedAt': bill['updated_at'].isoformat(),
+                'sessionCount': 0,
+                'sessions': {},
+                'allItems': [],
+            }
+        
+        # Single pass over every line of the page, grouped by session as we go
+        lines = BillLine.objects.filter(bill_id__in=orders).order_by('id').values_list(
+            'bill_id', 'id', 'name_snapshot', 'qty', 'unit_price_cents', 'line_total_cents',
+            'ordered_at', 'session_id', 'status',
+        )
+        for bill_id, line_id, name, qty, unit_price, line_total, ordered_at, session_id, line_status in lines:
+            order = orders[bill_id]
+            session = session_id or 'unknown'
+            item = {
+                'id': line_id,
+                'name': name,
+                'qty': qty,
+                'price': unit_price / 100,
+                'lineTotal': line_total / 100,
+                'orderedAt': ordered_at.isoformat() if ordered_at else None,
+                'sessionId': session,
+                'status': line_status,
+            }
+            order['allItems'].append(item)
+            order['sessions'].setdefault(session, []).append(item)
+        
+        for order in orders.values():
+            order['sessionCount'] = len(order['sessions'])
+        
+        next_cursor = None
+        if has_more:
+            next_cursor = encode_cursor(bills[-1]['updated_at'], bills[-1]['id'])
         
         return Response({
-            'orders': orders,
-            'totalOpenBills': len(orders),
+            'orders': list(orders.values()),
+            'totalOpenBills': total_open_bills,
+            'matchingCount': matching_count,
+            'nextCursor': next_cursor,
         })
 
+
+class AdminKitchenQueueView(APIView):
+    """
+    GET /api/admin/kitchen/queue
+    Lines not yet served on open bills, oldest first, read from the billline_kitchen_queue partial index
+    Query: ?after=<nextCursor>, ?limit=<n>
+    Poll with the last nextCursor to get only the lines ordered since. Lines show up once they
+    are SETTLE_SECONDS old: ordered_at is set before the line's transaction commits, so a newer
+    line can commit first, and the cursor would already be past the older one.
+    """
+    authentication_classes = [AdminTokenAuthentication]
+    permission_classes = [IsRestaurantAdmin]
+
+    DEFAULT_LIMIT = 100
+    MAX_LIMIT = 500
+    SETTLE_SECONDS = 2
+
+    def get(self, request):
+        settled = timezone.now() - timedelta(seconds=self.SETTLE_SECONDS)
+        pending = BillLine.objects.filter(
+            ~Q(status='served'), restaurant=request.user, ordered_at__lte=settled, bill__is_open=True,
+        )
+        
+        after = request.query_params.get('after')
+        if after:
+            position = decode_cursor(after)
+            if position is None:
+                return Response({'error': 'Invalid cursor'}, status=status.HTTP_400_BAD_REQUEST)
+            after_ordered_at, after_id = position
+            pending = pending.filter(
+                Q(ordered_at__gt=after_ordered_at) |
+                Q(ordered_at=after_ordered_at, id__gt=after_id)
+            )
+        
+        try:
+            limit = min(int(request.query_params.get('limit', self.DEFAULT_LIMIT)), self.MAX_LIMIT)
+        except ValueError:
+            return Response({'error': 'Invalid limit'}, status=status.HTTP_400_BAD_REQUEST)
+        if limit < 1:
+            return Response({'error': 'Invalid limit'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        lines = list(pending.order_by('ordered_at', 'id').values_list(
+            'id', 'bill_id', 'bill__table__name', 'name_snapshot', 'options_snapshot', 'qty',
+            'session_id', 'status', 'ordered_at',
+        )[:limit])
+        
+        # With nothing new the cursor stays put, so an idle poll is a few bytes
+        next_cursor = encode_cursor(lines[-1][-1], lines[-1][0]) if lines else after
+        return Response({
+            'lines': [
+                {
+                    'id': line_id,
+                    'billId': bill_id,
+                    'tableName': table_name,
+                    'name': name,
+                    'options': options,
+                    'qty': qty,
+                    'sessionId': session_id or 'unknown',
+                    'status': line_status,
+                    'orderedAt': ordered_at.isoformat(),
+                }
+                for line_id, bill_id, table_name, name, options, qty, session_id, line_status, ordered_at in lines
+            ],
+            'nextCursor': next_cursor,
+        })
+
+
+class AdminKitchenLineView(APIView):
+    """
+    PATCH /api/admin/kitchen/lines/<line_id>
+    Body: { status: "preparing"|"served" }
+    Moves a line forward (sent -> preparing -> served, or straight to served) with one
+    conditional UPDATE, so two screens cannot both claim the same transition
+    """
+    authentication_classes = [AdminTokenAuthentication]
+    permission_classes = [IsRestaurantAdmin]
+
+    def patch(self, request, line_id):
+        new_status = request.data.get('status')
+        if new_status not in BillLine.STATUS_TRANSITIONS:
+            return Response({'error': 'status must be preparing or served'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        lines = BillLine.objects.filter(id=line_id, restaurant=request.user)
+        changed_at = timezone.now()
+        if not lines.filter(status__in=BillLine.STATUS_TRANSITIONS[new_status]).update(
+            status=new_status, status_changed_at=changed_at,
+        ):
+            current = lines.values_list('status', flat=True).first()
+            if current is None:
+                return Response({'error': 'Bill item not found'}, status=status.HTTP_404_NOT_FOUND)
+            return Response(
+                {'error': f'Cannot move a {current} item to {new_status}', 'status': current},
+                status=status.HTTP_409_CONFLICT,
+            )
+        
+        return Response({'id': line_id, 'status': new_status, 'statusChangedAt': changed_at.isoformat()})
+
+
+class AdminMetricsView(APIView):
+    """
+    GET /api/admin/metrics
+    Request timing and query-count histograms for this process, in Prometheus text format.
+    They span every restaurant, so they take the METRICS_TOKEN as a bearer token rather than an admin token
+    """
+    authentication_classes = []
+    permission_classes = [HasMetricsToken]
+
+    def get(self, request):
+        return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+EXPORT_CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+def requested_format(request):
+    """jsonl or csv from ?format=, else from a text/csv Content-Type; None if unsupported"""
+    fmt = request.query_params.get('format')
+    if fmt is None:
+        fmt = 'csv' if request.content_type.startswith('text/csv') else 'jsonl'
+    return fmt if fmt in EXPORT_CONTENT_TYPES else None
+
+
+def parse_range_bound(value, end=False):
+    """
+    Aware datetime for a from/to parameter, or None if missing or malformed. A date means
+    the start of that day, or with end=True the start of the next, so the day is included.
+    """
+    if not value:
+        return None
+    try:
+        # parse_datetime() also accepts a bare date (as midnight), so try the date first
+        day = parse_date(value)
+        moment = None if day else parse_datetime(value)
+    except ValueError:
+        return None
+    if day is not None:
+        moment = datetime.combine(day + timedelta(days=1) if end else day, time.min)
+    if moment is None:
+        return None
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+def encode_cursor(updated_at, bill_id):
+    raw = f'{updated_at.isoformat()}|{bill_id}'
+    return urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Return (updated_at, id) from an opaque cursor, or None if it is malformed"""
+    try:
+        updated_at, bill_id = urlsafe_b64decode(cursor.encode()).decode().split('|')
+        updated_at = parse_datetime(updated_at)
+        bill_id = int(bill_id)
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        return None
+    if updated_at is None:
+        return None
+    return updated_at, bill_id
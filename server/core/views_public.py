@@ -1,13 +1,21 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from django.db.models import Sum
-from .models import Restaurant, Table, MenuCategory, MenuItem, Bill, BillLine, Payment
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from .models import Restaurant, Table, MenuCategory, MenuItem, Bill, BillLine, BillLineRemoval, BillSession, Payment, BillEvent, RevenueRollup, ArchivedBill, Receipt
 from .serializers import (
     MenuCategorySerializer, BillSerializer, BillLineSerializer,
-    RestaurantSettingsSerializer
+    RestaurantSettingsSerializer, bill_changes_data, bill_data
 )
-from .authentication import get_restaurant_from_table_token
+from .authentication import get_restaurant_from_table_token, get_table
+from .cache import get_menu_payload, etag_matches
+from .idempotency import idempotent
+from .jobs import enqueue
+from .receipts import RECEIPT_FORMATS, accepts_gzip, store_receipt
+import gzip
 import uuid
 
 
@@ -36,6 +44,8 @@ class PublicMenuView(APIView):
     """
     GET /api/public/menu/<table_token>
     Returns menu for the restaurant
+    Rendered JSON is cached per restaurant menu_version and served with a strong ETag;
+    a matching If-None-Match gets 304
     """
     def get(self, request, table_token):
         restaurant, table = get_restaurant_from_table_token(table_token)
@@ -43,34 +53,126 @@ class PublicMenuView(APIView):
         if not restaurant:
             return Response({'error': 'Invalid table token'}, status=status.HTTP_404_NOT_FOUND)
         
-        categories = MenuCategory.objects.filter(
-            restaurant=restaurant
-        ).prefetch_related('items')
+        etag, body = get_menu_payload(restaurant)
         
-        serializer = MenuCategorySerializer(categories, many=True)
-        return Response(serializer.data)
+        if etag_matches(request, etag):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = etag
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+
+def parse_since_version(value):
+    """The ?since_version= parameter as an int, None when absent; ValueError if malformed"""
+    if value is None:
+        return None
+    version = int(value)
+    if version < 0:
+        raise ValueError(value)
+    return version
 
 
 class TableBillView(APIView):
     """
     GET /api/public/tables/<table_id>/bill
     Returns current open bill for the table
+    The ETag follows the bill version, so a matching If-None-Match gets 304 without reading
+    the lines. ?since_version=<n> returns only the lines added and ids removed after n, with
+    an ETag of its own.
     """
     def get(self, request, table_id):
-        try:
-            table = Table.objects.get(id=table_id)
-        except Table.DoesNotExist:
+        table = get_table(table_id)
+        if table is None:
             return Response({'error': 'Table not found'}, status=status.HTTP_404_NOT_FOUND)
         
+        try:
+            since_version = parse_since_version(request.query_params.get('since_version'))
+        except ValueError:
+            return Response({'error': 'since_version must be a non-negative integer'}, status=status.HTTP_400_BAD_REQUEST)
+        
         # Get or create open bill
-        bill, created = Bill.objects.get_or_create(
-            table=table,
-            is_open=True,
-            defaults={'restaurant': table.restaurant}
-        )
+        bill = Bill.open_for_table(table)
+        
+        # No version, or one from an earlier bill at this table: send everything
+        changes = since_version is not None and since_version <= bill.version
+        etag = bill.changes_etag(since_version) if changes else bill.etag
+        if etag_matches(request, etag):
+            response = HttpResponseNotModified()
+        elif changes:
+            response = Response(bill_changes_data(bill, since_version))
+        else:
+            response = Response(bill_data(bill))
+        response['ETag'] = etag
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+
+class TableBillSessionsView(APIView):
+    """
+    GET /api/public/tables/<table_id>/bill/sessions
+    Per-diner breakdown of the open bill: items, subtotal, proportional tax/fee share and
+    what each session has paid, read from the BillSession rows
+    """
+    def get(self, request, table_id):
+        table = get_table(table_id)
+        if table is None:
+            return Response({'error': 'Table not found'}, status=status.HTTP_404_NOT_FOUND)
         
-        serializer = BillSerializer(bill)
-        return Response(serializer.data)
+        bill = Bill.open_for_table(table, create=False)
+        if bill is None:
+            return Response({'error': 'No open bill found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        sessions = []
+        for session in bill.sessions.exclude(item_count=0, paid_cents=0).order_by('id'):
+            tax, service_fee = session.charges(bill)
+            total = session.subtotal_cents + tax + service_fee
+            sessions.append({
+                'sessionId': session.session_id,
+                'itemCount': session.item_count,
+                'subtotalCents': session.subtotal_cents,
+                'taxCents': tax,
+                'serviceFeeCents': service_fee,
+                'totalCents': total,
+                'paidCents': session.paid_cents,
+                'tipCents': session.tip_cents,
+                'remainingCents': session.remaining(bill),
+            })
+        
+        return Response({'billId': bill.id, 'sessions': sessions})
+
+
+def add_bill_line(table, menu_item, qty, options, session_id):
+    """
+    Add a line to the table's open bill and apply it to the totals in one transaction.
+    Shared by the sync and async AddBillItemView; returns the updated bill.
+    """
+    # Create bill line with session tracking
+    unit_price = menu_item.price_cents
+    line_total = unit_price * qty
+    
+    with transaction.atomic():
+        # Get or create open bill, locked so concurrent additions serialize on it
+        bill = Bill.open_for_table(table, lock=True)
+        
+        # Apply the new line to bill totals first; the line carries the version it bumped to
+        bill.apply_line_delta(line_total, table.restaurant)
+        line = BillLine.objects.create(
+            bill=bill,
+            restaurant_id=bill.restaurant_id,
+            item=menu_item,
+            name_snapshot=menu_item.name,
+            options_snapshot=options,
+            qty=qty,
+            unit_price_cents=unit_price,
+            line_total_cents=line_total,
+            session_id=session_id,  # Store who ordered this item
+            bill_version=bill.version,
+        )
+        BillSession.add(bill.id, session_id, subtotal_cents=line_total, item_count=qty)
+        BillEvent.for_bill(bill, 'line_added', BillEvent.line_payload(line)).save()
+    return bill
 
 
 class AddBillItemView(APIView):
@@ -78,11 +180,12 @@ class AddBillItemView(APIView):
     POST /api/public/tables/<table_id>/bill/items
     Add item to bill
     Body: { itemId, qty, options, sessionId }
+    Honors an Idempotency-Key header so retries don't add the line twice
     """
+    @idempotent
     def post(self, request, table_id):
-        try:
-            table = Table.objects.get(id=table_id)
-        except Table.DoesNotExist:
+        table = get_table(table_id)
+        if table is None:
             return Response({'error': 'Table not found'}, status=status.HTTP_404_NOT_FOUND)
         
         item_id = request.data.get('itemId')
@@ -98,30 +201,81 @@ class AddBillItemView(APIView):
         if not menu_item.available:
             return Response({'error': 'Menu item not available'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Get or create open bill
-        bill, created = Bill.objects.get_or_create(
-            table=table,
-            is_open=True,
-            defaults={'restaurant': table.restaurant}
-        )
+        bill = add_bill_line(table, menu_item, qty, options, session_id)
         
-        # Create bill line with session tracking
-        unit_price = menu_item.price_cents
-        line_total = unit_price * qty
+        serializer = BillSerializer(bill)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class AddBillItemsBatchView(APIView):
+    """
+    POST /api/public/tables/<table_id>/bill/items/batch
+    Add a whole cart to the bill in one request
+    Body: { items: [{ itemId, qty, options }], sessionId }
+    Honors an Idempotency-Key header so retries don't add the cart twice
+    """
+    @idempotent
+    def post(self, request, table_id):
+        table = get_table(table_id)
+        if table is None:
+            return Response({'error': 'Table not found'}, status=status.HTTP_404_NOT_FOUND)
         
-        BillLine.objects.create(
-            bill=bill,
-            item=menu_item,
-            name_snapshot=menu_item.name,
-            options_snapshot=options,
-            qty=qty,
-            unit_price_cents=unit_price,
-            line_total_cents=line_total,
-            session_id=session_id  # Store who ordered this item
-        )
+        items = request.data.get('items')
+        session_id = request.data.get('sessionId', '')
         
-        # Recalculate bill totals
-        bill.recalculate_totals()
+        if not isinstance(items, list) or not items:
+            return Response({'error': 'items must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        cart = []
+        for entry in items:
+            try:
+                item_id = int(entry.get('itemId'))
+                qty = entry.get('qty', 1)
+            except (AttributeError, TypeError, ValueError):
+                qty = None
+            if not isinstance(qty, int) or isinstance(qty, bool) or qty < 1:
+                return Response({'error': 'Each item needs an itemId and a positive integer qty'}, status=status.HTTP_400_BAD_REQUEST)
+            cart.append((item_id, qty, entry.get('options', {})))
+        
+        # Validate every item id with a single query
+        item_ids = {item_id for item_id, _, _ in cart}
+        menu_items = MenuItem.objects.filter(id__in=item_ids, restaurant=table.restaurant).in_bulk()
+        
+        missing = sorted(item_id for item_id in item_ids if item_id not in menu_items)
+        if missing:
+            return Response({'error': 'Menu item not found', 'itemIds': missing}, status=status.HTTP_404_NOT_FOUND)
+        
+        unavailable = sorted(item.id for item in menu_items.values() if not item.available)
+        if unavailable:
+            return Response({'error': 'Menu item not available', 'itemIds': unavailable}, status=status.HTTP_400_BAD_REQUEST)
+        
+        cart_total = sum(menu_items[item_id].price_cents * qty for item_id, qty, _ in cart)
+        
+        with transaction.atomic():
+            bill = Bill.open_for_table(table, lock=True)
+            # One totals update (and version bump) for the whole cart
+            bill.apply_line_delta(cart_total, table.restaurant)
+            
+            lines = []
+            for item_id, qty, options in cart:
+                menu_item = menu_items[item_id]
+                lines.append(BillLine(
+                    bill=bill,
+                    restaurant_id=bill.restaurant_id,
+                    item=menu_item,
+                    name_snapshot=menu_item.name,
+                    options_snapshot=options,
+                    qty=qty,
+                    unit_price_cents=menu_item.price_cents,
+                    line_total_cents=menu_item.price_cents * qty,
+                    session_id=session_id,
+                    bill_version=bill.version,
+                ))
+            BillLine.objects.bulk_create(lines)
+            BillSession.add(bill.id, session_id, subtotal_cents=cart_total, item_count=sum(line.qty for line in lines))
+            BillEvent.objects.bulk_create([
+                BillEvent.for_bill(bill, 'line_added', BillEvent.line_payload(line)) for line in lines
+            ])
         
         serializer = BillSerializer(bill)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -133,26 +287,27 @@ class RemoveBillItemView(APIView):
     Remove item from bill
     """
     def delete(self, request, table_id, line_id):
-        try:
-            table = Table.objects.get(id=table_id)
-        except Table.DoesNotExist:
+        table = get_table(table_id)
+        if table is None:
             return Response({'error': 'Table not found'}, status=status.HTTP_404_NOT_FOUND)
         
-        try:
-            bill = Bill.objects.get(table=table, is_open=True)
-        except Bill.DoesNotExist:
-            return Response({'error': 'No open bill found'}, status=status.HTTP_404_NOT_FOUND)
-        
-        try:
-            bill_line = BillLine.objects.get(id=line_id, bill=bill)
-        except BillLine.DoesNotExist:
-            return Response({'error': 'Bill item not found'}, status=status.HTTP_404_NOT_FOUND)
-        
-        # Delete the line
-        bill_line.delete()
-        
-        # Recalculate bill totals
-        bill.recalculate_totals()
+        with transaction.atomic():
+            bill = Bill.open_for_table(table, lock=True, create=False)
+            if bill is None:
+                return Response({'error': 'No open bill found'}, status=status.HTTP_404_NOT_FOUND)
+            
+            try:
+                bill_line = BillLine.objects.get(id=line_id, bill=bill)
+            except BillLine.DoesNotExist:
+                return Response({'error': 'Bill item not found'}, status=status.HTTP_404_NOT_FOUND)
+            
+            # Delete the line and take it off the bill totals
+            bill_line.delete()
+            bill.apply_line_delta(-bill_line.line_total_cents, table.restaurant)
+            BillLineRemoval.objects.create(bill=bill, line_id=line_id, bill_version=bill.version)
+            BillSession.add(bill.id, bill_line.session_id,
+                            subtotal_cents=-bill_line.line_total_cents, item_count=-bill_line.qty)
+            BillEvent.for_bill(bill, 'line_removed', {'id': line_id}).save()
         
         serializer = BillSerializer(bill)
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -163,16 +318,18 @@ class PaymentIntentView(APIView):
     POST /api/public/tables/<table_id>/payment/intent
     Create payment intent (mock Stripe)
     Body: { mode: "full"|"split_even"|"mine_only", seats?: number, tip?: number, sessionId?: string }
+    Runs in one transaction with the open bill locked, so concurrent payments serialize
+    Honors an Idempotency-Key header so retries don't charge twice
     """
+    @idempotent
+    @transaction.atomic
     def post(self, request, table_id):
-        try:
-            table = Table.objects.get(id=table_id)
-        except Table.DoesNotExist:
+        table = get_table(table_id)
+        if table is None:
             return Response({'error': 'Table not found'}, status=status.HTTP_404_NOT_FOUND)
         
-        try:
-            bill = Bill.objects.get(table=table, is_open=True)
-        except Bill.DoesNotExist:
+        bill = Bill.open_for_table(table, lock=True, create=False)
+        if bill is None:
             return Response({'error': 'No open bill found'}, status=status.HTTP_404_NOT_FOUND)
         
         mode = request.data.get('mode', 'full')
@@ -186,7 +343,8 @@ class PaymentIntentView(APIView):
         service_fee = bill.service_fee_cents
         
         if mode == 'full':
-            amount_cents = subtotal + tax + service_fee + tip
+            # Whatever is still owed, net of earlier split payments
+            amount_cents = max(bill.remaining_cents, 0) + tip
         elif mode == 'split_even':
             if seats <= 0:
                 return Response({'error': 'Invalid number of seats'}, status=status.HTTP_400_BAD_REQUEST)
@@ -197,24 +355,18 @@ class PaymentIntentView(APIView):
             if not session_id:
                 return Response({'error': 'sessionId required for mine_only mode'}, status=status.HTTP_400_BAD_REQUEST)
             
-            my_items_subtotal = sum(
-                line.line_total_cents 
-                for line in bill.lines.filter(session_id=session_id)
-            )
+            session = BillSession.objects.filter(bill=bill, session_id=session_id).first()
             
-            if my_items_subtotal == 0:
+            if session is None or session.subtotal_cents == 0:
                 return Response({'error': 'No items found for this session'}, status=status.HTTP_400_BAD_REQUEST)
             
-            # Calculate proportional tax and service fee
-            if subtotal > 0:
-                proportion = my_items_subtotal / subtotal
-                my_tax = int(tax * proportion)
-                my_service_fee = int(service_fee * proportion)
-            else:
-                my_tax = 0
-                my_service_fee = 0
+            # The session's share with proportional tax and service fee, less what it paid already,
+            # and never more than the bill still owes
+            owed = min(session.remaining(bill), max(bill.remaining_cents, 0))
+            if owed == 0:
+                return Response({'error': 'Nothing left to pay for this session'}, status=status.HTTP_400_BAD_REQUEST)
             
-            amount_cents = my_items_subtotal + my_tax + my_service_fee + tip
+            amount_cents = owed + tip
         else:
             return Response({'error': 'Invalid payment mode'}, status=status.HTTP_400_BAD_REQUEST)
         
@@ -226,39 +378,49 @@ class PaymentIntentView(APIView):
             status='succeeded',
             amount_cents=amount_cents,
             provider='stripe',
-            provider_ref=provider_ref
+            provider_ref=provider_ref,
+            session_id=session_id
         )
-        
-        # Update bill tip if this is the first/main payment
-        if tip > 0:
-            bill.tip_cents += tip
-            bill.total_cents = bill.subtotal_cents + bill.tax_cents + bill.service_fee_cents + bill.tip_cents
-            bill.save()
-        
-        # Check if bill is fully paid
-        total_paid = Payment.objects.filter(bill=bill, status='succeeded').aggregate(
-            total=Sum('amount_cents')
-        )['total'] or 0
-        
-        if total_paid >= bill.total_cents:
-            bill.is_open = False
-            bill.save()
+        if session_id:
+            BillSession.add(bill.id, session_id, paid_cents=amount_cents, tip_cents=tip)
+        
+        # Apply the payment and tip to the bill ledger; closes the bill once nothing remains
+        receipt = None
+        if bill.apply_payment(amount_cents, tip_cents=tip):
+            RevenueRollup.record_close(bill, covers=bill.count_covers())
+            # The receipt can't change from here on: render it once for GET /api/public/receipts/<token>
+            bill.table, bill.restaurant = table, table.restaurant  # Loaded already by get_table()
+            receipt = store_receipt(bill)
+        
+        events = [BillEvent.for_bill(bill, 'payment', {
+            'paymentId': payment.id,
+            'amountCents': payment.amount_cents,
+            'billClosed': not bill.is_open,
+        })]
+        if not bill.is_open:
+            events.append(BillEvent.for_bill(bill, 'bill_closed', {}))
+        BillEvent.objects.bulk_create(events)
         
         return Response({
             'paymentId': payment.id,
+            'billId': bill.id,
             'status': payment.status,
             'amountCents': payment.amount_cents,
             'providerRef': payment.provider_ref,
             'billClosed': not bill.is_open,
+            'remainingCents': max(bill.remaining_cents, 0),
+            'receiptUrl': f'/api/public/receipts/{receipt.token}' if receipt else None,
         }, status=status.HTTP_201_CREATED)
 
 
 class ReceiptEmailView(APIView):
     """
     POST /api/public/receipt/email
-    Send receipt email (stub for MVP)
+    Queue a receipt email; the run_jobs worker renders and sends it
     Body: { email, billId }
+    Honors an Idempotency-Key header so retries don't send the receipt twice
     """
+    @idempotent
     def post(self, request):
         email = request.data.get('email')
         bill_id = request.data.get('billId')
@@ -266,9 +428,56 @@ class ReceiptEmailView(APIView):
         if not email or not bill_id:
             return Response({'error': 'Email and billId required'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Stub: just return success
-        # In production, would send email via service like SendGrid
+        try:
+            validate_email(email)
+            bill_id = int(bill_id)
+        except (ValidationError, TypeError, ValueError):
+            return Response({'error': 'Invalid email or billId'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if not (Bill.objects.filter(id=bill_id).exists() or ArchivedBill.objects.filter(id=bill_id).exists()):
+            return Response({'error': 'Bill not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        job = enqueue('send_receipt_email', bill_id=bill_id, email=email)
         return Response({
-            'message': 'Receipt sent successfully',
-            'email': email
-        }, status=status.HTTP_200_OK)
+            'message': 'Receipt queued',
+            'email': email,
+            'jobId': job.id,
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class ReceiptView(APIView):
+    """
+    GET /api/public/receipts/<token>?format=json|html
+    Returns a closed bill's receipt, rendered once when the payment closed the bill; the token
+    comes back from that payment as receiptUrl. It never changes, so it is served as stored,
+    gzip-compressed to clients that accept it, with a year-long private immutable Cache-Control;
+    a matching If-None-Match gets 304
+    """
+    def get(self, request, token):
+        fmt = request.query_params.get('format', 'json')
+        if fmt not in RECEIPT_FORMATS:
+            return Response({'error': 'format must be json or html'}, status=status.HTTP_400_BAD_REQUEST)
+        column, content_type = RECEIPT_FORMATS[fmt]
+        gzipped = accepts_gzip(request)
+        # Per URL and encoding; the document itself never changes
+        etag = f'"receipt-{fmt}-gzip"' if gzipped else f'"receipt-{fmt}"'
+        
+        receipts = Receipt.objects.filter(token=token)
+        if etag_matches(request, etag):
+            if not receipts.exists():
+                return Response({'error': 'Receipt not found'}, status=status.HTTP_404_NOT_FOUND)
+            response = HttpResponseNotModified()
+        else:
+            body = receipts.values_list(column, flat=True).first()
+            if body is None:
+                return Response({'error': 'Receipt not found'}, status=status.HTTP_404_NOT_FOUND)
+            body = bytes(body)  # PostgreSQL hands back a memoryview
+            if gzipped:
+                response = HttpResponse(body, content_type=content_type)
+                response['Content-Encoding'] = 'gzip'
+            else:
+                response = HttpResponse(gzip.decompress(body), content_type=content_type)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, max-age=31536000, immutable'
+        response['Vary'] = 'Accept-Encoding'
+        return response
@@ -0,0 +1,181 @@
+"""
+Async versions of the hot diner endpoints, routed instead of the DRF views when the ASGI app
+runs (ASYNC_PUBLIC_API, see server/asgi.py). Reads use the async ORM and the async token/menu
+caches; transactional writes run in one sync_to_async call each. Responses are rendered with
+the API's JSON renderer so bodies match the sync views byte for byte.
+"""
+import io
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse, HttpResponseNotModified
+from rest_framework import status
+from rest_framework.exceptions import MethodNotAllowed, ParseError
+from rest_framework.parsers import JSONParser
+
+from .authentication import aget_restaurant_from_table_token, aget_table
+from .cache import aget_menu_payload, etag_matches
+from .idempotency import run_idempotent
+from .models import Bill, MenuItem
+from .renderers import FastJSONRenderer
+from .serializers import abill_changes_data, abill_data, bill_data
+from .views_public import add_bill_line, parse_since_version
+
+
+def _response(data, status=status.HTTP_200_OK):
+    return HttpResponse(FastJSONRenderer().render(data), content_type='application/json', status=status)
+
+
+def _method_not_allowed(request, allowed='GET, HEAD'):
+    response = _response({'detail': MethodNotAllowed(request.method).detail}, status=status.HTTP_405_METHOD_NOT_ALLOWED)
+    response['Allow'] = f'{allowed}, OPTIONS'  # As APIView sends it
+    return response
+
+
+def _json_body(request):
+    """The request's JSON body (an empty dict when there is none), parsed as DRF's JSONParser does; raises ParseError"""
+    if not request.body:
+        return {}
+    return JSONParser().parse(io.BytesIO(request.body))
+
+
+def _csrf_exempt(view):
+    # django.views.decorators.csrf.csrf_exempt wraps async views in a sync function before Django 5.0
+    view.csrf_exempt = True
+    return view
+
+
+async def table_context(request, table_token):
+    """
+    GET /api/public/table-context/<table_token>
+    Returns restaurant context for the table
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return _method_not_allowed(request)
+
+    restaurant, table = await aget_restaurant_from_table_token(table_token)
+    if not restaurant or not table:
+        return _response({'error': 'Invalid table token'}, status=status.HTTP_404_NOT_FOUND)
+
+    return _response({
+        'restaurantId': restaurant.id,
+        'tableId': table.id,
+        'theme': restaurant.theme_json,
+        'taxRate': float(restaurant.tax_rate),
+        'serviceFeeRate': float(restaurant.service_fee_rate),
+        'tipPresets': restaurant.tip_presets_json,
+    })
+
+
+async def public_menu(request, table_token):
+    """
+    GET /api/public/menu/<table_token>
+    Cached menu JSON with ETag/304, as PublicMenuView
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return _method_not_allowed(request)
+
+    restaurant, table = await aget_restaurant_from_table_token(table_token)
+    if not restaurant:
+        return _response({'error': 'Invalid table token'}, status=status.HTTP_404_NOT_FOUND)
+
+    etag, body = await aget_menu_payload(restaurant)
+
+    if etag_matches(request, etag):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(body, content_type='application/json')
+    response['ETag'] = etag
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+async def table_bill(request, table_id):
+    """
+    GET /api/public/tables/<table_id>/bill
+    Returns current open bill for the table, with ETag/304 and ?since_version= as TableBillView
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return _method_not_allowed(request)
+
+    table = await aget_table(table_id)
+    if table is None:
+        return _response({'error': 'Table not found'}, status=status.HTTP_404_NOT_FOUND)
+
+    try:
+        since_version = parse_since_version(request.GET.get('since_version'))
+    except ValueError:
+        return _response({'error': 'since_version must be a non-negative integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+    bill = await Bill.objects.filter(table=table, is_open=True).afirst()
+    if bill is None:
+        # Creation settles races on the one_open_bill_per_table constraint inside a savepoint
+        bill = await sync_to_async(Bill.open_for_table)(table)
+
+    changes = since_version is not None and since_version <= bill.version
+    etag = bill.changes_etag(since_version) if changes else bill.etag
+    if etag_matches(request, etag):
+        response = HttpResponseNotModified()
+    elif changes:
+        response = _response(await abill_changes_data(bill, since_version))
+    else:
+        response = _response(await abill_data(bill))
+    response['ETag'] = etag
+    response['Cache-Control'] = 'no-cache'
+    return response
+
+
+@_csrf_exempt
+async def add_bill_item(request, table_id):
+    """
+    POST /api/public/tables/<table_id>/bill/items
+    Add item to bill
+    Body: { itemId, qty, options, sessionId }
+    Honors an Idempotency-Key header so retries don't add the line twice
+    """
+    if request.method != 'POST':
+        return _method_not_allowed(request, allowed='POST')
+
+    key = request.headers.get('Idempotency-Key')
+    if key and len(key) > 255:
+        return _response({'error': 'Idempotency-Key too long'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        data = _json_body(request)
+    except ParseError as exc:
+        return _response({'detail': exc.detail}, status=status.HTTP_400_BAD_REQUEST)
+
+    table = await aget_table(table_id)
+    menu_item = None
+    if table is not None:
+        menu_item = await MenuItem.objects.filter(id=data.get('itemId'), restaurant_id=table.restaurant_id).afirst()
+
+    def rejection():
+        if table is None:
+            return {'error': 'Table not found'}, status.HTTP_404_NOT_FOUND
+        if menu_item is None:
+            return {'error': 'Menu item not found'}, status.HTTP_404_NOT_FOUND
+        if not menu_item.available:
+            return {'error': 'Menu item not available'}, status.HTTP_400_BAD_REQUEST
+        return None
+
+    def add():
+        rejected = rejection()
+        if rejected is not None:
+            return rejected
+        bill = add_bill_line(
+            table, menu_item, data.get('qty', 1), data.get('options', {}), data.get('sessionId', '')
+        )
+        return bill_data(bill), status.HTTP_201_CREATED
+
+    # As with @idempotent, the checks run inside run_idempotent after the key is claimed: a repeat
+    # replays the stored response whatever the item's state now, and a first request's 404/400 is
+    # stored like a 201. The write and the key commit together
+    if key:
+        body, response_status, replayed = await sync_to_async(run_idempotent)(request.path, key, data, add)
+    else:
+        (body, response_status), replayed = rejection() or await sync_to_async(add)(), False
+
+    response = _response(body, status=response_status)
+    if replayed:
+        response['Idempotent-Replayed'] = 'true'
+    return response
@@ -0,0 +1,105 @@
+"""
+Server-Sent Events endpoints. These are plain async Django views (DRF's APIView is sync-only)
+and need the ASGI app in server/asgi.py; under WSGI they answer 501.
+"""
+import asyncio
+import json
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+
+from .authentication import get_restaurant_from_admin_token
+from .models import BillEvent
+
+
+POLL_INTERVAL = 1.0  # Seconds between checks of the event table while idle
+HEARTBEAT_INTERVAL = 15.0  # Comment line to keep proxies from closing an idle stream
+MAX_STREAM_SECONDS = 300  # Clients reconnect with Last-Event-ID afterwards
+BATCH_SIZE = 200
+# Event ids are taken at INSERT but become visible at COMMIT, so a lower id can appear after a
+# higher one was sent. Events newer than this are re-read until they settle; clients drop
+# repeated ids.
+SETTLE_SECONDS = 5
+
+
+def _parse_cursor(value):
+    try:
+        return max(int(value), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+async def _settled_floor(events, at_most):
+    """Highest event id up to at_most older than SETTLE_SECONDS: every event up to it has committed"""
+    settled = timezone.now() - timedelta(seconds=SETTLE_SECONDS)
+    floor = await events.filter(id__lte=at_most, created_at__lt=settled).order_by('-id').values_list('id', flat=True).afirst()
+    return floor or 0
+
+
+def _format_event(event):
+    return f"id: {event['id']}\nevent: {event['kind']}\ndata: {json.dumps(event['payload'])}\n\n"
+
+
+async def admin_order_events(request):
+    """
+    GET /api/admin/orders/stream
+    Streams bill and line events for the admin's restaurant as text/event-stream.
+    Resume with the Last-Event-ID header or ?after=<id>; without a cursor only new events are sent.
+    Events from the last SETTLE_SECONDS before the cursor may be sent again (see SETTLE_SECONDS).
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'error': 'Event stream requires the ASGI server'}, status=501)
+
+    admin_token = request.headers.get('X-Admin-Token')
+    restaurant = await sync_to_async(get_restaurant_from_admin_token)(admin_token) if admin_token else None
+    if restaurant is None:
+        return JsonResponse({'error': 'Invalid admin token'}, status=403)
+
+    events = BillEvent.objects.filter(restaurant=restaurant).order_by('id')
+
+    cursor = _parse_cursor(request.headers.get('Last-Event-ID'))
+    if cursor is None:
+        cursor = _parse_cursor(request.GET.get('after'))
+    sent = {}  # id -> created_at of events above floor already sent
+    if cursor is None:
+        cursor = await events.order_by('-id').values_list('id', flat=True).afirst() or 0
+        floor = await _settled_floor(events, cursor)
+        # Without a cursor the client wants only new events, so the recent ones count as sent
+        async for event_id, created_at in events.filter(id__gt=floor, id__lte=cursor).values_list('id', 'created_at'):
+            sent[event_id] = created_at
+    else:
+        floor = await _settled_floor(events, cursor)
+
+    async def stream():
+        nonlocal floor
+        started = last_sent = time.monotonic()
+        yield f'retry: 3000\nid: {cursor}\n\n'
+        while time.monotonic() - started < MAX_STREAM_SECONDS:
+            settled = timezone.now() - timedelta(seconds=SETTLE_SECONDS)
+            unsent = events.filter(id__gt=floor).exclude(id__in=list(sent))
+            batch = [event async for event in unsent.values('id', 'kind', 'payload', 'created_at')[:BATCH_SIZE]]
+            for event in batch:
+                yield _format_event(event)
+                sent[event['id']] = event['created_at']
+            # Events below a sent one older than the window had committed before this read, so
+            # it saw them; the window can start above it
+            floor = max([floor] + [event_id for event_id, created_at in sent.items() if created_at < settled])
+            for event_id in [event_id for event_id in sent if event_id <= floor]:
+                del sent[event_id]
+            if batch:
+                last_sent = time.monotonic()
+                if len(batch) == BATCH_SIZE:
+                    continue
+            elif time.monotonic() - last_sent >= HEARTBEAT_INTERVAL:
+                yield ': keepalive\n\n'
+                last_sent = time.monotonic()
+            await asyncio.sleep(POLL_INTERVAL)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Disable proxy buffering (nginx)
+    return response
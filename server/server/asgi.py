@@ -12,5 +12,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'server.settings')
+os.environ.setdefault('ASYNC_PUBLIC_API', 'True')  # Route diner endpoints to the async views
 
 application = get_asgi_application()
@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 from pathlib import Path
 from decouple import config, Csv
 import dj_database_url
+from corsheaders.defaults import default_headers
 import os
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -49,6 +50,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -135,13 +137,40 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'core.renderers.FastJSONRenderer',  # Same bytes as JSONRenderer, via orjson when installed
     ],
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
     ],
+    # ?format= selects jsonl/csv on the admin import/export views, not a renderer
+    'URL_FORMAT_OVERRIDE': None,
 }
 
+# Serve the hot diner endpoints from core.views_public_async; server/asgi.py turns this on
+ASYNC_PUBLIC_API = config('ASYNC_PUBLIC_API', default=False, cast=bool)
+
+# Token resolution cache (core.authentication)
+TOKEN_CACHE_TTL = config('TOKEN_CACHE_TTL', default=30, cast=int)  # Seconds
+TOKEN_CACHE_MAX_ENTRIES = config('TOKEN_CACHE_MAX_ENTRIES', default=10000, cast=int)
+TOKEN_CACHE_SHARED = config('TOKEN_CACHE_SHARED', default=False, cast=bool)  # Also store in Django's cache
+
+# Stored responses for Idempotency-Key requests (core.idempotency)
+IDEMPOTENCY_KEY_TTL = config('IDEMPOTENCY_KEY_TTL', default=24 * 60 * 60, cast=int)  # Seconds
+
+# Email (receipts are sent by the run_jobs worker); the console backend prints them
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = config('EMAIL_HOST', default='localhost')
+EMAIL_PORT = config('EMAIL_PORT', default=25, cast=int)
+EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
+EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
+EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=False, cast=bool)
+EMAIL_TIMEOUT = config('EMAIL_TIMEOUT', default=30, cast=int)
+DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='receipts@billpay.local')
+
+# Bearer token for GET /api/admin/metrics (every restaurant's traffic); empty turns the endpoint off
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
 # CORS
 CORS_ALLOWED_ORIGINS = config('CORS_ALLOWED_ORIGINS', default='http://localhost:5173', cast=Csv())
 CORS_ALLOW_CREDENTIALS = True
+CORS_ALLOW_HEADERS = (*default_headers, 'idempotency-key')